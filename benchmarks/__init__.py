@@ -0,0 +1,9 @@
+"""Benchmarks for pytwitcherapi
+
+They run offline against :mod:`benchmarks.standin`, a local server
+that imitates the twitch apis. Run them from the repository root::
+
+  python -m benchmarks.bench_load --help
+  python -m benchmarks.bench_json
+  python -m benchmarks.bench_import
+"""
@@ -0,0 +1,79 @@
+"""Measure how long importing pytwitcherapi takes
+
+Every statement is run in a fresh interpreter several times and the fastest
+run is reported, minus the startup time of an interpreter, that imports nothing.
+The heavy dependencies, that a statement loads, are listed as well::
+
+  python -m benchmarks.bench_import --repeat 10
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import subprocess
+import sys
+import time
+
+STATEMENTS = [
+    'import pytwitcherapi',
+    'import pytwitcherapi; pytwitcherapi.Stream',
+    'from pytwitcherapi import models',
+    'from pytwitcherapi import TwitchSession',
+    'from pytwitcherapi import *',
+]
+"""The statements to time"""
+
+DEPENDENCIES = ['requests', 'requests_oauthlib', 'oauthlib', 'm3u8', 'irc', 'pkg_resources']
+"""Modules, that take long to import"""
+
+_REPORT = ('import sys; print(",".join(m for m in %r if m in sys.modules))' % DEPENDENCIES)
+
+
+def measure(statement, repeat):
+    """Return the fastest wall time of running the statement in a new interpreter
+
+    :param statement: python code
+    :type statement: :class:`str`
+    :param repeat: the number of runs
+    :type repeat: :class:`int`
+    :returns: the seconds
+    :rtype: :class:`float`
+    """
+    best = None
+    for i in range(repeat):
+        started = time.time()
+        subprocess.check_call([sys.executable, '-c', statement])
+        elapsed = time.time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def loaded_dependencies(statement):
+    """Return the heavy dependencies, that the statement imports
+
+    :param statement: python code
+    :type statement: :class:`str`
+    :returns: the module names
+    :rtype: :class:`list` of :class:`str`
+    """
+    output = subprocess.check_output([sys.executable, '-c', statement + '\n' + _REPORT])
+    return [m for m in output.decode('utf-8').strip().split(',') if m]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='runs per statement')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    startup = measure('pass', args.repeat)
+    print('interpreter startup %.1f ms' % (startup * 1000.0))
+    for statement in STATEMENTS:
+        seconds = measure(statement, args.repeat) - startup
+        loaded = ', '.join(loaded_dependencies(statement)) or '-'
+        print('%-45s %7.1f ms  loads %s' % (statement, seconds * 1000.0, loaded))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
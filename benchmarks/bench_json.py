@@ -0,0 +1,88 @@
+"""Compare the json decoders for wrapping kraken responses into models.
+
+Decodes a ``streams`` response body with every installed decoder and wraps it
+into :class:`pytwitcherapi.Stream` instances, the way
+:meth:`pytwitcherapi.TwitchSession.get_streams` does.
+By default the body is ``benchmarks/streams.json``, which holds the streams
+of the test fixtures. Pass the path of another recorded response body
+to use it instead::
+
+  python -m benchmarks.bench_json [streams.json]
+
+If the file does not exist, a generated page of 100 streams is used.
+"""
+from __future__ import print_function
+
+import importlib
+import json
+import os
+import sys
+import timeit
+
+from pytwitcherapi import jsonutils, models
+
+from . import standin
+
+NUMBER = 200
+"""How often every decoder is timed"""
+
+RECORDED = os.path.join(os.path.dirname(__file__), 'streams.json')
+"""The default response body"""
+
+
+def get_decoders():
+    """Return the installed decoders by name
+
+    :returns: mapping of module names to loads functions
+    :rtype: :class:`dict`
+    """
+    decoders = {'json': jsonutils.loads}
+    for name in jsonutils.FAST_DECODERS:
+        try:
+            decoders[name] = importlib.import_module(name).loads
+        except ImportError:
+            pass
+    return decoders
+
+
+class _Response(object):
+    """Stands in for :class:`requests.Response` with a complete body"""
+
+    def __init__(self, content):
+        self.content = content
+
+
+def load_body(path=RECORDED):
+    """Return the response body to decode
+
+    :param path: the path of a recorded response body
+    :type path: :class:`str`
+    :returns: the body or a generated page of 100 streams, if the file does not exist
+    :rtype: :class:`bytes`
+    """
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    print('%s not found. Using a generated page.' % path)
+    return json.dumps(standin.make_streams_page(100)).encode('utf-8')
+
+
+def main(argv):
+    body = load_body(*argv[1:2])
+    response = _Response(body)
+
+    print('%s bytes, best of 3 x %s runs' % (len(body), NUMBER))
+    print('%-12s %12s %12s %8s' % ('decoder', 'decode ms', 'wrap ms', 'speedup'))
+    results = []
+    for name, loads in sorted(get_decoders().items()):
+        decode = min(timeit.repeat(lambda: loads(body), number=NUMBER, repeat=3))
+        wrap = min(timeit.repeat(lambda: models.Stream.wrap_search(response, loads),
+                                 number=NUMBER, repeat=3))
+        results.append((name, decode / NUMBER * 1000.0, wrap / NUMBER * 1000.0))
+    baseline = dict((r[0], r[2]) for r in results)['json']
+    for name, decode, wrap in results:
+        print('%-12s %12.3f %12.3f %7.2fx' % (name, decode, wrap, baseline / wrap))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
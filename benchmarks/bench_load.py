@@ -0,0 +1,151 @@
+"""Measure the throughput and latency of :class:`pytwitcherapi.TwitchSession`
+
+Drives session methods from several threads against a local
+:class:`benchmarks.standin.StandinServer` and reports requests per second
+and the 50th and 99th percentile of the latency per scenario::
+
+  python -m benchmarks.bench_load --latency 0.02 --threads 16 --requests 1000
+  python -m benchmarks.bench_load --scenario channel --cache
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import concurrent.futures
+import sys
+import threading
+import time
+
+import requests
+
+from pytwitcherapi import cache, retry, session
+
+from . import standin
+
+SCENARIOS = {
+    'streams': lambda ts, i: ts.get_streams(limit=100, offset=(i % 10) * 100),
+    'channel': lambda ts, i: ts.get_channel('channel%s' % (i % 100)),
+    'topgames': lambda ts, i: ts.top_games(limit=100),
+    'playlist': lambda ts, i: ts.get_playlist('channel%s' % (i % 50)),
+}
+"""Functions, that issue a single session call"""
+
+
+def percentile(values, p):
+    """Return the p-th percentile of the values by nearest rank
+
+    :param values: sorted values
+    :type values: :class:`list`
+    :param p: the percentile between 0 and 100
+    :type p: :class:`float`
+    :returns: the value
+    :raises: :class:`IndexError` if there are no values
+    """
+    rank = max(0, min(len(values) - 1, int(round(p / 100.0 * len(values) + 0.5)) - 1))
+    return values[rank]
+
+
+class Result(object):
+    """Latencies and errors of a benchmark run"""
+
+    def __init__(self, name, latencies, errors, seconds):
+        self.name = name
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.seconds = seconds
+
+    @property
+    def rate(self, ):
+        """Calls per second"""
+        return len(self.latencies) / self.seconds if self.seconds else 0.0
+
+    def __str__(self, ):
+        if not self.latencies:
+            return '%-10s no successful calls, %s errors' % (self.name, self.errors)
+        return '%-10s %8.1f req/s  p50 %7.1f ms  p99 %7.1f ms  errors %s' % (
+            self.name, self.rate,
+            percentile(self.latencies, 50) * 1000.0,
+            percentile(self.latencies, 99) * 1000.0,
+            self.errors)
+
+
+def run(ts, name, calls, threads):
+    """Issue the calls of a scenario from the given number of threads
+
+    :param ts: the session
+    :type ts: :class:`pytwitcherapi.TwitchSession`
+    :param name: the name of the scenario in :data:`SCENARIOS`
+    :type name: :class:`str`
+    :param calls: the number of calls
+    :type calls: :class:`int`
+    :param threads: the number of threads
+    :type threads: :class:`int`
+    :returns: the result
+    :rtype: :class:`Result`
+    """
+    func = SCENARIOS[name]
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def call(i):
+        started = time.time()
+        try:
+            func(ts, i)
+        except Exception:
+            with lock:
+                errors[0] += 1
+            return
+        elapsed = time.time() - started
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.time()
+    with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+        list(executor.map(call, range(calls)))
+    return Result(name, latencies, errors[0], time.time() - started)
+
+
+def create_session(args):
+    """Return a session configured by the command line arguments"""
+    ts = session.TwitchSession()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=args.poolsize)
+    ts.mount('http://', adapter)
+    if args.cache:
+        ts.response_cache = cache.ResponseCache(default_ttl=60)
+    if args.retry:
+        ts.retry = retry.RetryPolicy(retries=3, backoff=0.01)
+    if args.no_singleflight:
+        ts.singleflight = None
+    return ts
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='the scenarios to run. Defaults to all.')
+    parser.add_argument('--requests', type=int, default=500, help='calls per scenario')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent calls')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds the server delays every response')
+    parser.add_argument('--errorrate', type=float, default=0.0,
+                        help='share of responses, that fail with 503')
+    parser.add_argument('--poolsize', type=int, default=10, help='connections per host')
+    parser.add_argument('--cache', action='store_true', help='use a response cache')
+    parser.add_argument('--retry', action='store_true', help='retry failed requests')
+    parser.add_argument('--no-singleflight', action='store_true',
+                        help='do not coalesce identical requests')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with standin.StandinServer(latency=args.latency, errorrate=args.errorrate, seed=0) as server:
+        with server.patch_session():
+            ts = create_session(args)
+            for name in args.scenario or sorted(SCENARIOS):
+                print(run(ts, name, args.requests, args.threads))
+        print('%s requests served, %s errors injected' % (server.requests, server.errors))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""Local stand-in for the twitch apis
+
+:class:`StandinServer` serves synthetic responses for the endpoints,
+that :class:`pytwitcherapi.TwitchSession` uses most:
+
+  * kraken ``streams``, ``channels/<name>``, ``games/top``
+  * ``channels/<name>/access_token`` of the old api
+  * usher ``channel/hls/<name>.m3u8`` master playlists
+  * media playlists and ``.ts`` segments
+
+Every response can be delayed and a share of the requests fail
+with ``503``::
+
+  with standin.StandinServer(latency=0.05, errorrate=0.01) as server:
+      with server.patch_session():
+          ts = session.TwitchSession()
+          ts.get_streams(limit=100)
+"""
+from __future__ import absolute_import
+
+import contextlib
+import json
+import random
+import sys
+import threading
+import time
+
+from pytwitcherapi import session
+
+if sys.version_info[0] == 2:
+    import BaseHTTPServer as httpserver
+    import SocketServer as socketserver
+    import urlparse
+else:
+    import http.server as httpserver
+    import socketserver
+    import urllib.parse as urlparse
+
+__all__ = ['StandinServer', 'make_stream', 'make_channel', 'make_streams_page']
+
+TOTAL_STREAMS = 1000
+"""The number of live streams the stand-in knows"""
+
+SEGMENT_SIZE = 64 * 1024
+"""The size of a media segment in bytes"""
+
+GAME = 'Dota 2'
+"""The game of all streams"""
+
+
+def make_channel(i):
+    """Return the json of a synthetic channel
+
+    :param i: the number of the channel
+    :type i: :class:`int`
+    :returns: the channel json
+    :rtype: :class:`dict`
+    """
+    name = 'channel%s' % i
+    return {'mature': False,
+            'status': u'Playing some games ❤ #%s' % i,
+            'broadcaster_language': 'en',
+            'display_name': name.title(),
+            'game': GAME,
+            'delay': 0,
+            'language': 'en',
+            '_id': 10000 + i,
+            'name': name,
+            'created_at': '2011-03-19T15:42:22Z',
+            'updated_at': '2015-03-19T15:42:22Z',
+            'logo': 'http://static-cdn.jtvnw.net/jtv_user_pictures/%s-logo.png' % name,
+            'banner': None,
+            'video_banner': None,
+            'background': None,
+            'profile_banner': None,
+            'profile_banner_background_color': None,
+            'partner': i % 2 == 0,
+            'url': 'http://www.twitch.tv/%s' % name,
+            'views': 123456 + i,
+            'followers': 4567 + i,
+            '_links': {'self': 'https://api.twitch.tv/kraken/channels/%s' % name}}
+
+
+def make_stream(i):
+    """Return the json of a synthetic stream
+
+    :param i: the number of the stream. Lower numbers have more viewers.
+    :type i: :class:`int`
+    :returns: the stream json
+    :rtype: :class:`dict`
+    """
+    channel = make_channel(i)
+    name = channel['name']
+    preview = dict((k, 'http://static-cdn.jtvnw.net/previews-ttv/live_user_%s-%s.jpg' % (name, k))
+                   for k in ('small', 'medium', 'large', 'template'))
+    return {'game': GAME,
+            'viewers': 100000 // (i + 1),
+            '_id': 200000 + i,
+            'created_at': '2015-03-19T15:42:22Z',
+            'video_height': 720,
+            'average_fps': 59.98,
+            'is_playlist': False,
+            'preview': preview,
+            'channel': channel,
+            '_links': {'self': 'https://api.twitch.tv/kraken/streams/%s' % name}}
+
+
+def make_streams_page(limit=100, offset=0, total=TOTAL_STREAMS, channels=None, game=None):
+    """Return the json of a kraken ``streams`` response
+
+    :param limit: the number of streams
+    :type limit: :class:`int`
+    :param offset: the number of the first stream
+    :type offset: :class:`int`
+    :param total: the number of all streams
+    :type total: :class:`int`
+    :param channels: only return the streams of these channel names
+    :type channels: :class:`list` of :class:`str` | None
+    :param game: only return the streams of this game
+    :type game: :class:`str` | None
+    :returns: the response json
+    :rtype: :class:`dict`
+    """
+    numbers = range(total)
+    if channels is not None:
+        numbers = sorted(set(_get_number(c) for c in channels
+                             if c == 'channel%s' % _get_number(c) and _get_number(c) < total))
+    if game is not None and game != GAME:
+        numbers = []
+    return {'_total': len(numbers),
+            '_links': {'self': 'https://api.twitch.tv/kraken/streams?limit=%s&offset=%s' % (limit, offset),
+                       'next': 'https://api.twitch.tv/kraken/streams?limit=%s&offset=%s' % (limit, offset + limit)},
+            'streams': [make_stream(i) for i in numbers[offset:offset + limit]]}
+
+
+def make_top_games(limit=10, offset=0):
+    """Return the json of a kraken ``games/top`` response"""
+    return {'_total': 500,
+            'top': [{'game': {'name': 'Game %s' % i, '_id': i, 'giantbomb_id': i,
+                              'box': {}, 'logo': {}},
+                     'viewers': 100000 // (i + 1),
+                     'channels': 1000 // (i + 1)}
+                    for i in range(offset, offset + limit)]}
+
+
+def make_master_playlist(baseurl, channel):
+    """Return a master playlist with a source and a low quality"""
+    lines = ['#EXTM3U']
+    for group, name in (('chunked', 'Source'), ('low', 'Low')):
+        lines.append('#EXT-X-MEDIA:TYPE=VIDEO,GROUP-ID="%s",NAME="%s",AUTOSELECT=YES,DEFAULT=YES'
+                     % (group, name))
+        lines.append('#EXT-X-STREAM-INF:PROGRAM-ID=1,BANDWIDTH=128000,VIDEO="%s"' % group)
+        lines.append('%shls/%s/%s/index.m3u8' % (baseurl, channel, group))
+    return '\n'.join(lines) + '\n'
+
+
+def make_media_playlist(now, targetduration=2, count=5):
+    """Return a live media playlist, that advances with the time"""
+    last = int(now / targetduration)
+    first = max(0, last - count + 1)
+    lines = ['#EXTM3U',
+             '#EXT-X-VERSION:3',
+             '#EXT-X-TARGETDURATION:%s' % targetduration,
+             '#EXT-X-MEDIA-SEQUENCE:%s' % first]
+    for i in range(first, last + 1):
+        lines.append('#EXTINF:%.3f,' % targetduration)
+        lines.append('%s.ts' % i)
+    return '\n'.join(lines) + '\n'
+
+
+def _get_number(name):
+    """Return the number at the end of a name like ``channel12`` or 0"""
+    digits = name[len(name.rstrip('0123456789')):]
+    return int(digits) if digits else 0
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, httpserver.HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(httpserver.BaseHTTPRequestHandler):
+    """Serves the stand-in responses. The server is :data:`_Handler.standin`."""
+
+    standin = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self, ):
+        self.standin.handle(self)
+
+
+class StandinServer(object):
+    """Local http server, that imitates the twitch apis"""
+
+    def __init__(self, latency=0.0, errorrate=0.0, seed=None, host='127.0.0.1', port=0):
+        """Initialize a new server. Call :meth:`StandinServer.start` to serve.
+
+        :param latency: seconds every response is delayed
+        :type latency: :class:`float`
+        :param errorrate: share of the requests, that fail with ``503``
+        :type errorrate: :class:`float`
+        :param seed: seed for choosing the failing requests
+        :type seed: :class:`int` | None
+        :param host: the address to listen on
+        :type host: :class:`str`
+        :param port: the port to listen on. 0 picks a free one.
+        :type port: :class:`int`
+        :raises: None
+        """
+        super(StandinServer, self).__init__()
+        self.latency = latency
+        """Seconds every response is delayed"""
+        self.errorrate = errorrate
+        """Share of the requests, that fail with ``503``"""
+        self.random = random.Random(seed)
+        self.requests = 0
+        """The number of handled requests"""
+        self.errors = 0
+        """The number of injected errors"""
+        self._lock = threading.Lock()
+        handler = type('Handler', (_Handler,), {'standin': self})
+        self.httpd = _ThreadingHTTPServer((host, port), handler)
+        self._thread = None
+
+    @property
+    def baseurl(self, ):
+        """The url of the server, e.g. ``http://127.0.0.1:12345/``"""
+        host, port = self.httpd.server_address[:2]
+        return 'http://%s:%s/' % (host, port)
+
+    def start(self, ):
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        kwargs={'poll_interval': 0.05})
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, ):
+        """Stop serving"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self, ):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @contextlib.contextmanager
+    def patch_session(self, ):
+        """Point the base urls of :mod:`pytwitcherapi.session` to the server
+        while in the context
+        """
+        names = {'TWITCH_KRAKENURL': self.baseurl + 'kraken/',
+                 'TWITCH_USHERURL': self.baseurl + 'usher/',
+                 'TWITCH_APIURL': self.baseurl + 'api/'}
+        old = dict((n, getattr(session, n)) for n in names)
+        for n, url in names.items():
+            setattr(session, n, url)
+        try:
+            yield self
+        finally:
+            for n, url in old.items():
+                setattr(session, n, url)
+
+    def handle(self, handler):
+        """Answer the request of the handler
+
+        :param handler: the request handler
+        :type handler: :class:`http.server.BaseHTTPRequestHandler`
+        :returns: None
+        :rtype: None
+        """
+        with self._lock:
+            self.requests += 1
+            fail = self.errorrate and self.random.random() < self.errorrate
+            if fail:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            return self._send(handler, 503, b'{"error": "Service Unavailable"}')
+        url = urlparse.urlparse(handler.path)
+        params = dict((k, v[-1]) for k, v in urlparse.parse_qs(url.query).items())
+        parts = url.path.strip('/').split('/')
+        body = self._route(parts, params)
+        if body is None:
+            return self._send(handler, 404, b'{"error": "Not Found"}')
+        contenttype, data = body
+        self._send(handler, 200, data, contenttype)
+
+    def _route(self, parts, params):
+        """Return the content type and body for the path or None"""
+        def dump(obj):
+            return 'application/json', json.dumps(obj).encode('utf-8')
+
+        if parts[:2] == ['kraken', 'streams'] and len(parts) == 2:
+            channels = params.get('channel')
+            return dump(make_streams_page(int(params.get('limit', 25)),
+                                          int(params.get('offset', 0)),
+                                          channels=channels.split(',') if channels else None,
+                                          game=params.get('game') or None))
+        if parts[:2] == ['kraken', 'channels'] and len(parts) == 3:
+            return dump(make_channel(_get_number(parts[2])))
+        if parts[:3] == ['kraken', 'games', 'top']:
+            return dump(make_top_games(int(params.get('limit', 10)),
+                                       int(params.get('offset', 0))))
+        if parts[:2] == ['api', 'channels'] and parts[3:] == ['access_token']:
+            token = json.dumps({'channel': parts[2], 'expires': int(time.time()) + 3600})
+            return dump({'token': token, 'sig': 'standinsig'})
+        if parts[:3] == ['usher', 'channel', 'hls'] and len(parts) == 4:
+            channel = parts[3].rsplit('.', 1)[0]
+            return ('application/vnd.apple.mpegurl',
+                    make_master_playlist(self.baseurl, channel).encode('utf-8'))
+        if parts[0] == 'hls' and parts[-1] == 'index.m3u8':
+            return ('application/vnd.apple.mpegurl',
+                    make_media_playlist(time.time()).encode('utf-8'))
+        if parts[0] == 'hls' and parts[-1].endswith('.ts'):
+            return 'video/MP2T', b'\x47' * SEGMENT_SIZE
+
+    @staticmethod
+    def _send(handler, status, data, contenttype='application/json'):
+        handler.send_response(status)
+        handler.send_header('Content-Type', contenttype)
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
@@ -38,6 +38,8 @@ class Tox(TestCommand):
 long_description = read('README.rst', 'HISTORY.rst')
 install_requires = ['requests', 'requests-oauthlib', 'oauthlib', 'm3u8', 'irc>=15']
 tests_require = ['tox']
+if sys.version_info[0] == 2:
+    install_requires.append('futures')
 
 
 setup(
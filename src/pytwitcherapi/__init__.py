@@ -1,15 +1,59 @@
-from __future__ import absolute_import
+"""The public classes of the submodules are available here, e.g.
+:class:`pytwitcherapi.TwitchSession`.
 
-from .models import *
-from .session import *
-from .exceptions import *
-from .chat import *
+The submodules are imported on first access of one of their classes,
+so ``import pytwitcherapi`` is cheap, if only a few of them are needed.
+"""
+from __future__ import absolute_import
 
-__all__ = [models.__all__ +
-           session.__all__ +
-           exceptions.__all__ +
-           chat.__all__]
+import importlib
+import pkgutil
+import sys
+import types
 
 __author__ = 'David Zuber'
 __email__ = 'zuber.david@gmx.de'
 __version__ = '0.9.3'
+
+_exports = {'models': ['Game', 'Channel', 'Stream', 'User'],
+            'session': ['needs_auth', 'TwitchSession'],
+            'exceptions': ['PytwitcherException', 'NotAuthorizedError', 'CircuitOpenError'],
+            'chat': ['IRCClient', 'EmotePrefetcher']}
+if sys.version_info >= (3, 4):
+    _exports['asyncsession'] = ['AsyncTwitchSession']
+
+_submodules = dict((name, module) for module, names in _exports.items() for name in names)
+"""Mapping of public names to the submodule, that defines them"""
+
+__all__ = [name for module in ('models', 'session', 'exceptions', 'chat', 'asyncsession')
+           for name in _exports.get(module, [])]
+
+
+class _LazyModule(types.ModuleType):
+    """Package, that imports a submodule on first access of one of its names
+
+    Module level ``__getattr__`` needs python 3.7, so the package
+    replaces itself in :data:`sys.modules` with an instance of this class.
+    """
+
+    def __getattr__(self, name):
+        module = _submodules.get(name)
+        if module is not None:
+            value = getattr(importlib.import_module('.' + module, self.__name__), name)
+        elif name in set(m[1] for m in pkgutil.iter_modules(self.__path__)):
+            # submodules, e.g. pytwitcherapi.models
+            value = importlib.import_module('.' + name, self.__name__)
+        else:
+            raise AttributeError('module %r has no attribute %r' % (self.__name__, name))
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self, ):
+        return sorted(set(self.__dict__) | set(_submodules))
+
+
+_package = _LazyModule(__name__, __doc__)
+_package.__dict__.update(sys.modules[__name__].__dict__)
+# python 2 clears the globals of a module, when the module is garbage collected
+_package._original = sys.modules[__name__]
+sys.modules[__name__] = _package
@@ -0,0 +1,380 @@
+"""Non-blocking requests for :class:`pytwitcherapi.AsyncTwitchSession`
+
+:class:`AiohttpTransport` sends the requests of the kraken methods with
+`aiohttp <https://pypi.python.org/pypi/aiohttp>`_ on the event loop,
+so hundreds of requests can be in flight without a thread for each::
+
+  ats = pytwitcherapi.AsyncTwitchSession(use_aiohttp=True)
+  channels, errors = await ats.get_channels(names)
+  await ats.close()
+
+The responses are converted to :class:`requests.Response` instances
+and wrapped into the same :mod:`pytwitcherapi.models`, that the
+blocking session returns.
+
+The transport uses the headers, the token, :data:`pytwitcherapi.TwitchSession.json_loads`,
+``timeout``, ``retry``, ``circuitbreaker`` and ``metrics`` of the wrapped session.
+The rate limiter, the response cache, hedging and coalescing are not applied.
+
+Needs aiohttp and thus python 3.5.3 or newer.
+"""
+from __future__ import absolute_import
+
+import asyncio
+import logging
+import time
+
+import aiohttp
+import oauthlib.oauth2
+import requests
+import requests.structures
+import requests.utils
+import yarl
+
+from . import exceptions, jsonutils, models, session
+
+__all__ = ['AiohttpTransport']
+
+log = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 100
+"""Default number of connections and thus of requests in flight at the same time"""
+
+
+def _get_client_timeout(timeout):
+    """Return the aiohttp timeout for a requests timeout
+
+    :param timeout: seconds, a ``(connect, read)`` tuple or None
+    :type timeout: :class:`float` | :class:`tuple` | None
+    :returns: the aiohttp timeout
+    :rtype: :class:`aiohttp.ClientTimeout`
+    :raises: None
+    """
+    if timeout is None:
+        return aiohttp.ClientTimeout(total=None)
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+    return aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+
+
+def _make_response(prepared, clientresponse, content):
+    """Return a :class:`requests.Response` for a finished aiohttp response
+
+    :param prepared: the request, that was sent
+    :type prepared: :class:`requests.PreparedRequest`
+    :param clientresponse: the aiohttp response
+    :type clientresponse: :class:`aiohttp.ClientResponse`
+    :param content: the body of the response
+    :type content: :class:`bytes`
+    :returns: the response
+    :rtype: :class:`requests.Response`
+    :raises: None
+    """
+    response = requests.Response()
+    response.status_code = clientresponse.status
+    response.reason = clientresponse.reason
+    response.headers = requests.structures.CaseInsensitiveDict(clientresponse.headers)
+    response.url = str(clientresponse.url)
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.request = prepared
+    response._content = content
+    response._content_consumed = True
+    return response
+
+
+class AiohttpTransport(object):
+    """Sends the requests of a :class:`pytwitcherapi.TwitchSession` with aiohttp
+
+    The methods are coroutines, that take the same arguments as the ones
+    of :class:`pytwitcherapi.TwitchSession` with the same name.
+    """
+
+    methods = ['request', 'get', 'kraken_request',
+               'fetch_viewers', 'search_games', 'top_games', 'get_game',
+               'get_channel', 'get_channels', 'search_channels',
+               'get_stream', 'get_streams', 'search_streams', 'followed_streams',
+               'get_user', 'get_users']
+    """Names of the methods, that do not need a thread"""
+
+    def __init__(self, session, limit=DEFAULT_LIMIT):
+        """Initialize a new transport
+
+        The :class:`aiohttp.ClientSession` is created on the first request,
+        so the transport can be created outside of the event loop.
+
+        :param session: the session, whose settings and token are used
+        :type session: :class:`pytwitcherapi.TwitchSession`
+        :param limit: the maximum number of connections. 0 means no limit.
+        :type limit: :class:`int`
+        :raises: None
+        """
+        super(AiohttpTransport, self).__init__()
+        self.session = session
+        """The session, whose settings and token are used"""
+        self.limit = limit
+        """The maximum number of connections, i.e. of requests in flight"""
+        self.clientsession = None
+        """The :class:`aiohttp.ClientSession` or None before the first request"""
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s limit: %s>' % (self.__class__.__name__, self.limit)
+
+    def _get_clientsession(self, ):
+        """Return the client session and create it on first use
+
+        :returns: the client session
+        :rtype: :class:`aiohttp.ClientSession`
+        :raises: None
+        """
+        if self.clientsession is None:
+            connector = aiohttp.TCPConnector(limit=self.limit)
+            self.clientsession = aiohttp.ClientSession(connector=connector)
+        return self.clientsession
+
+    async def _send(self, method, url, params=None, data=None, headers=None, timeout=None):
+        """Send a single request
+
+        :param method: the request method
+        :type method: :class:`str`
+        :param url: the url
+        :type url: :class:`str`
+        :param params: the query parameters
+        :param data: the body
+        :param headers: the headers
+        :type headers: :class:`dict` | None
+        :param timeout: seconds, a ``(connect, read)`` tuple or None
+        :type timeout: :class:`float` | :class:`tuple` | None
+        :returns: a resonse object
+        :rtype: :class:`requests.Response`
+        :raises: :class:`requests.ConnectionError`, :class:`requests.Timeout`
+        """
+        headers = dict(headers or {})
+        if self.session.authorized and oauthlib.oauth2.is_secure_transport(url):
+            url, headers, data = self.session._client.add_token(
+                url, http_method=method, body=data, headers=headers)
+        prepared = requests.Request(method, url, params=params, data=data,
+                                    headers=headers).prepare()
+        log.debug('%s "%s" with aiohttp', method, prepared.url)
+        try:
+            async with self._get_clientsession().request(
+                    method, yarl.URL(prepared.url, encoded=True),
+                    data=prepared.body, headers=dict(prepared.headers),
+                    timeout=_get_client_timeout(timeout)) as r:
+                content = await r.read()
+        except asyncio.TimeoutError as e:
+            raise requests.Timeout(e, request=prepared)
+        except aiohttp.ClientError as e:
+            raise requests.ConnectionError(e, request=prepared)
+        return _make_response(prepared, r, content)
+
+    async def request(self, method, url, **kwargs):
+        """Send a request without blocking the event loop. Raises HTTPErrors.
+
+        Failed requests are retried according to the ``retry`` policy of the session.
+
+        :param method: the request method
+        :type method: :class:`str`
+        :param url: the url
+        :type url: :class:`str`
+        :param kwargs: ``params``, ``data``, ``headers`` and ``timeout``
+                       like for :meth:`requests.Session.request`
+        :returns: a resonse object
+        :rtype: :class:`requests.Response`
+        :raises: :class:`requests.HTTPError`, :class:`requests.Timeout`,
+                 :class:`requests.ConnectionError`,
+                 :class:`pytwitcherapi.exceptions.CircuitOpenError`
+        """
+        s = self.session
+        kwargs.setdefault('timeout', s.timeout)
+        host = requests.compat.urlparse(url).netloc
+        attempt = 0
+        while True:
+            if s.circuitbreaker is not None:
+                s.circuitbreaker.before_request(host)
+            started = time.time()
+            try:
+                response = await self._send(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if s.metrics is not None:
+                    s.metrics.record_error(method, url, time.time() - started)
+                s._record_result(host, None)
+                delay = s._get_retry_delay(method, attempt, None)
+                if delay is None:
+                    raise
+            else:
+                if s.metrics is not None:
+                    s.metrics.record_response(method, url, time.time() - started, response)
+                s._record_result(host, response)
+                delay = s._get_retry_delay(method, attempt, None, response)
+                if delay is None:
+                    response.raise_for_status()
+                    return response
+            attempt += 1
+            if s.metrics is not None:
+                s.metrics.record_retry(method, url)
+            log.debug('Retrying %s "%s" in %.2fs.', method, url, delay)
+            await asyncio.sleep(delay)
+
+    async def get(self, url, **kwargs):
+        """Send a GET request. See :meth:`AiohttpTransport.request`.
+
+        :param url: the url
+        :type url: :class:`str`
+        :param kwargs: keyword arguments of :meth:`AiohttpTransport.request`
+        :returns: a resonse object
+        :rtype: :class:`requests.Response`
+        :raises: :class:`requests.HTTPError`
+        """
+        return await self.request('GET', url, **kwargs)
+
+    async def kraken_request(self, method, endpoint, **kwargs):
+        """Make a request to one of the kraken api endpoints.
+
+        See :meth:`pytwitcherapi.TwitchSession.kraken_request`.
+
+        :param method: the request method
+        :type method: :class:`str`
+        :param endpoint: the endpoint of the kraken api.
+        :type endpoint: :class:`str`
+        :param kwargs: keyword arguments of :meth:`AiohttpTransport.request`
+        :returns: a resonse object
+        :rtype: :class:`requests.Response`
+        :raises: :class:`requests.HTTPError`
+        """
+        headers = kwargs.setdefault('headers', {})
+        headers['Accept'] = session.TWITCH_HEADER_ACCEPT
+        headers['Client-ID'] = session.CLIENT_ID
+        return await self.request(method, session.TWITCH_KRAKENURL + endpoint, **kwargs)
+
+    async def _map_settled(self, func, items):
+        """Call the coroutine function for every distinct item concurrently
+
+        See :func:`pytwitcherapi.concurrency.map_settled`.
+
+        :param func: the coroutine function to call with every item
+        :type func: callable
+        :param items: hashable items. Duplicates are only processed once.
+        :type items: :class:`list`
+        :returns: a mapping of items to results and a mapping of items to exceptions
+        :rtype: (:class:`dict`, :class:`dict`)
+        :raises: None
+        """
+        distinct = list(dict.fromkeys(items))
+        outcomes = await asyncio.gather(*[func(i) for i in distinct], return_exceptions=True)
+        results = {}
+        errors = {}
+        for item, outcome in zip(distinct, outcomes):
+            if isinstance(outcome, Exception):
+                errors[item] = outcome
+            else:
+                results[item] = outcome
+        return results, errors
+
+    async def fetch_viewers(self, game):
+        """See :meth:`pytwitcherapi.TwitchSession.fetch_viewers`"""
+        r = await self.kraken_request('GET', 'streams/summary', params={'game': game.name})
+        data = jsonutils.decode(r, self.session.json_loads)
+        game.viewers = data['viewers']
+        game.channels = data['channels']
+        return game
+
+    async def search_games(self, query, live=True, fetch_viewers=True):
+        """See :meth:`pytwitcherapi.TwitchSession.search_games`
+
+        The viewers of all games are queried at the same time.
+        """
+        r = await self.kraken_request('GET', 'search/games',
+                                      params={'query': query, 'type': 'suggest', 'live': live})
+        games = models.Game.wrap_search(r, self.session.json_loads)
+        if fetch_viewers:
+            await asyncio.gather(*[self.fetch_viewers(g) for g in games])
+        return games
+
+    async def top_games(self, limit=10, offset=0):
+        """See :meth:`pytwitcherapi.TwitchSession.top_games`"""
+        r = await self.kraken_request('GET', 'games/top',
+                                      params={'limit': limit, 'offset': offset})
+        return models.Game.wrap_topgames(r, self.session.json_loads)
+
+    async def get_game(self, name):
+        """See :meth:`pytwitcherapi.TwitchSession.get_game`"""
+        games = await self.search_games(query=name, live=False, fetch_viewers=False)
+        for g in games:
+            if g.name == name:
+                return await self.fetch_viewers(g)
+
+    async def get_channel(self, name):
+        """See :meth:`pytwitcherapi.TwitchSession.get_channel`"""
+        r = await self.kraken_request('GET', 'channels/' + name)
+        return models.Channel.wrap_get_channel(r, self.session.json_loads)
+
+    async def get_channels(self, names):
+        """See :meth:`pytwitcherapi.TwitchSession.get_channels`
+
+        All channels are queried at the same time.
+        """
+        return await self._map_settled(self.get_channel, names)
+
+    async def search_channels(self, query, limit=25, offset=0):
+        """See :meth:`pytwitcherapi.TwitchSession.search_channels`"""
+        r = await self.kraken_request('GET', 'search/channels',
+                                      params={'query': query, 'limit': limit, 'offset': offset})
+        return models.Channel.wrap_search(r, self.session.json_loads)
+
+    async def get_stream(self, channel):
+        """See :meth:`pytwitcherapi.TwitchSession.get_stream`"""
+        if isinstance(channel, models.Channel):
+            channel = channel.name
+        r = await self.kraken_request('GET', 'streams/' + channel)
+        return models.Stream.wrap_get_stream(r, self.session.json_loads)
+
+    async def get_streams(self, game=None, channels=None, limit=25, offset=0):
+        """See :meth:`pytwitcherapi.TwitchSession.get_streams`"""
+        params = session.get_streams_params(game, channels, limit, offset)
+        r = await self.kraken_request('GET', 'streams', params=params)
+        return models.Stream.wrap_search(r, self.session.json_loads)
+
+    async def search_streams(self, query, hls=False, limit=25, offset=0):
+        """See :meth:`pytwitcherapi.TwitchSession.search_streams`"""
+        r = await self.kraken_request('GET', 'search/streams',
+                                      params={'query': query, 'hls': hls,
+                                              'limit': limit, 'offset': offset})
+        return models.Stream.wrap_search(r, self.session.json_loads)
+
+    async def followed_streams(self, limit=25, offset=0):
+        """See :meth:`pytwitcherapi.TwitchSession.followed_streams`"""
+        if not self.session.authorized:
+            raise exceptions.NotAuthorizedError('Please login first!')
+        r = await self.kraken_request('GET', 'streams/followed',
+                                      params={'limit': limit, 'offset': offset})
+        return models.Stream.wrap_search(r, self.session.json_loads)
+
+    async def get_user(self, name):
+        """See :meth:`pytwitcherapi.TwitchSession.get_user`"""
+        r = await self.kraken_request('GET', 'user/' + name)
+        return models.User.wrap_get_user(r, self.session.json_loads)
+
+    async def get_users(self, names):
+        """See :meth:`pytwitcherapi.TwitchSession.get_users`
+
+        All users are queried at the same time.
+        """
+        return await self._map_settled(self.get_user, names)
+
+    async def close(self, ):
+        """Close all connections
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        if self.clientsession is not None:
+            await self.clientsession.close()
+            self.clientsession = None
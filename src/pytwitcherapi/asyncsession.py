@@ -0,0 +1,190 @@
+"""Asyncio counterpart of :class:`pytwitcherapi.TwitchSession`
+
+:class:`AsyncTwitchSession` offers the same methods as
+:class:`pytwitcherapi.TwitchSession`, but every method returns an awaitable
+instead of blocking the event loop::
+
+  import asyncio
+
+  import pytwitcherapi
+
+  async def main():
+      ats = pytwitcherapi.AsyncTwitchSession(maxworkers=32)
+      names = ['channel1', 'channel2', 'channel3']
+      channels = await asyncio.gather(*[ats.get_channel(n) for n in names])
+      ats.close()
+
+By default every call runs the blocking session in a worker thread of
+:data:`AsyncTwitchSession.executor`, so each request in flight occupies
+one thread and at most ``maxworkers`` requests are in flight at a time.
+
+With ``use_aiohttp=True`` the kraken methods, e.g.
+:meth:`AsyncTwitchSession.get_channels` or :meth:`AsyncTwitchSession.get_streams`,
+send their requests with aiohttp on the event loop instead.
+Then hundreds of requests can be in flight without a thread for each.
+See :mod:`pytwitcherapi.aiotransport`. The other methods still use the workers::
+
+  async def main():
+      ats = pytwitcherapi.AsyncTwitchSession(use_aiohttp=True)
+      channels, errors = await ats.get_channels(names)
+      await ats.close()
+
+The results are the same :mod:`pytwitcherapi.models` instances, the
+blocking session returns.
+"""
+from __future__ import absolute_import
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+import requests.adapters
+
+from .session import TwitchSession
+
+__all__ = ['AsyncTwitchSession']
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAXWORKERS = 16
+"""Default number of worker threads and thus of requests in flight at the same time"""
+
+
+def _wrap_run_in_executor(funcname):
+    """Wrap the given method of :data:`AsyncTwitchSession.session`,
+    so it gets executed in :data:`AsyncTwitchSession.executor`.
+
+    If :data:`AsyncTwitchSession.transport` implements the method,
+    the coroutine of the transport is returned instead.
+
+    :param funcname: the name of a :class:`pytwitcherapi.TwitchSession` method
+    :type funcname: :class:`str`
+    :returns: a new function, that returns an awaitable
+    :raises: None
+    """
+    def method(self, *args, **kwargs):
+        if self.transport is not None and funcname in self.transport.methods:
+            return getattr(self.transport, funcname)(*args, **kwargs)
+        f = getattr(self.session, funcname)
+        p = functools.partial(f, *args, **kwargs)
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self.executor, p)
+    method.__name__ = funcname
+    return method
+
+
+def add_session_methods(cls):
+    """Add the methods listed in :data:`AsyncTwitchSession.session_methods`
+    to the given class.
+
+    Each method wraps the :class:`pytwitcherapi.TwitchSession` method
+    with the same name and returns an awaitable instead of the result.
+
+    :param cls: The class to add the methods do.
+    :type cls: :class:`AsyncTwitchSession`
+    :returns: the class
+    """
+    for m in cls.session_methods:
+        method = _wrap_run_in_executor(m)
+        f = getattr(TwitchSession, m)
+        method.__doc__ = f.__doc__
+        setattr(cls, method.__name__, method)
+    return cls
+
+
+@add_session_methods
+class AsyncTwitchSession(object):
+    """Session for making requests to the twitch api from an asyncio event loop
+
+    All methods in :data:`AsyncTwitchSession.session_methods` take the same
+    arguments as the ones of :class:`pytwitcherapi.TwitchSession`, but return
+    an awaitable.
+
+    Authorization is handled by the wrapped :data:`AsyncTwitchSession.session`.
+    """
+
+    session_methods = ['request', 'get',
+                       'kraken_request', 'usher_request', 'oldapi_request',
+                       'fetch_viewers', 'search_games', 'top_games', 'get_game',
+                       'get_channel', 'get_channels', 'search_channels',
+                       'get_stream', 'get_streams', 'get_streams_bulk', 'search_streams',
+                       'followed_streams',
+                       'get_user', 'get_users', 'query_login_user',
+                       'get_playlist', 'get_quality_options', 'get_variant_url',
+                       'get_channel_access_token',
+                       'get_chat_server', 'get_chat_servers', 'get_emote_picture']
+    """Names of the :class:`pytwitcherapi.TwitchSession` methods
+    that are available as coroutines"""
+
+    def __init__(self, session=None, maxworkers=DEFAULT_MAXWORKERS, use_aiohttp=False):
+        """Initialize a new async session
+
+        :param session: the session to use for the requests.
+                        If None, a new one is created, whose connection pool
+                        has room for ``maxworkers`` connections per host.
+                        The adapters of a given session are left alone.
+        :type session: :class:`pytwitcherapi.TwitchSession` | None
+        :param maxworkers: the number of worker threads,
+                           i.e. the maximum number of blocking requests in flight.
+        :type maxworkers: :class:`int`
+        :param use_aiohttp: If True, the kraken methods do not block a thread,
+                            but send their requests with aiohttp.
+                            See :mod:`pytwitcherapi.aiotransport`.
+        :type use_aiohttp: :class:`bool`
+        :raises: :class:`ImportError` if ``use_aiohttp`` is True, but aiohttp is not installed
+        """
+        super(AsyncTwitchSession, self).__init__()
+        if session is None:
+            session = TwitchSession()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=maxworkers,
+                                                    pool_maxsize=maxworkers)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+        """The blocking session that does the actual requests"""
+        self.maxworkers = maxworkers
+        """The number of worker threads, i.e. the maximum number of requests in flight"""
+        self.executor = concurrent.futures.ThreadPoolExecutor(maxworkers)
+        """The executor that runs the blocking requests"""
+        self.transport = None
+        """The :class:`pytwitcherapi.aiotransport.AiohttpTransport` for
+        non-blocking requests or None"""
+        if use_aiohttp:
+            from . import aiotransport
+            self.transport = aiotransport.AiohttpTransport(session)
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s %s>' % (self.__class__.__name__, self.session)
+
+    @property
+    def authorized(self, ):
+        """Return True if the wrapped session is authorized
+
+        :returns: True if authorized
+        :rtype: :class:`bool`
+        :raises: None
+        """
+        return self.session.authorized
+
+    def close(self, ):
+        """Wait for pending requests, then shutdown the workers
+        and close all connections
+
+        The connections of :data:`AsyncTwitchSession.transport` are closed
+        by the returned awaitable.
+
+        :returns: an awaitable, if there is a transport, else None
+        :raises: None
+        """
+        log.debug('Shutting down %s', self)
+        self.executor.shutdown(wait=True)
+        self.session.close()
+        if self.transport is not None:
+            return asyncio.ensure_future(self.transport.close())
@@ -0,0 +1,692 @@
+"""Caches for responses and other data that is expensive to query
+
+All caches are thread-safe, so a session can be shared by multiple threads.
+"""
+from __future__ import absolute_import
+
+import collections
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+__all__ = ['LRUCache', 'TTLCache', 'SizedLRUCache', 'DiskCache', 'TieredCache',
+           'ResponseCache']
+
+log = logging.getLogger(__name__)
+
+_missing = object()
+
+
+class LRUCache(object):
+    """Mapping with a maximum size, that evicts the least recently used entry
+    """
+
+    def __init__(self, maxsize=128):
+        """Initialize a new cache
+
+        :param maxsize: the maximum number of entries
+        :type maxsize: :class:`int`
+        :raises: None
+        """
+        super(LRUCache, self).__init__()
+        self.maxsize = maxsize
+        """The maximum number of entries"""
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s %s/%s>' % (self.__class__.__name__, len(self), self.maxsize)
+
+    def __len__(self, ):
+        """Return the number of entries
+
+        :returns: the number of entries
+        :rtype: :class:`int`
+        :raises: None
+        """
+        return len(self._data)
+
+    def __contains__(self, key):
+        """Return True, if there is an entry for the key
+
+        :param key: the key
+        :returns: True if there is an entry
+        :rtype: :class:`bool`
+        :raises: None
+        """
+        return self.get(key, _missing) is not _missing
+
+    def get(self, key, default=None):
+        """Return the value for the key and mark it as recently used
+
+        :param key: the key
+        :param default: the value to return, if there is no entry
+        :returns: the cached value or default
+        :raises: None
+        """
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        """Store the value for the key
+
+        Evicts the least recently used entries if the cache is full.
+
+        :param key: the key
+        :param value: the value to store
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove the entry for the key and return its value
+
+        :param key: the key
+        :param default: the value to return, if there is no entry
+        :returns: the removed value or default
+        :raises: None
+        """
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self, ):
+        """Remove all entries
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            self._data.clear()
+
+
+class TTLCache(LRUCache):
+    """Least recently used cache, whose entries expire after some time
+    """
+
+    def __init__(self, maxsize=128, ttl=60, timer=time.time):
+        """Initialize a new cache
+
+        :param maxsize: the maximum number of entries
+        :type maxsize: :class:`int`
+        :param ttl: the default time to live of an entry in seconds
+        :type ttl: :class:`float`
+        :param timer: function that returns the current time in seconds
+        :type timer: callable
+        :raises: None
+        """
+        super(TTLCache, self).__init__(maxsize=maxsize)
+        self.ttl = ttl
+        """The default time to live of an entry in seconds"""
+        self.timer = timer
+        """Function that returns the current time in seconds"""
+
+    def get(self, key, default=None):
+        """Return the value for the key, if it has not expired yet
+
+        :param key: the key
+        :param default: the value to return, if there is no valid entry
+        :returns: the cached value or default
+        :raises: None
+        """
+        entry = super(TTLCache, self).get(key, _missing)
+        if entry is _missing:
+            return default
+        expires, value = entry
+        if expires <= self.timer():
+            self.pop(key)
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Store the value for the key
+
+        :param key: the key
+        :param value: the value to store
+        :param ttl: the time to live in seconds.
+                    If None, use :data:`TTLCache.ttl`.
+        :type ttl: :class:`float` | None
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        if ttl is None:
+            ttl = self.ttl
+        super(TTLCache, self).set(key, (self.timer() + ttl, value))
+
+    def pop(self, key, default=None):
+        """Remove the entry for the key and return its value
+
+        :param key: the key
+        :param default: the value to return, if there is no entry
+        :returns: the removed value or default
+        :raises: None
+        """
+        entry = super(TTLCache, self).pop(key, _missing)
+        if entry is _missing:
+            return default
+        return entry[1]
+
+
+class SizedLRUCache(LRUCache):
+    """Least recently used cache for bytes, that is bounded by the total size
+    of the values instead of the number of entries
+    """
+
+    def __init__(self, maxbytes=8 * 1024 * 1024, getsize=len):
+        """Initialize a new cache
+
+        :param maxbytes: the maximum total size of all values
+        :type maxbytes: :class:`int`
+        :param getsize: function that returns the size of a value
+        :type getsize: callable
+        :raises: None
+        """
+        super(SizedLRUCache, self).__init__(maxsize=None)
+        self.maxbytes = maxbytes
+        """The maximum total size of all values"""
+        self.getsize = getsize
+        """Function that returns the size of a value"""
+        self.size = 0
+        """The total size of all values"""
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s %s/%s bytes>' % (self.__class__.__name__, self.size, self.maxbytes)
+
+    def set(self, key, value):
+        """Store the value for the key
+
+        Evicts the least recently used entries until the values fit.
+        Values bigger than :data:`SizedLRUCache.maxbytes` are not stored.
+
+        :param key: the key
+        :param value: the value to store
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        size = self.getsize(value)
+        with self._lock:
+            old = self._data.pop(key, _missing)
+            if old is not _missing:
+                self.size -= self.getsize(old)
+            if size > self.maxbytes:
+                return
+            self._data[key] = value
+            self.size += size
+            while self.size > self.maxbytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= self.getsize(evicted)
+
+    def pop(self, key, default=None):
+        """Remove the entry for the key and return its value
+
+        :param key: the key
+        :param default: the value to return, if there is no entry
+        :returns: the removed value or default
+        :raises: None
+        """
+        with self._lock:
+            value = self._data.pop(key, _missing)
+            if value is _missing:
+                return default
+            self.size -= self.getsize(value)
+            return value
+
+    def clear(self, ):
+        """Remove all entries
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+def _remove(path):
+    """Remove the file and ignore if it does not exist
+
+    :param path: the path of the file
+    :type path: :class:`str`
+    :returns: None
+    :rtype: None
+    :raises: :class:`OSError` for other errors than a missing file
+    """
+    try:
+        os.remove(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+class DiskCache(object):
+    """Content-addressed cache for bytes in a directory
+
+    Every value is stored once in ``objects/<sha1 of the value>``.
+    ``keys/<sha1 of the key>`` holds the address of the value for a key,
+    so identical values of different keys share a file.
+
+    The least recently used values are removed, when the total size
+    exceeds :data:`DiskCache.maxbytes`, together with the keys that refer to them.
+    Files are written to ``tmp/`` first and then moved into place.
+    Leftovers of interrupted writes are removed, when the cache is created.
+    """
+
+    def __init__(self, directory, maxbytes=64 * 1024 * 1024):
+        """Initialize a new disk cache
+
+        :param directory: the directory for the cache. It is created if necessary.
+        :type directory: :class:`str`
+        :param maxbytes: the maximum total size of all values
+        :type maxbytes: :class:`int`
+        :raises: :class:`OSError` if the directory cannot be created
+        """
+        super(DiskCache, self).__init__()
+        self.directory = directory
+        """The directory of the cache"""
+        self.maxbytes = maxbytes
+        """The maximum total size of all values"""
+        self._objectdir = os.path.join(directory, 'objects')
+        self._keydir = os.path.join(directory, 'keys')
+        self._tmpdir = os.path.join(directory, 'tmp')
+        for d in (self._objectdir, self._keydir, self._tmpdir):
+            if not os.path.isdir(d):
+                os.makedirs(d)
+        for n in os.listdir(self._tmpdir):
+            _remove(os.path.join(self._tmpdir, n))
+        self._lock = threading.Lock()
+        self.size = sum(os.path.getsize(os.path.join(self._objectdir, n))
+                        for n in os.listdir(self._objectdir))
+        """The total size of all values"""
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s %s %s/%s bytes>' % (self.__class__.__name__, self.directory,
+                                        self.size, self.maxbytes)
+
+    def _get_keypath(self, key):
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self._keydir, name)
+
+    def get(self, key, default=None):
+        """Return the value for the key and mark it as recently used
+
+        :param key: the key. Its :func:`repr` has to be stable.
+        :param default: the value to return, if there is no entry
+        :returns: the cached value or default
+        :rtype: :class:`bytes`
+        :raises: None
+        """
+        keypath = self._get_keypath(key)
+        try:
+            with open(keypath, 'r') as f:
+                address = f.read().strip()
+            objectpath = os.path.join(self._objectdir, address)
+            with open(objectpath, 'rb') as f:
+                value = f.read()
+            os.utime(objectpath, None)
+        except (IOError, OSError):
+            return default
+        return value
+
+    def set(self, key, value):
+        """Store the value for the key
+
+        :param key: the key. Its :func:`repr` has to be stable.
+        :param value: the value to store
+        :type value: :class:`bytes`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        if len(value) > self.maxbytes:
+            return
+        address = hashlib.sha1(value).hexdigest()
+        objectpath = os.path.join(self._objectdir, address)
+        try:
+            with self._lock:
+                if os.path.exists(objectpath):
+                    os.utime(objectpath, None)
+                else:
+                    self._write(objectpath, value, 'wb')
+                    self.size += len(value)
+                self._write(self._get_keypath(key), address, 'w')
+                self._evict()
+        except (IOError, OSError):
+            log.exception('Could not store %r in the disk cache.', key)
+
+    def _write(self, path, data, mode):
+        """Write the data atomically to path
+
+        :param path: the path of the file
+        :type path: :class:`str`
+        :param data: the file content
+        :param mode: the file mode, e.g. ``'wb'``
+        :type mode: :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: :class:`OSError`
+        """
+        fd, tmppath = tempfile.mkstemp(dir=self._tmpdir)
+        try:
+            with os.fdopen(fd, mode) as f:
+                f.write(data)
+            if os.name == 'nt':
+                _remove(path)
+            os.rename(tmppath, path)
+        except Exception:
+            _remove(tmppath)
+            raise
+
+    def _evict(self, ):
+        """Remove the least recently used values until the size is below the maximum
+
+        The keys of the removed values are removed as well.
+
+        :returns: None
+        :rtype: None
+        :raises: :class:`OSError`
+        """
+        if self.size <= self.maxbytes:
+            return
+        paths = [os.path.join(self._objectdir, n) for n in os.listdir(self._objectdir)]
+        stats = sorted((os.path.getmtime(p), os.path.getsize(p), p) for p in paths)
+        removed = set()
+        for _, size, path in stats:
+            if self.size <= self.maxbytes:
+                break
+            _remove(path)
+            self.size -= size
+            removed.add(os.path.basename(path))
+        for n in os.listdir(self._keydir):
+            keypath = os.path.join(self._keydir, n)
+            with open(keypath, 'r') as f:
+                address = f.read().strip()
+            if address in removed:
+                _remove(keypath)
+
+    def clear(self, ):
+        """Remove all entries
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            for d in (self._objectdir, self._keydir, self._tmpdir):
+                for n in os.listdir(d):
+                    _remove(os.path.join(d, n))
+            self.size = 0
+
+
+class TieredCache(object):
+    """Cache that looks up values in memory first and then in a second tier, e.g. on disk
+
+    Values found in the second tier are copied to memory.
+    """
+
+    def __init__(self, memory, disk=None):
+        """Initialize a new tiered cache
+
+        :param memory: the fast cache
+        :type memory: :class:`LRUCache`
+        :param disk: the slow, but bigger cache or None
+        :type disk: :class:`DiskCache` | None
+        :raises: None
+        """
+        super(TieredCache, self).__init__()
+        self.memory = memory
+        """The fast cache"""
+        self.disk = disk
+        """The slow, but bigger cache or None"""
+
+    def get(self, key, default=None):
+        """Return the value for the key
+
+        :param key: the key
+        :param default: the value to return, if there is no entry
+        :returns: the cached value or default
+        :raises: None
+        """
+        value = self.memory.get(key, _missing)
+        if value is not _missing:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key, _missing)
+            if value is not _missing:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        """Store the value for the key in all tiers
+
+        :param key: the key
+        :param value: the value to store
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self, ):
+        """Remove all entries of all tiers
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+class _ResponseEntry(object):
+    """A cached response together with its validator"""
+
+    def __init__(self, response, etag, expires):
+        """Initialize a new entry
+
+        :param response: the cached response
+        :type response: :class:`requests.Response`
+        :param etag: the ``ETag`` header of the response or None
+        :type etag: :class:`str` | None
+        :param expires: the time, when the response has to be revalidated
+        :type expires: :class:`float`
+        :raises: None
+        """
+        self.response = response
+        """The cached response"""
+        self.etag = etag
+        """The validator for conditional requests or None"""
+        self.expires = expires
+        """The time, when the response has to be revalidated"""
+
+
+class ResponseCache(object):
+    """Cache for responses of GET requests
+
+    Responses are cached for a time to live, that depends on the endpoint.
+    The ttl of the longest matching prefix in :data:`ResponseCache.ttls` is used,
+    or :data:`ResponseCache.default_ttl` if no prefix matches.
+
+    If a response had an ``ETag`` header, it is kept after it expired.
+    The next request for it will be conditional (``If-None-Match``),
+    so if the resource did not change, the server answers with ``304`` and
+    the cached response is reused.
+    """
+
+    def __init__(self, ttls=None, default_ttl=30, maxsize=256, timer=time.time):
+        """Initialize a new response cache
+
+        :param ttls: mapping of endpoint prefixes to time to live in seconds,
+                     e.g. ``{'channels/': 300, 'streams/': 30}``.
+        :type ttls: :class:`dict` | None
+        :param default_ttl: time to live for endpoints that do not match any prefix
+        :type default_ttl: :class:`float`
+        :param maxsize: the maximum number of cached responses
+        :type maxsize: :class:`int`
+        :param timer: function that returns the current time in seconds
+        :type timer: callable
+        :raises: None
+        """
+        super(ResponseCache, self).__init__()
+        self.ttls = dict(ttls or {})
+        """Mapping of endpoint prefixes to time to live in seconds"""
+        self.default_ttl = default_ttl
+        """Time to live for endpoints, that match no prefix"""
+        self.timer = timer
+        """Function that returns the current time in seconds"""
+        self._entries = LRUCache(maxsize=maxsize)
+
+    def __len__(self, ):
+        """Return the number of cached responses
+
+        :returns: the number of cached responses
+        :rtype: :class:`int`
+        :raises: None
+        """
+        return len(self._entries)
+
+    def get_ttl(self, endpoint):
+        """Return the time to live for responses of the given endpoint
+
+        :param endpoint: the endpoint, e.g. ``'channels/somechannel'``
+        :type endpoint: :class:`str`
+        :returns: the time to live in seconds
+        :rtype: :class:`float`
+        :raises: None
+        """
+        best = None
+        for prefix in self.ttls:
+            if endpoint.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        if best is None:
+            return self.default_ttl
+        return self.ttls[best]
+
+    @staticmethod
+    def make_key(url, params=None, token=None):
+        """Return a cache key for a request
+
+        :param url: the url of the request
+        :type url: :class:`str`
+        :param params: the query parameters in any form, that
+                       :class:`requests.Request` accepts
+        :type params: :class:`dict` | :class:`list` | :class:`str` | None
+        :param token: the oauth access token, as responses might
+                      depend on the user.
+        :type token: :class:`str` | None
+        :returns: a hashable key
+        :rtype: :class:`tuple`
+        :raises: :class:`requests.exceptions.RequestException` if the url is invalid
+        """
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        return requests.Request('GET', url, params=params).prepare().url, token
+
+    def get_fresh(self, key):
+        """Return the cached response if it has not expired yet
+
+        :param key: the key of the request. See :meth:`ResponseCache.make_key`.
+        :returns: the response or None
+        :rtype: :class:`requests.Response` | None
+        :raises: None
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires > self.timer():
+            return entry.response
+
+    def get_etag(self, key):
+        """Return the ETag of an expired response for revalidation
+
+        :param key: the key of the request. See :meth:`ResponseCache.make_key`.
+        :returns: the etag or None
+        :rtype: :class:`str` | None
+        :raises: None
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry.etag
+
+    def update(self, key, endpoint, response):
+        """Store a new response or revalidate the cached one
+
+        If the response has status ``304``, the cached response
+        is valid again and returned. If the cached response was evicted
+        in the meantime, the ``304`` response is returned and the request
+        has to be repeated unconditionally.
+        Otherwise the new response is cached, if it is cacheable.
+
+        :param key: the key of the request. See :meth:`ResponseCache.make_key`.
+        :param endpoint: the endpoint of the request to look up the ttl.
+        :type endpoint: :class:`str`
+        :param response: the response to the request
+        :type response: :class:`requests.Response`
+        :returns: the response to use
+        :rtype: :class:`requests.Response`
+        :raises: None
+        """
+        ttl = self.get_ttl(endpoint)
+        expires = self.timer() + ttl
+        if response.status_code == 304:
+            entry = self._entries.get(key)
+            if entry is not None:
+                log.debug('%s not modified. Using cached response.', endpoint)
+                etag = response.headers.get('ETag') or entry.etag
+                self._entries.set(key, _ResponseEntry(entry.response, etag, expires))
+                return entry.response
+            return response
+        if response.status_code != 200:
+            return response
+        etag = response.headers.get('ETag')
+        if ttl > 0 or etag:
+            self._entries.set(key, _ResponseEntry(response, etag, expires))
+        return response
+
+    def clear(self, ):
+        """Remove all cached responses
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        self._entries.clear()
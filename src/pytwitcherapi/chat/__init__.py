@@ -7,5 +7,6 @@ from __future__ import absolute_import
 from .client import *
 from .message import *
 from .connection import *
+from .prefetch import *
 
-__all__ = ['IRCClient']
+__all__ = ['IRCClient', 'EmotePrefetcher']
@@ -21,6 +21,11 @@ log = logging.getLogger(__name__)
 
 __all__ = ['IRCClient']
 
+STATUS_RANKS = {'online': 0,
+                'slow': 1,
+                'offline': 99}
+"""Rank of the status of a chat server. Lower is better. Unknown values rank 2."""
+
 
 class Reactor(irc.client.Reactor):
     """Reactor that can exit the process_forever loop.
@@ -206,7 +211,7 @@ class IRCClient(irc.client.SimpleIRCClient):
                     ':twitch.tv/tags']
     """List of irc capabilities"""
 
-    def __init__(self, session, channel, queuesize=100):
+    def __init__(self, session, channel, queuesize=100, emote_prefetcher=None, nickname=None):
         """Initialize a new irc client which can connect to the given
         channel.
 
@@ -218,6 +223,13 @@ class IRCClient(irc.client.SimpleIRCClient):
         :param queuesize: The queuesize for storing messages in :data:`IRCClient.messages`.
                           If 0, unlimited size.
         :type queuesize: :class:`int`
+        :param emote_prefetcher: a started prefetcher, that gets the emotes
+                                 of all stored messages.
+        :type emote_prefetcher: :class:`pytwitcherapi.chat.prefetch.EmotePrefetcher` | None
+        :param nickname: the name for logging in to the chat.
+                         If None, the name of the current user of the session,
+                         which might have to be queried first.
+        :type nickname: :class:`str` | None
         :raises: :class:`exceptions.NotAuthorizedError`
         """
         super(IRCClient, self).__init__()
@@ -231,8 +243,11 @@ class IRCClient(irc.client.SimpleIRCClient):
         the right server and the login username."""
         if not self.session.authorized:
             raise exceptions.NotAuthorizedError('Please authorize the session first.')
-        self.login_user = self.session.current_user
-        """The user that is used for logging in to the chat"""
+        self.emote_prefetcher = emote_prefetcher
+        """Downloads the emotes of stored messages in the background or None"""
+        self.nickname = nickname
+        """The name for logging in to the chat.
+        If None, the name of :data:`IRCClient.login_user` is used."""
         self.channel = channel
         """The channel to connect to.
         When setting the channel, automatically connect to it.
@@ -265,6 +280,16 @@ class IRCClient(irc.client.SimpleIRCClient):
             r = '<%s>' % (self.__class__.__name__)
         return r
 
+    @property
+    def login_user(self, ):
+        """Get the current user of the session
+
+        :returns: the user
+        :rtype: :class:`pytwitcherapi.User`
+        :raises: :class:`requests.HTTPError` if the user could not be queried
+        """
+        return self.session.current_user
+
     @property
     def channel(self, ):
         """Get the channel
@@ -297,7 +322,7 @@ class IRCClient(irc.client.SimpleIRCClient):
             return
         self.target = '#%s' % channel.name
         ip, port = self.session.get_chat_server(channel)
-        nickname = self.login_user.name
+        nickname = self.nickname or self.login_user.name
         password = 'oauth:%s' % self.session.token['access_token']
         self.log = logging.getLogger(str(self))
         for c in connections:
@@ -380,6 +405,8 @@ class IRCClient(irc.client.SimpleIRCClient):
     def store_message(self, connection, event):
         """Store the message of event in :data:`IRCClient.messages`.
 
+        The emotes of the message are passed to :data:`IRCClient.emote_prefetcher`.
+
         :param connection: the connection with the event
         :type connection: :class:`irc.client.ServerConnection`
         :param event: the event to handle
@@ -387,6 +414,8 @@ class IRCClient(irc.client.SimpleIRCClient):
         :returns: None
         """
         m = message.Message3.from_event(event)
+        if self.emote_prefetcher is not None:
+            self.emote_prefetcher.feed(m)
         while True:
             try:
                 self.messages.put(m, block=False)
@@ -475,6 +504,9 @@ class ChatServerStatus(object):
         self.errors = errors
         self.lag = lag
         self.description = description
+        self.sort_key = (STATUS_RANKS.get(status, 2), errors, lag)
+        """Key for sorting the servers from best to worst.
+        Computed once, so comparing servers is cheap."""
 
     def __repr__(self):  # pragma: no cover
         return "<%s %s, %s, %s, %s>" % (self.__class__.__name__, self.address,
@@ -501,9 +533,9 @@ class ChatServerStatus(object):
 
           1. it's status is worse than other. Status values:
 
-             * online - 1
-             * slow - 2
-             * everything else - 3
+             * online - 0
+             * slow - 1
+             * everything else - 2
              * offline - 99
 
           2. It has more errors.
@@ -514,11 +546,33 @@ class ChatServerStatus(object):
         :returns: True, if lesser than other
         :rtype: :class:`bool`
         """
-        statusd = {'online': 0,
-                   'slow': 1,
-                   'offline': 99}
-        if self.status != other.status:
-            return statusd.get(self.status, 2) < statusd.get(other.status, 2)
-        if self.errors == other.errors:
-            return self.lag < other.lag
-        return self.errors < other.errors
+        return self.sort_key < other.sort_key
+
+
+def rank_chat_servers(servers, stats):
+    """Return the servers ordered from best to worst
+
+    Servers with a status are sorted by :data:`ChatServerStatus.sort_key`.
+    Servers without a status follow in their original order.
+    Use the list to fall back to the next server, if one fails.
+
+    :param servers: a list of server adresses, e.g. ``['0.0.0.0:80']``
+    :type servers: :class:`list` of :class:`str`
+    :param stats: the server statuses or a mapping of addresses to statuses
+    :type stats: :class:`list` of :class:`ChatServerStatus` | :class:`dict`
+    :returns: the ordered server adresses
+    :rtype: :class:`list` of :class:`str`
+    :raises: None
+    """
+    if not isinstance(stats, dict):
+        stats = dict((s.address, s) for s in stats)
+    known = []
+    unknown = []
+    for i, server in enumerate(servers):
+        stat = stats.get(server)
+        if stat is None:
+            unknown.append(server)
+        else:
+            known.append((stat.sort_key, i, server))
+    known.sort()
+    return [server for _, _, server in known] + unknown
@@ -0,0 +1,163 @@
+"""Download emote pictures before they are displayed.
+
+An :class:`EmotePrefetcher` is fed with the messages of an
+:class:`pytwitcherapi.IRCClient` and downloads the pictures of new emotes
+in background threads into :data:`pytwitcherapi.TwitchSession.emote_cache`::
+
+  prefetcher = chat.EmotePrefetcher(session, sizes=(1.0, 2.0))
+  prefetcher.start()
+  client = chat.IRCClient(session, channel, emote_prefetcher=prefetcher)
+  ...
+  prefetcher.stop()
+"""
+from __future__ import absolute_import
+
+import logging
+import sys
+import threading
+
+from pytwitcherapi import cache
+
+from . import message
+
+if sys.version_info[0] == 2:
+    import Queue as queue
+else:
+    import queue
+
+log = logging.getLogger(__name__)
+
+__all__ = ['EmotePrefetcher']
+
+_stop = object()
+
+
+class EmotePrefetcher(object):
+    """Downloads the pictures of emotes concurrently in the background
+
+    Emotes are queued only once. If the queue is full, new emotes are dropped
+    and will be queued again, when they show up in another message.
+    """
+
+    def __init__(self, session, sizes=(1.0,), maxworkers=4, queuesize=1000,
+                 maxseen=10000):
+        """Initialize a new prefetcher
+
+        :param session: the session, whose emote cache is filled
+        :type session: :class:`pytwitcherapi.TwitchSession`
+        :param sizes: the picture sizes to download
+        :type sizes: :class:`tuple` of :class:`float`
+        :param maxworkers: the number of download threads
+        :type maxworkers: :class:`int`
+        :param queuesize: the maximum number of pending downloads
+        :type queuesize: :class:`int`
+        :param maxseen: the number of emotes, that are remembered
+                        to skip duplicates
+        :type maxseen: :class:`int`
+        :raises: None
+        """
+        super(EmotePrefetcher, self).__init__()
+        self.session = session
+        """The session, whose emote cache is filled"""
+        self.sizes = sizes
+        """The picture sizes to download"""
+        self.maxworkers = maxworkers
+        """The number of download threads"""
+        self.queue = queue.Queue(maxsize=queuesize)
+        """Pending downloads of (emoteid, size)"""
+        self._seen = cache.LRUCache(maxsize=maxseen)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s pending: %s>' % (self.__class__.__name__, self.queue.qsize())
+
+    def feed(self, msg):
+        """Queue the emotes of the message
+
+        :param msg: a chat message
+        :type msg: :class:`pytwitcherapi.chat.message.Message3`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        for emote in msg.emotes:
+            for size in self.sizes:
+                self.add(emote.emoteid, size)
+
+    def add(self, emoteid, size=1.0):
+        """Queue the download of an emote picture, if it was not queued before
+
+        :param emoteid: the emote id
+        :type emoteid: :class:`int`
+        :param size: the picture size
+        :type size: :class:`float`
+        :returns: True, if the download was queued
+        :rtype: :class:`bool`
+        :raises: None
+        """
+        key = (emoteid, size)
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.set(key, True)
+        try:
+            self.queue.put(key, block=False)
+        except queue.Full:
+            log.debug('Prefetch queue full. Dropping emote %s.', emoteid)
+            self._seen.pop(key)
+            return False
+        return True
+
+    def start(self, ):
+        """Start the download threads
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        for i in range(self.maxworkers - len(self._threads)):
+            t = threading.Thread(target=self._work, name='EmotePrefetcher-%s' % i)
+            t.daemon = True
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout=None):
+        """Stop the download threads after the pending downloads
+
+        :param timeout: seconds to wait for every thread
+        :type timeout: :class:`float` | None
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        for t in self._threads:
+            self.queue.put(_stop)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def _work(self, ):
+        """Download the queued emotes until stopped
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        while True:
+            key = self.queue.get()
+            if key is _stop:
+                return
+            emoteid, size = key
+            try:
+                self.session.get_emote_picture(message.Emote(emoteid, []), size)
+            except Exception:
+                log.exception('Prefetching emote %s failed.', emoteid)
+                # allow another try, when the emote shows up again
+                self._seen.pop(key)
@@ -0,0 +1,203 @@
+"""Helpers for issuing multiple requests at the same time
+
+The session methods that need more than one round trip use these
+helpers to run the requests on a bounded pool of threads.
+"""
+from __future__ import absolute_import
+
+import concurrent.futures
+import threading
+
+__all__ = []
+
+
+def map_concurrent(func, items, maxworkers):
+    """Call func for every item on a bounded pool of threads
+    and return the results in the order of the items.
+
+    If there is at most one item, or only one worker, no threads are used.
+    The first exception raised by func is reraised.
+
+    :param func: the function to call with every item
+    :type func: callable
+    :param items: the items to process
+    :type items: :class:`list`
+    :param maxworkers: the maximum number of threads
+    :type maxworkers: :class:`int`
+    :returns: the results of the function calls
+    :rtype: :class:`list`
+    :raises: whatever func raises
+    """
+    items = list(items)
+    if len(items) <= 1 or maxworkers <= 1:
+        return [func(i) for i in items]
+    workers = min(maxworkers, len(items))
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(func, items))
+
+
+def map_settled(func, items, maxworkers):
+    """Call func for every distinct item on a bounded pool of threads
+    and collect the results and exceptions by item.
+
+    Unlike :func:`map_concurrent`, a failing call does not abort the others.
+
+    :param func: the function to call with every item
+    :type func: callable
+    :param items: hashable items. Duplicates are only processed once.
+    :type items: :class:`list`
+    :param maxworkers: the maximum number of threads
+    :type maxworkers: :class:`int`
+    :returns: a mapping of items to results and a mapping of items to exceptions
+    :rtype: (:class:`dict`, :class:`dict`)
+    :raises: None
+    """
+    distinct = []
+    seen = set()
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            distinct.append(item)
+
+    def call(item):
+        try:
+            return func(item), None
+        except Exception as e:
+            return None, e
+
+    results = {}
+    errors = {}
+    outcomes = map_concurrent(call, distinct, maxworkers)
+    for item, (result, error) in zip(distinct, outcomes):
+        if error is None:
+            results[item] = result
+        else:
+            errors[item] = error
+    return results, errors
+
+
+def iter_pages(fetch, pagesize, key):
+    """Yield the items of all pages returned by fetch.
+
+    While the items of a page are consumed, the next page is
+    already fetched in a background thread.
+    Items that show up on more than one page, because they moved
+    between offsets, are only yielded once.
+
+    The iteration stops with the first page that has
+    less than pagesize items.
+
+    :param fetch: a function which accepts ``limit`` and ``offset`` as
+                  keyword arguments and returns a list of items.
+    :type fetch: callable
+    :param pagesize: the number of items per page
+    :type pagesize: :class:`int`
+    :param key: a function that returns a hashable identifier for an item,
+                which is used to detect duplicates.
+    :type key: callable
+    :returns: an iterator over all items
+    :raises: whatever fetch raises
+    """
+    seen = set()
+    offset = 0
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        future = executor.submit(fetch, limit=pagesize, offset=offset)
+        while future is not None:
+            page = future.result()
+            offset += pagesize
+            if len(page) < pagesize:
+                future = None
+            else:
+                future = executor.submit(fetch, limit=pagesize, offset=offset)
+            for item in page:
+                k = key(item)
+                if k in seen:
+                    continue
+                seen.add(k)
+                yield item
+
+
+def run_in_thread(func, *args, **kwargs):
+    """Call func in a new daemon thread and return a future for the result
+
+    :param func: the function to call
+    :type func: callable
+    :param args: positional arguments for func
+    :param kwargs: keyword arguments for func
+    :returns: a future, that will hold the result or exception of func
+    :rtype: :class:`concurrent.futures.Future`
+    :raises: None
+    """
+    future = concurrent.futures.Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    t = threading.Thread(target=run)
+    t.daemon = True
+    t.start()
+    return future
+
+
+class SingleFlight(object):
+    """Coalesce identical calls, that are in flight at the same time
+
+    If a call with the same key is already running in another thread,
+    :meth:`SingleFlight.do` waits for it and returns its result (or raises
+    its exception) instead of calling the function again.
+    """
+
+    def __init__(self, ):
+        """Initialize a new single flight group
+
+        :raises: None
+        """
+        super(SingleFlight, self).__init__()
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """Call func, unless a call with the same key is in flight
+
+        :param key: a hashable key, that identifies identical calls
+        :param func: the function to call
+        :type func: callable
+        :param args: positional arguments for func
+        :param kwargs: keyword arguments for func
+        :returns: the result of func
+        :raises: whatever func raises
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = concurrent.futures.Future()
+        if not leader:
+            return call.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key)
+            call.set_exception(e)
+            raise
+        self._finish(key)
+        call.set_result(result)
+        return result
+
+    def _finish(self, key):
+        """Remove the call for the given key, so new calls are executed again
+
+        :param key: the key of the call
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            del self._calls[key]
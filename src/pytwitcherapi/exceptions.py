@@ -1,7 +1,7 @@
 """Collection exceptions"""
 
 
-__all__ = ['PytwitcherException', 'NotAuthorizedError']
+__all__ = ['PytwitcherException', 'NotAuthorizedError', 'CircuitOpenError']
 
 
 class PytwitcherException(Exception):
@@ -13,3 +13,9 @@ class NotAuthorizedError(PytwitcherException):
     """Exception that is raised, when the session is not authorized.
     The user has to login first"""
     pass
+
+
+class CircuitOpenError(PytwitcherException):
+    """Exception that is raised, when requests to a host are
+    rejected, because the host failed too often recently."""
+    pass
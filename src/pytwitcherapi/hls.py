@@ -0,0 +1,475 @@
+"""Follow the media playlists of live streams
+
+:meth:`pytwitcherapi.TwitchSession.get_playlist` returns the master playlist
+of a channel. It lists the media playlists of the different qualities.
+A :class:`MediaPlaylistPoller` refreshes the media playlist of one quality
+at the pace of the stream and yields the segments, that were appended::
+
+  from pytwitcherapi import hls
+
+  poller = hls.MediaPlaylistPoller(ts, 'somechannel', quality='source')
+  for segment in poller:
+      print(segment.sequence, segment.uri)
+
+Only the ``#EXTINF`` lines of new segments are parsed, so tailing
+many streams stays cheap.
+
+A :class:`SegmentDownloader` records the segments to a file::
+
+  with open('stream.ts', 'wb') as f:
+      hls.SegmentDownloader(ts, f, prefetch=3).download(poller)
+"""
+from __future__ import absolute_import
+
+import concurrent.futures
+import logging
+import sys
+import threading
+import time
+
+import requests
+from requests.compat import urljoin
+
+if sys.version_info[0] == 2:
+    import Queue as queue
+else:
+    import queue
+
+__all__ = ['Segment', 'MediaPlaylist', 'MediaPlaylistPoller', 'SegmentDownloader']
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TARGETDURATION = 2.0
+"""Seconds between refreshes, if a playlist does not state its target duration"""
+
+CHUNKSIZE = 64 * 1024
+"""The number of bytes read from a segment at a time"""
+
+_done = object()
+
+
+class Segment(object):
+    """A media segment of a hls stream"""
+
+    def __init__(self, sequence, uri, duration):
+        """Initialize a new segment
+
+        :param sequence: the media sequence number
+        :type sequence: :class:`int`
+        :param uri: the absolute url of the segment
+        :type uri: :class:`str`
+        :param duration: the duration in seconds
+        :type duration: :class:`float`
+        :raises: None
+        """
+        super(Segment, self).__init__()
+        self.sequence = sequence
+        """The media sequence number"""
+        self.uri = uri
+        """The absolute url of the segment"""
+        self.duration = duration
+        """The duration in seconds"""
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s #%s, %ss>' % (self.__class__.__name__, self.sequence, self.duration)
+
+
+class MediaPlaylist(object):
+    """The parts of a media playlist, that are needed for following a stream"""
+
+    def __init__(self, mediasequence, targetduration, segments, lastsequence, endlist):
+        """Initialize a new media playlist
+
+        :param mediasequence: the sequence number of the first segment
+        :type mediasequence: :class:`int`
+        :param targetduration: the maximum segment duration in seconds
+        :type targetduration: :class:`float`
+        :param segments: the parsed segments
+        :type segments: :class:`list` of :class:`Segment`
+        :param lastsequence: the sequence number of the last segment
+                             or None, if the playlist is empty
+        :type lastsequence: :class:`int` | None
+        :param endlist: True, if the stream ended
+        :type endlist: :class:`bool`
+        :raises: None
+        """
+        super(MediaPlaylist, self).__init__()
+        self.mediasequence = mediasequence
+        """The sequence number of the first segment"""
+        self.targetduration = targetduration
+        """The maximum segment duration in seconds"""
+        self.segments = segments
+        """The parsed segments"""
+        self.lastsequence = lastsequence
+        """The sequence number of the last segment or None"""
+        self.endlist = endlist
+        """True, if no segments will be added anymore"""
+
+    @classmethod
+    def parse(cls, text, baseuri='', after=None):
+        """Parse a media playlist
+
+        Segments with a sequence number up to ``after`` are counted,
+        but not parsed.
+
+        :param text: the playlist
+        :type text: :class:`str`
+        :param baseuri: the url of the playlist for resolving relative segment urls
+        :type baseuri: :class:`str`
+        :param after: the last sequence number, that is already known
+        :type after: :class:`int` | None
+        :returns: the playlist
+        :rtype: :class:`MediaPlaylist`
+        :raises: None
+        """
+        mediasequence = 0
+        targetduration = DEFAULT_TARGETDURATION
+        endlist = False
+        segments = []
+        sequence = None
+        extinf = None
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line[0] != '#':
+                if sequence is None:
+                    sequence = mediasequence
+                if after is None or sequence > after:
+                    duration = float(extinf[8:].split(',', 1)[0]) if extinf else 0.0
+                    segments.append(Segment(sequence, urljoin(baseuri, line.strip()), duration))
+                sequence += 1
+                extinf = None
+            elif line.startswith('#EXTINF:'):
+                extinf = line
+            elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+                mediasequence = int(line[22:])
+            elif line.startswith('#EXT-X-TARGETDURATION:'):
+                targetduration = float(line[22:])
+            elif line.startswith('#EXT-X-ENDLIST'):
+                endlist = True
+        lastsequence = None if sequence is None else sequence - 1
+        return cls(mediasequence, targetduration, segments, lastsequence, endlist)
+
+
+class MediaPlaylistPoller(object):
+    """Refresh the media playlist of a channel and yield new segments
+
+    The playlist is refreshed every target duration.
+    If it did not change, the next refresh happens after half the target duration.
+    Iteration stops, when the stream ends.
+    """
+
+    def __init__(self, session, channel, quality='source', liveedge=3,
+                 timer=time.time, sleep=time.sleep):
+        """Initialize a new poller
+
+        :param session: the session for requesting the playlists
+        :type session: :class:`pytwitcherapi.TwitchSession`
+        :param channel: the channel or channel name
+        :type channel: :class:`pytwitcherapi.Channel` | :class:`str`
+        :param quality: one of :meth:`pytwitcherapi.TwitchSession.get_quality_options`
+        :type quality: :class:`str`
+        :param liveedge: the number of segments, that are yielded from the first playlist.
+                         If None, all of them.
+        :type liveedge: :class:`int` | None
+        :param timer: function that returns the current time in seconds
+        :type timer: callable
+        :param sleep: function to wait the given seconds
+        :type sleep: callable
+        :raises: None
+        """
+        super(MediaPlaylistPoller, self).__init__()
+        self.session = session
+        """The session for requesting the playlists"""
+        self.channel = channel
+        """The channel or channel name"""
+        self.quality = quality
+        """The quality of the stream"""
+        self.liveedge = liveedge
+        """The number of segments, that are yielded from the first playlist"""
+        self.timer = timer
+        """Function that returns the current time in seconds"""
+        self.sleep = sleep
+        """Function to wait the given seconds"""
+        self.url = None
+        """The url of the media playlist"""
+        self.lastsequence = None
+        """The sequence number of the last yielded segment"""
+        self.targetduration = DEFAULT_TARGETDURATION
+        """The target duration of the last playlist"""
+        self.ended = False
+        """True, if the stream ended"""
+
+    def __iter__(self, ):
+        """Yield new segments until the stream ends
+
+        :returns: an iterator over the segments
+        :rtype: iterator of :class:`Segment`
+        :raises: :class:`requests.HTTPError` if the channel is offline
+        """
+        while not self.ended:
+            started = self.timer()
+            segments = self.poll()
+            for segment in segments:
+                yield segment
+            if self.ended:
+                return
+            wait = self.targetduration if segments else self.targetduration / 2.0
+            wait -= self.timer() - started
+            if wait > 0:
+                self.sleep(wait)
+
+    def _get_playlist_text(self, ):
+        """Request the media playlist
+
+        If the request fails, the url is looked up again once,
+        because the access token in it might have expired.
+
+        :returns: the playlist
+        :rtype: :class:`str`
+        :raises: :class:`requests.HTTPError`
+        """
+        if self.url is None:
+            self.url = self.session.get_variant_url(self.channel, self.quality)
+            return self.session.get(self.url).text
+        try:
+            return self.session.get(self.url).text
+        except requests.HTTPError:
+            log.debug('Refreshing the playlist url of %s.', self.channel)
+            self.session.get_playlist(self.channel, cached=False)
+            self.url = self.session.get_variant_url(self.channel, self.quality)
+            return self.session.get(self.url).text
+
+    def poll(self, ):
+        """Request the media playlist once and return the new segments
+
+        :returns: the segments, that were appended since the last poll
+        :rtype: :class:`list` of :class:`Segment`
+        :raises: :class:`requests.HTTPError` if the channel is offline
+        """
+        text = self._get_playlist_text()
+        playlist = MediaPlaylist.parse(text, self.url, self.lastsequence)
+        if self.lastsequence is not None and playlist.lastsequence is not None and\
+           playlist.lastsequence < self.lastsequence:
+            log.debug('Media sequence of %s restarted.', self.channel)
+            playlist = MediaPlaylist.parse(text, self.url)
+        segments = playlist.segments
+        if self.lastsequence is None and self.liveedge is not None:
+            segments = segments[-self.liveedge:] if self.liveedge else []
+        elif segments and self.lastsequence is not None and\
+                segments[0].sequence > self.lastsequence + 1:
+            log.debug('Missed %s segments of %s.',
+                      segments[0].sequence - self.lastsequence - 1, self.channel)
+        if playlist.lastsequence is not None:
+            self.lastsequence = playlist.lastsequence
+        self.targetduration = playlist.targetduration
+        self.ended = playlist.endlist
+        return segments
+
+
+class _SegmentBuffer(object):
+    """Bounded queue of the chunks of a segment, that is being downloaded"""
+
+    def __init__(self, segment, maxchunks):
+        """Initialize a new buffer
+
+        :param segment: the segment, that is downloaded
+        :type segment: :class:`Segment`
+        :param maxchunks: the maximum number of buffered chunks
+        :type maxchunks: :class:`int`
+        :raises: None
+        """
+        self.segment = segment
+        self.chunks = queue.Queue(maxsize=maxchunks)
+        self.error = None
+
+
+class SegmentDownloader(object):
+    """Download segments concurrently and write them in order to a sink
+
+    Up to :data:`SegmentDownloader.prefetch` segments are downloaded ahead
+    of the one, that is written. Each download buffers at most
+    :data:`SegmentDownloader.maxchunks` chunks and then waits for the writer,
+    so the memory stays bounded, even if the sink is slow.
+    The chunks of a segment are written as they arrive and are never joined.
+    """
+
+    def __init__(self, session, sink, prefetch=3, chunksize=CHUNKSIZE, maxchunks=16,
+                 skip_errors=True):
+        """Initialize a new downloader
+
+        :param session: the session for downloading the segments
+        :type session: :class:`pytwitcherapi.TwitchSession`
+        :param sink: file-like object, that the segments are written to,
+                     e.g. a file opened with ``'wb'`` or a pipe
+        :type sink: file-like
+        :param prefetch: the number of segments, that are downloaded ahead
+        :type prefetch: :class:`int`
+        :param chunksize: the number of bytes read at a time
+        :type chunksize: :class:`int`
+        :param maxchunks: the number of chunks buffered per segment
+        :type maxchunks: :class:`int`
+        :param skip_errors: If True, segments, that cannot be downloaded, are skipped.
+                            Else the error is raised.
+        :type skip_errors: :class:`bool`
+        :raises: None
+        """
+        super(SegmentDownloader, self).__init__()
+        self.session = session
+        """The session for downloading the segments"""
+        self.sink = sink
+        """File-like object, that the segments are written to"""
+        self.prefetch = prefetch
+        """The number of segments, that are downloaded ahead"""
+        self.chunksize = chunksize
+        """The number of bytes read at a time"""
+        self.maxchunks = maxchunks
+        """The number of chunks buffered per segment"""
+        self.skip_errors = skip_errors
+        """If True, segments, that cannot be downloaded, are skipped"""
+        self.written = 0
+        """The number of bytes written"""
+        self._stopped = threading.Event()
+
+    def stop(self, ):
+        """Stop downloading. The last written segment might be incomplete.
+        This is thread safe.
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        self._stopped.set()
+
+    def _put(self, q, item):
+        """Put an item into the queue without blocking after the download was stopped
+
+        Once stopped, the item is only put, if there is room for it.
+
+        :param q: the queue
+        :type q: :class:`queue.Queue`
+        :param item: the item to put
+        :returns: False, if the download was stopped
+        :rtype: :class:`bool`
+        """
+        while True:
+            stopped = self._stopped.is_set()
+            try:
+                q.put(item, block=not stopped, timeout=0.1)
+                return not stopped
+            except queue.Full:
+                if stopped:
+                    return False
+
+    def _fetch(self, buf):
+        """Download the segment of the buffer into it
+
+        :param buf: the buffer for the segment
+        :type buf: :class:`_SegmentBuffer`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        try:
+            r = self.session.get(buf.segment.uri, stream=True)
+            try:
+                for chunk in r.iter_content(self.chunksize):
+                    if not self._put(buf.chunks, chunk):
+                        return
+            finally:
+                r.close()
+        except Exception as e:
+            buf.error = e
+        self._put(buf.chunks, _done)
+
+    def _feed(self, segments, executor, order):
+        """Start the downloads of the segments and queue their buffers in order
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        try:
+            for segment in segments:
+                if self._stopped.is_set():
+                    break
+                buf = _SegmentBuffer(segment, self.maxchunks)
+                executor.submit(self._fetch, buf)
+                self._put(order, buf)
+        except Exception as e:
+            log.exception('Getting the next segment failed.')
+            self._put(order, e)
+        self._put(order, _done)
+
+    def _write(self, buf):
+        """Write the chunks of the buffer to the sink as they arrive
+
+        :param buf: the buffer of the segment
+        :type buf: :class:`_SegmentBuffer`
+        :returns: None
+        :rtype: None
+        :raises: the error of the download, if not skipped
+        """
+        while True:
+            try:
+                chunk = buf.chunks.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    return
+                continue
+            if chunk is _done:
+                break
+            self.sink.write(chunk)
+            self.written += len(chunk)
+        if buf.error is not None:
+            if not self.skip_errors:
+                raise buf.error
+            log.warning('Skipping segment %s: %s', buf.segment.sequence, buf.error)
+
+    def download(self, segments):
+        """Download the segments and write them to the sink in order
+
+        Blocks until all segments are written or :meth:`SegmentDownloader.stop`
+        is called. The sink is flushed after every segment.
+
+        :param segments: the segments, e.g. a :class:`MediaPlaylistPoller`
+        :type segments: iterable of :class:`Segment`
+        :returns: the number of bytes written
+        :rtype: :class:`int`
+        :raises: errors of the downloads, if :data:`SegmentDownloader.skip_errors` is False
+        """
+        self._stopped.clear()
+        # the segments downloaded ahead and the one being written
+        executor = concurrent.futures.ThreadPoolExecutor(self.prefetch + 1)
+        order = queue.Queue(maxsize=self.prefetch)
+        feeder = threading.Thread(target=self._feed, args=(segments, executor, order))
+        feeder.daemon = True
+        feeder.start()
+        try:
+            while True:
+                buf = order.get()
+                if buf is _done:
+                    break
+                if isinstance(buf, Exception):
+                    raise buf
+                self._write(buf)
+                if hasattr(self.sink, 'flush'):
+                    self.sink.flush()
+                if self._stopped.is_set():
+                    break
+        finally:
+            self._stopped.set()
+            # let waiting downloads and the feeder finish
+            while True:
+                try:
+                    order.get(block=False)
+                except queue.Empty:
+                    break
+            executor.shutdown(wait=False)
+        return self.written
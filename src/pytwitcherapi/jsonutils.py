@@ -0,0 +1,264 @@
+"""Json decoding of responses
+
+:func:`get_fast_loads` returns the fastest json decoder, that is installed.
+Set it as :data:`pytwitcherapi.TwitchSession.json_loads`, so the models
+are created with it::
+
+  ts.json_loads = jsonutils.get_fast_loads()
+
+The list endpoints of the kraken api return documents like
+``{"_total": 1234, "streams": [{...}, {...}]}``.
+:func:`iter_response_array` reads such a response in chunks and
+yields the elements of the array one at a time, so the whole document
+never has to be held in memory::
+
+  r = ts.kraken_request('GET', 'streams', params={'limit': 100}, stream=True)
+  for stream in models.Stream.iter_search(r):
+      print(stream.channel.name)
+"""
+from __future__ import absolute_import
+
+import codecs
+import importlib
+import json
+import logging
+
+__all__ = []
+
+log = logging.getLogger(__name__)
+
+CHUNKSIZE = 8192
+"""The number of bytes read from the response at a time"""
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_START = '-0123456789'
+_NUMBER_CHARS = '.eE+-0123456789'
+
+FAST_DECODERS = ('orjson', 'ujson', 'simplejson')
+"""Modules with a ``loads`` function in order of preference"""
+
+
+def loads(data):
+    """Decode json with the standard library
+
+    Unlike :func:`json.loads` before python 3.6, bytes are accepted.
+
+    :param data: the json document
+    :type data: :class:`bytes` | :class:`str`
+    :returns: the decoded json
+    :raises: :class:`ValueError` if the document is invalid
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def get_fast_loads(modules=FAST_DECODERS):
+    """Return the ``loads`` function of the first decoder that is installed
+
+    Falls back to :func:`loads`, which uses the standard library.
+
+    :param modules: the names of the modules to try
+    :type modules: :class:`tuple` of :class:`str`
+    :returns: a function that decodes bytes or text
+    :rtype: callable
+    :raises: None
+    """
+    for name in modules:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        log.debug('Using %s for decoding json.', name)
+        return module.loads
+    return loads
+
+
+def decode(response, loads=None):
+    """Return the decoded json body of the response
+
+    :param response: the response with a json body
+    :type response: :class:`requests.Response`
+    :param loads: the function to decode the body. It is called with bytes.
+                  If None, use :meth:`requests.Response.json`.
+    :type loads: callable | None
+    :returns: the decoded json
+    :raises: :class:`ValueError` if the body is invalid
+    """
+    if loads is None:
+        return response.json()
+    return loads(response.content)
+
+
+class _Reader(object):
+    """Buffer over an iterator of byte chunks, that decodes json values"""
+
+    def __init__(self, chunks, decoder):
+        """Initialize a new reader
+
+        :param chunks: the json document as an iterable of bytes or text
+        :type chunks: iterable
+        :param decoder: the decoder for the values
+        :type decoder: :class:`json.JSONDecoder`
+        :raises: None
+        """
+        self.chunks = iter(chunks)
+        self.decoder = decoder
+        self.textdecoder = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, ):
+        """Read the next chunk into the buffer
+
+        :returns: False, if there is no more data
+        :rtype: :class:`bool`
+        """
+        if self.eof:
+            return False
+        # discard consumed text, so the buffer stays small
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.eof = True
+            self.buf += self.textdecoder.decode(b'', final=True)
+            return False
+        if isinstance(chunk, bytes):
+            chunk = self.textdecoder.decode(chunk)
+        self.buf += chunk
+        return True
+
+    def grow(self, ):
+        """Read chunks until the unconsumed text has at least doubled
+
+        Growing geometrically bounds how often a value, that spans
+        many chunks, is decoded again, so reading it stays linear.
+
+        :returns: False, if there is no more data
+        :rtype: :class:`bool`
+        """
+        size = len(self.buf) - self.pos
+        if not self.fill():
+            return False
+        while len(self.buf) - self.pos < 2 * size and self.fill():
+            pass
+        return True
+
+    def peek(self, ):
+        """Skip whitespace and return the next character
+
+        :returns: the next character or an empty string at the end
+        :rtype: :class:`str`
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        """Consume the next character, which has to be one of chars
+
+        :returns: the consumed character
+        :rtype: :class:`str`
+        :raises: :class:`ValueError`
+        """
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError('Expected one of %r at position %s, got %r'
+                             % (chars, self.pos, c))
+        self.pos += 1
+        return c
+
+    def value(self, ):
+        """Decode and consume the next json value
+
+        :returns: the decoded value
+        :raises: :class:`ValueError`
+        """
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self.grow():
+                    raise
+                continue
+            # a number at the end of the buffer might continue in the next chunk,
+            # e.g. the chunk ends with "1." or "1e"
+            if end == len(self.buf) or (self.buf[self.pos] in _NUMBER_START and
+                                        self.buf[end] in _NUMBER_CHARS):
+                if self.grow():
+                    continue
+            self.pos = end
+            return obj
+
+
+def iter_array(chunks, key, decoder=None):
+    """Yield the elements of the array under key of a json object
+
+    Only one element at a time is decoded. Values of other keys
+    are decoded and discarded. Reading stops at the end of the array.
+
+    :param chunks: the json document as an iterable of bytes or text
+    :type chunks: iterable
+    :param key: the key of the array in the top level object
+    :type key: :class:`str`
+    :param decoder: the decoder for the values. Defaults to :class:`json.JSONDecoder`.
+    :type decoder: :class:`json.JSONDecoder` | None
+    :returns: an iterator over the decoded elements
+    :rtype: iterator
+    :raises: :class:`ValueError` if the document is invalid,
+             :class:`KeyError` if the object has no such key
+    """
+    reader = _Reader(chunks, decoder or json.JSONDecoder())
+    reader.expect('{')
+    if reader.peek() == '}':
+        raise KeyError(key)
+    while True:
+        k = reader.value()
+        reader.expect(':')
+        if k == key and reader.peek() == '[':
+            break
+        reader.value()
+        if reader.expect(',}') == '}':
+            raise KeyError(key)
+
+    reader.expect('[')
+    if reader.peek() == ']':
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(',]') == ']':
+            return
+
+
+def iter_response_array(response, key, chunksize=CHUNKSIZE):
+    """Yield the elements of the array under key of a json response
+
+    Request the response with ``stream=True``. Otherwise the body
+    is already read completely.
+    See :func:`iter_array`.
+
+    :param response: the response with a json object
+    :type response: :class:`requests.Response`
+    :param key: the key of the array in the top level object
+    :type key: :class:`str`
+    :param chunksize: the number of bytes to read at a time
+    :type chunksize: :class:`int`
+    :returns: an iterator over the decoded elements
+    :rtype: iterator
+    :raises: :class:`ValueError` if the document is invalid,
+             :class:`KeyError` if the object has no such key
+    """
+    try:
+        for item in iter_array(response.iter_content(chunksize), key):
+            yield item
+    finally:
+        response.close()
@@ -0,0 +1,346 @@
+"""Metrics about the requests of a session
+
+Set :class:`Metrics` as :data:`pytwitcherapi.TwitchSession.metrics` to record
+latency, response sizes, status codes, retries and cache hits per endpoint::
+
+  from pytwitcherapi import metrics, session
+
+  ts = session.TwitchSession()
+  ts.metrics = metrics.Metrics()
+  ...
+  snapshot = ts.metrics.snapshot()
+  print(ts.metrics.to_prometheus())
+
+Path parameters are normalized, so ``channels/foo`` and ``channels/bar``
+are both recorded as ``kraken/channels/{name}``.
+"""
+from __future__ import absolute_import
+
+import bisect
+import re
+import threading
+
+from requests.compat import urlparse
+
+__all__ = ['Histogram', 'Metrics', 'get_response_size', 'normalize_endpoint']
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""Upper bounds of the latency buckets in seconds"""
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+"""Upper bounds of the response size buckets in bytes"""
+
+ENDPOINT_PATTERNS = [
+    (re.compile(r'^kraken/streams/(?!summary$|followed$|featured$)[^/]+$'), 'kraken/streams/{name}'),
+    (re.compile(r'^kraken/channels/[^/]+'), 'kraken/channels/{name}'),
+    (re.compile(r'^kraken/user/[^/]+'), 'kraken/user/{name}'),
+    (re.compile(r'^kraken/users/[^/]+'), 'kraken/users/{name}'),
+    (re.compile(r'^api/channels/[^/]+'), 'api/channels/{name}'),
+    (re.compile(r'(^|/)channel/hls/[^/]+\.m3u8$'), r'\1channel/hls/{name}.m3u8'),
+    (re.compile(r'^emoticons/v1/[^/]+/[^/]+$'), 'emoticons/v1/{id}/{size}'),
+]
+"""Patterns for paths with parameters and their replacement"""
+
+_DIGITS = re.compile(r'\d')
+
+
+def normalize_endpoint(url):
+    """Return the endpoint of the url with path parameters replaced
+
+    Paths, that match none of :data:`ENDPOINT_PATTERNS`, get every
+    segment with a digit replaced by ``{id}``.
+
+    :param url: the url of a request
+    :type url: :class:`str`
+    :returns: the endpoint, e.g. ``'kraken/channels/{name}'``
+    :rtype: :class:`str`
+    :raises: None
+    """
+    path = urlparse(url).path.strip('/')
+    for pattern, replacement in ENDPOINT_PATTERNS:
+        endpoint, n = pattern.subn(replacement, path, count=1)
+        if n:
+            return endpoint
+    return '/'.join('{id}' if _DIGITS.search(p) else p for p in path.split('/'))
+
+
+def get_response_size(response, stream=False):
+    """Return the size of the response body in bytes or None, if unknown
+
+    :param response: the response
+    :type response: :class:`requests.Response`
+    :param stream: True, if the body has not been read yet.
+                   It is not read to get the size.
+    :type stream: :class:`bool`
+    :returns: the size or None
+    :rtype: :class:`int` | None
+    :raises: None
+    """
+    length = response.headers.get('Content-Length')
+    if length is not None and length.isdigit():
+        return int(length)
+    if stream:
+        return None
+    return len(response.content or b'')
+
+
+class Histogram(object):
+    """Counts observations in buckets with upper bounds"""
+
+    def __init__(self, buckets):
+        """Initialize a new histogram
+
+        :param buckets: the sorted upper bounds of the buckets
+        :type buckets: :class:`tuple` of :class:`float`
+        :raises: None
+        """
+        super(Histogram, self).__init__()
+        self.buckets = buckets
+        """The upper bounds of the buckets"""
+        self.counts = [0] * (len(buckets) + 1)
+        """The number of observations per bucket. The last one is unbounded."""
+        self.sum = 0
+        """The sum of all observations"""
+        self.count = 0
+        """The number of observations"""
+
+    def observe(self, value):
+        """Count the value
+
+        :param value: the observed value
+        :type value: :class:`float`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self, ):
+        """Return the upper bounds with the number of observations up to each of them
+
+        :returns: pairs of upper bound and count. The last bound is ``float('inf')``.
+        :rtype: :class:`list` of (:class:`float`, :class:`int`)
+        :raises: None
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self, ):
+        """Return the state as plain data
+
+        :returns: ``{'buckets': [(bound, count), ...], 'sum': ..., 'count': ...}``
+        :rtype: :class:`dict`
+        :raises: None
+        """
+        return {'buckets': self.cumulative(), 'sum': self.sum, 'count': self.count}
+
+
+class _EndpointMetrics(object):
+    """The metrics of a single endpoint"""
+
+    def __init__(self, ):
+        """Initialize empty metrics
+
+        :raises: None
+        """
+        self.latency = Histogram(LATENCY_BUCKETS)
+        """Histogram of the latencies in seconds"""
+        self.size = Histogram(SIZE_BUCKETS)
+        """Histogram of the response sizes in bytes"""
+        self.statuses = {}
+        """Mapping of status codes, or ``'error'`` for failed requests, to their count"""
+        self.retries = 0
+        """The number of retried requests"""
+        self.cache_hits = 0
+        """The number of requests answered from the cache"""
+
+
+def _escape(value):
+    """Escape a prometheus label value"""
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_bound(bound):
+    """Format a bucket bound for the prometheus ``le`` label"""
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+class Metrics(object):
+    """Collects metrics about requests per method and endpoint
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, ):
+        """Initialize new, empty metrics
+
+        :raises: None
+        """
+        super(Metrics, self).__init__()
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _get(self, method, url):
+        """Return the metrics of the endpoint. Call with the lock held."""
+        key = (method.upper(), normalize_endpoint(url))
+        m = self._endpoints.get(key)
+        if m is None:
+            m = self._endpoints[key] = _EndpointMetrics()
+        return m
+
+    def record_response(self, method, url, seconds, response, stream=False):
+        """Record a response
+
+        The size is taken from the ``Content-Length`` header.
+        Without it, the size of streamed responses is unknown and not recorded.
+
+        :param method: the request method
+        :type method: :class:`str`
+        :param url: the url of the request
+        :type url: :class:`str`
+        :param seconds: the time until the response arrived
+        :type seconds: :class:`float`
+        :param response: the response
+        :type response: :class:`requests.Response`
+        :param stream: True, if the body has not been read yet
+        :type stream: :class:`bool`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        status = str(response.status_code)
+        size = get_response_size(response, stream)
+        with self._lock:
+            m = self._get(method, url)
+            m.latency.observe(seconds)
+            if size is not None:
+                m.size.observe(size)
+            m.statuses[status] = m.statuses.get(status, 0) + 1
+
+    def record_error(self, method, url, seconds):
+        """Record a request, that failed without a response, e.g. a timeout
+
+        The status is recorded as ``'error'``.
+
+        :param method: the request method
+        :type method: :class:`str`
+        :param url: the url of the request
+        :type url: :class:`str`
+        :param seconds: the time until the request failed
+        :type seconds: :class:`float`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            m = self._get(method, url)
+            m.latency.observe(seconds)
+            m.statuses['error'] = m.statuses.get('error', 0) + 1
+
+    def record_retry(self, method, url):
+        """Record that a request is retried
+
+        :param method: the request method
+        :type method: :class:`str`
+        :param url: the url of the request
+        :type url: :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            self._get(method, url).retries += 1
+
+    def record_cache_hit(self, method, url):
+        """Record that a request was answered from a cache
+
+        :param method: the request method
+        :type method: :class:`str`
+        :param url: the url of the request
+        :type url: :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            self._get(method, url).cache_hits += 1
+
+    def reset(self, ):
+        """Remove all recorded metrics
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self, ):
+        """Return the metrics as plain data
+
+        :returns: mapping of (method, endpoint) to a dict with the keys
+                  ``latency``, ``size`` (see :meth:`Histogram.snapshot`),
+                  ``statuses``, ``retries`` and ``cache_hits``
+        :rtype: :class:`dict`
+        :raises: None
+        """
+        with self._lock:
+            return dict((key, {'latency': m.latency.snapshot(),
+                               'size': m.size.snapshot(),
+                               'statuses': dict(m.statuses),
+                               'retries': m.retries,
+                               'cache_hits': m.cache_hits})
+                        for key, m in self._endpoints.items())
+
+    def to_prometheus(self, prefix='pytwitcherapi'):
+        """Return the metrics in the prometheus text exposition format
+
+        :param prefix: the prefix of the metric names
+        :type prefix: :class:`str`
+        :returns: the metrics
+        :rtype: :class:`str`
+        :raises: None
+        """
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+
+        def histogram(name, unit, helptext, field):
+            fullname = '%s_%s_%s' % (prefix, name, unit)
+            lines.append('# HELP %s %s' % (fullname, helptext))
+            lines.append('# TYPE %s histogram' % fullname)
+            for (method, endpoint), m in snapshot:
+                labels = 'method="%s",endpoint="%s"' % (_escape(method), _escape(endpoint))
+                h = m[field]
+                for bound, count in h['buckets']:
+                    lines.append('%s_bucket{%s,le="%s"} %s' % (fullname, labels,
+                                                               _format_bound(bound), count))
+                lines.append('%s_sum{%s} %s' % (fullname, labels, float(h['sum'])))
+                lines.append('%s_count{%s} %s' % (fullname, labels, h['count']))
+
+        def counter(name, helptext, field):
+            fullname = '%s_%s_total' % (prefix, name)
+            lines.append('# HELP %s %s' % (fullname, helptext))
+            lines.append('# TYPE %s counter' % fullname)
+            for (method, endpoint), m in snapshot:
+                labels = 'method="%s",endpoint="%s"' % (_escape(method), _escape(endpoint))
+                lines.append('%s{%s} %s' % (fullname, labels, m[field]))
+
+        histogram('request_duration', 'seconds', 'Time until the response arrived.', 'latency')
+        histogram('response_size', 'bytes', 'Size of the response bodies.', 'size')
+        fullname = '%s_responses_total' % prefix
+        lines.append('# HELP %s Responses by status code.' % fullname)
+        lines.append('# TYPE %s counter' % fullname)
+        for (method, endpoint), m in snapshot:
+            for status, count in sorted(m['statuses'].items()):
+                lines.append('%s{method="%s",endpoint="%s",status="%s"} %s'
+                             % (fullname, _escape(method), _escape(endpoint),
+                                _escape(status), count))
+        counter('retries', 'Retried requests.', 'retries')
+        counter('cache_hits', 'Requests answered from a cache.', 'cache_hits')
+        return '\n'.join(lines) + '\n'
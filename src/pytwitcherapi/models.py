@@ -1,5 +1,7 @@
 """Contains classes that wrap the jsons returned by the twitch.tv API"""
 
+from . import jsonutils
+
 __all__ = ['Game', 'Channel', 'Stream', 'User']
 
 
@@ -8,18 +10,21 @@ class Game(object):
     """
 
     @classmethod
-    def wrap_search(cls, response):
+    def wrap_search(cls, response, loads=None):
         """Wrap the response from a game search into instances
         and return them
 
         :param response: The response from searching a game
         :type response: :class:`requests.Response`
+        :param loads: the function to decode the json.
+                      See :func:`pytwitcherapi.jsonutils.decode`.
+        :type loads: callable | None
         :returns: the new game instances
         :rtype: :class:`list` of :class:`Game`
         :raises: None
         """
         games = []
-        json = response.json()
+        json = jsonutils.decode(response, loads)
         gamejsons = json['games']
         for j in gamejsons:
             g = cls.wrap_json(j)
@@ -27,18 +32,21 @@ class Game(object):
         return games
 
     @classmethod
-    def wrap_topgames(cls, response):
+    def wrap_topgames(cls, response, loads=None):
         """Wrap the response from quering the top games into instances
         and return them
 
         :param response: The response for quering the top games
         :type response: :class:`requests.Response`
+        :param loads: the function to decode the json.
+                      See :func:`pytwitcherapi.jsonutils.decode`.
+        :type loads: callable | None
         :returns: the new game instances
         :rtype: :class:`list` of :class:`Game`
         :raises: None
         """
         games = []
-        json = response.json()
+        json = jsonutils.decode(response, loads)
         topjsons = json['top']
         for t in topjsons:
             g = cls.wrap_json(json=t['game'],
@@ -47,6 +55,38 @@ class Game(object):
             games.append(g)
         return games
 
+    @classmethod
+    def iter_search(cls, response):
+        """Wrap the games of a game search one at a time
+
+        The response is decoded incrementally. Request it with ``stream=True``.
+
+        :param response: The response from searching a game
+        :type response: :class:`requests.Response`
+        :returns: an iterator over the new game instances
+        :rtype: iterator of :class:`Game`
+        :raises: None
+        """
+        for j in jsonutils.iter_response_array(response, 'games'):
+            yield cls.wrap_json(j)
+
+    @classmethod
+    def iter_topgames(cls, response):
+        """Wrap the top games one at a time
+
+        The response is decoded incrementally. Request it with ``stream=True``.
+
+        :param response: The response for quering the top games
+        :type response: :class:`requests.Response`
+        :returns: an iterator over the new game instances
+        :rtype: iterator of :class:`Game`
+        :raises: None
+        """
+        for t in jsonutils.iter_response_array(response, 'top'):
+            yield cls.wrap_json(json=t['game'],
+                                viewers=t['viewers'],
+                                channels=t['channels'])
+
     @classmethod
     def wrap_json(cls, json, viewers=None, channels=None):
         """Create a Game instance for the given json
@@ -116,18 +156,21 @@ class Channel(object):
     """
 
     @classmethod
-    def wrap_search(cls, response):
+    def wrap_search(cls, response, loads=None):
         """Wrap the response from a channel search into instances
         and return them
 
         :param response: The response from searching a channel
         :type response: :class:`requests.Response`
+        :param loads: the function to decode the json.
+                      See :func:`pytwitcherapi.jsonutils.decode`.
+        :type loads: callable | None
         :returns: the new channel instances
         :rtype: :class:`list` of :class:`channel`
         :raises: None
         """
         channels = []
-        json = response.json()
+        json = jsonutils.decode(response, loads)
         channeljsons = json['channels']
         for j in channeljsons:
             c = cls.wrap_json(j)
@@ -135,17 +178,35 @@ class Channel(object):
         return channels
 
     @classmethod
-    def wrap_get_channel(cls, response):
+    def iter_search(cls, response):
+        """Wrap the channels of a channel search one at a time
+
+        The response is decoded incrementally. Request it with ``stream=True``.
+
+        :param response: The response from searching a channel
+        :type response: :class:`requests.Response`
+        :returns: an iterator over the new channel instances
+        :rtype: iterator of :class:`Channel`
+        :raises: None
+        """
+        for j in jsonutils.iter_response_array(response, 'channels'):
+            yield cls.wrap_json(j)
+
+    @classmethod
+    def wrap_get_channel(cls, response, loads=None):
         """Wrap the response from getting a channel into an instance
         and return it
 
         :param response: The response from getting a channel
         :type response: :class:`requests.Response`
+        :param loads: the function to decode the json.
+                      See :func:`pytwitcherapi.jsonutils.decode`.
+        :type loads: callable | None
         :returns: the new channel instance
         :rtype: :class:`list` of :class:`channel`
         :raises: None
         """
-        json = response.json()
+        json = jsonutils.decode(response, loads)
         c = cls.wrap_json(json)
         return c
 
@@ -261,18 +322,21 @@ class Stream(object):
     """
 
     @classmethod
-    def wrap_search(cls, response):
+    def wrap_search(cls, response, loads=None):
         """Wrap the response from a stream search into instances
         and return them
 
         :param response: The response from searching a stream
         :type response: :class:`requests.Response`
+        :param loads: the function to decode the json.
+                      See :func:`pytwitcherapi.jsonutils.decode`.
+        :type loads: callable | None
         :returns: the new stream instances
         :rtype: :class:`list` of :class:`stream`
         :raises: None
         """
         streams = []
-        json = response.json()
+        json = jsonutils.decode(response, loads)
         streamjsons = json['streams']
         for j in streamjsons:
             s = cls.wrap_json(j)
@@ -280,17 +344,35 @@ class Stream(object):
         return streams
 
     @classmethod
-    def wrap_get_stream(cls, response):
+    def iter_search(cls, response):
+        """Wrap the streams of a stream search or query one at a time
+
+        The response is decoded incrementally. Request it with ``stream=True``.
+
+        :param response: The response from searching or querying streams
+        :type response: :class:`requests.Response`
+        :returns: an iterator over the new stream instances
+        :rtype: iterator of :class:`Stream`
+        :raises: None
+        """
+        for j in jsonutils.iter_response_array(response, 'streams'):
+            yield cls.wrap_json(j)
+
+    @classmethod
+    def wrap_get_stream(cls, response, loads=None):
         """Wrap the response from getting a stream into an instance
         and return it
 
         :param response: The response from getting a stream
         :type response: :class:`requests.Response`
+        :param loads: the function to decode the json.
+                      See :func:`pytwitcherapi.jsonutils.decode`.
+        :type loads: callable | None
         :returns: the new stream instance
         :rtype: :class:`list` of :class:`stream`
         :raises: None
         """
-        json = response.json()
+        json = jsonutils.decode(response, loads)
         s = cls.wrap_json(json['stream'])
         return s
 
@@ -357,17 +439,20 @@ class User(object):
     """
 
     @classmethod
-    def wrap_get_user(cls, response):
+    def wrap_get_user(cls, response, loads=None):
         """Wrap the response from getting a user into an instance
         and return it
 
         :param response: The response from getting a user
         :type response: :class:`requests.Response`
+        :param loads: the function to decode the json.
+                      See :func:`pytwitcherapi.jsonutils.decode`.
+        :type loads: callable | None
         :returns: the new user instance
         :rtype: :class:`list` of :class:`User`
         :raises: None
         """
-        json = response.json()
+        json = jsonutils.decode(response, loads)
         u = cls.wrap_json(json)
         return u
 
@@ -16,7 +16,6 @@ import os
 import sys
 
 import oauthlib.oauth2
-import pkg_resources
 
 from pytwitcherapi import constants
 
@@ -79,6 +78,8 @@ class RedirectHandler(server.BaseHTTPRequestHandler):
         :rtype: None
         :raises: None
         """
+        # pkg_resources takes long to import and is only needed for the login
+        import pkg_resources
         datapath = os.path.join('html', filename)
         sitepath = pkg_resources.resource_filename('pytwitcherapi', datapath)
         with open(sitepath, 'r') as f:
@@ -0,0 +1,297 @@
+"""Client side rate limiting
+
+Twitch limits the number of requests a client can make.
+A :class:`RateLimiter` on :data:`pytwitcherapi.TwitchSession.ratelimiter`
+delays requests, so the session stays within the limits instead of
+getting ``429 Too Many Requests`` responses::
+
+  from pytwitcherapi import ratelimit, session
+
+  ts = session.TwitchSession()
+  ts.ratelimiter = ratelimit.RateLimiter(
+      {session.TWITCH_KRAKENURL: ratelimit.TokenBucket(rate=10, capacity=20),
+       session.TWITCH_USHERURL: ratelimit.TokenBucket(rate=5),
+       session.TWITCH_APIURL: ratelimit.TokenBucket(rate=5)})
+
+The buckets adapt to the ``Ratelimit-Remaining``, ``Ratelimit-Reset``
+and ``Retry-After`` headers of the responses.
+"""
+from __future__ import absolute_import
+
+import email.utils
+import logging
+import threading
+import time
+
+__all__ = ['TokenBucket', 'RateLimiter']
+
+log = logging.getLogger(__name__)
+
+MIN_RATE = 0.01
+"""The rate a bucket never drops below, in requests per second"""
+
+
+def parse_retry_after(value, now):
+    """Return the seconds to wait for the value of a ``Retry-After`` header
+
+    :param value: either seconds or a http date
+    :type value: :class:`str`
+    :param now: the current unix time
+    :type now: :class:`float`
+    :returns: the seconds to wait or None, if the value is invalid
+    :rtype: :class:`float` | None
+    :raises: None
+    """
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(date) - now)
+
+
+def _get_number(headers, name):
+    """Return the header value as a float or None if missing or invalid
+
+    :param headers: the response headers
+    :type headers: :class:`dict`
+    :param name: the header name
+    :type name: :class:`str`
+    :returns: the value
+    :rtype: :class:`float` | None
+    :raises: None
+    """
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket(object):
+    """Token bucket that limits the rate of requests
+
+    Every request takes a token. Tokens are refilled with
+    :data:`TokenBucket.rate` per second up to :data:`TokenBucket.capacity`.
+    If no token is left, :meth:`TokenBucket.acquire` blocks until one is available.
+
+    The bucket is thread-safe. Waiting threads are served in order.
+
+    On a ``429`` response, the rate is halved. Every successful response
+    increases it again until the configured rate is reached.
+    """
+
+    def __init__(self, rate, capacity=None, timer=time.time, sleep=time.sleep):
+        """Initialize a new token bucket
+
+        :param rate: the sustained number of requests per second
+        :type rate: :class:`float`
+        :param capacity: the maximum burst size. Defaults to the rate,
+                         but at least one.
+        :type capacity: :class:`float` | None
+        :param timer: function that returns the current time in seconds
+        :type timer: callable
+        :param sleep: function to wait the given seconds
+        :type sleep: callable
+        :raises: None
+        """
+        super(TokenBucket, self).__init__()
+        self.rate = rate
+        """The configured number of requests per second"""
+        self.capacity = capacity or max(1.0, rate)
+        """The maximum burst size"""
+        self.timer = timer
+        """Function that returns the current time in seconds"""
+        self.sleep = sleep
+        """Function to wait the given seconds"""
+        self.tokens = self.capacity
+        """The currently available tokens. Negative when requests are waiting."""
+        self.factor = 1.0
+        """Factor for :data:`TokenBucket.rate`, lowered after ``429`` responses"""
+        self._last = timer()
+        self._paused_until = 0.0
+        self._throttled_rate = None
+        self._throttled_until = 0.0
+        self._lock = threading.Lock()
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s %s/s, tokens: %.2f>' % (self.__class__.__name__,
+                                            self.rate, self.tokens)
+
+    def get_rate(self, now=None):
+        """Return the current rate
+
+        This is :data:`TokenBucket.rate` adjusted by the backoff
+        factor and the rate limit headers of the last response.
+
+        :param now: the current time. Defaults to :data:`TokenBucket.timer`.
+        :type now: :class:`float` | None
+        :returns: requests per second
+        :rtype: :class:`float`
+        :raises: None
+        """
+        if now is None:
+            now = self.timer()
+        rate = self.rate * self.factor
+        if self._throttled_rate is not None and now < self._throttled_until:
+            rate = min(rate, self._throttled_rate)
+        return max(rate, MIN_RATE)
+
+    def _refill(self, now):
+        """Add the tokens that accumulated since the last refill
+
+        :param now: the current time
+        :type now: :class:`float`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        elapsed = max(0.0, now - self._last)
+        self._last = max(self._last, now)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.get_rate(now))
+
+    def acquire(self, ):
+        """Take a token and wait until the request may be sent
+
+        :returns: the seconds waited
+        :rtype: :class:`float`
+        :raises: None
+        """
+        with self._lock:
+            now = self.timer()
+            self._refill(now)
+            self.tokens -= 1
+            # waiting callers queue up behind the pause at the current rate
+            wait = max(0.0, self._paused_until - now)
+            if self.tokens < 0:
+                wait += -self.tokens / self.get_rate(now)
+        if wait > 0:
+            log.debug('Rate limit reached. Waiting %.2fs.', wait)
+            self.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Do not allow any requests for the given time
+
+        :param seconds: the time to pause
+        :type seconds: :class:`float`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            now = self.timer()
+            self._refill(now)
+            until = now + seconds
+            self._paused_until = max(self._paused_until, until)
+            self._last = max(self._last, self._paused_until)
+            self.tokens = min(self.tokens, 0.0)
+
+    def update(self, response):
+        """Adjust the bucket to the rate limit information of a response
+
+        :param response: the response of a request
+        :type response: :class:`requests.Response`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        headers = response.headers
+        now = self.timer()
+        retryafter = headers.get('Retry-After')
+        if retryafter is not None:
+            seconds = parse_retry_after(retryafter, now)
+            if seconds:
+                self.pause(seconds)
+        remaining = _get_number(headers, 'Ratelimit-Remaining')
+        reset = _get_number(headers, 'Ratelimit-Reset')
+        with self._lock:
+            if response.status_code == 429:
+                self.factor = max(self.factor / 2.0, MIN_RATE / max(self.rate, MIN_RATE))
+                log.debug('Too many requests. Lowering rate to %.2f/s.', self.get_rate(now))
+            elif response.status_code < 400 and self.factor < 1.0:
+                self.factor = min(1.0, self.factor + 0.1)
+            if remaining is None:
+                return
+            self.tokens = min(self.tokens, remaining)
+            if reset is not None and reset > now:
+                # spread the remaining requests until the reset
+                self._throttled_rate = remaining / (reset - now)
+                self._throttled_until = reset
+                if remaining < 1:
+                    self._paused_until = max(self._paused_until, reset)
+
+
+class RateLimiter(object):
+    """Rate limits for requests to different base urls
+
+    Each base url has its own :class:`TokenBucket`.
+    Requests to urls, that do not start with one of the base urls,
+    are not limited.
+    """
+
+    def __init__(self, buckets=None):
+        """Initialize a new rate limiter
+
+        :param buckets: mapping of base urls to buckets
+        :type buckets: :class:`dict` | None
+        :raises: None
+        """
+        super(RateLimiter, self).__init__()
+        self.buckets = dict(buckets or {})
+        """Mapping of base urls to :class:`TokenBucket`"""
+
+    def get_bucket(self, url):
+        """Return the bucket for the longest base url that matches the url
+
+        :param url: the url of a request
+        :type url: :class:`str`
+        :returns: the bucket or None
+        :rtype: :class:`TokenBucket` | None
+        :raises: None
+        """
+        best = None
+        for baseurl in self.buckets:
+            if url.startswith(baseurl) and (best is None or len(baseurl) > len(best)):
+                best = baseurl
+        if best is not None:
+            return self.buckets[best]
+
+    def acquire(self, url):
+        """Wait until a request to the url may be sent
+
+        :param url: the url of the request
+        :type url: :class:`str`
+        :returns: the seconds waited
+        :rtype: :class:`float`
+        :raises: None
+        """
+        bucket = self.get_bucket(url)
+        if bucket is None:
+            return 0.0
+        return bucket.acquire()
+
+    def update(self, url, response):
+        """Adjust the bucket of the url to the response
+
+        :param url: the url of the request
+        :type url: :class:`str`
+        :param response: the response of a request
+        :type response: :class:`requests.Response`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        bucket = self.get_bucket(url)
+        if bucket is not None:
+            bucket.update(response)
@@ -0,0 +1,244 @@
+"""Policies for failing requests
+
+A :class:`RetryPolicy` on :data:`pytwitcherapi.TwitchSession.retry` retries
+idempotent requests with jittered exponential backoff.
+A :class:`CircuitBreaker` on :data:`pytwitcherapi.TwitchSession.circuitbreaker`
+rejects requests to a host that failed too often recently, instead of
+waiting for it::
+
+  from pytwitcherapi import retry, session
+
+  ts = session.TwitchSession()
+  ts.timeout = 5
+  ts.deadline = 20
+  ts.retry = retry.RetryPolicy(retries=3)
+  ts.circuitbreaker = retry.CircuitBreaker(threshold=5, resettimeout=30)
+  ts.hedge_after = 1.0
+"""
+from __future__ import absolute_import
+
+import logging
+import random
+import threading
+import time
+
+from . import exceptions, ratelimit
+
+__all__ = ['RetryPolicy', 'CircuitBreaker']
+
+log = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+"""Methods that can be retried and hedged safely"""
+
+
+class RetryPolicy(object):
+    """Decides if and when a failed request is retried
+
+    The delay before retry ``n`` (starting at 0) is a random
+    value between 0 and ``min(maxbackoff, backoff * 2 ** n)``.
+    If the response has a ``Retry-After`` header, the delay is at least that long.
+    """
+
+    def __init__(self, retries=3, backoff=0.5, maxbackoff=10.0,
+                 statuses=(429, 500, 502, 503, 504),
+                 methods=IDEMPOTENT_METHODS, random=random.random):
+        """Initialize a new retry policy
+
+        :param retries: the maximum number of retries
+        :type retries: :class:`int`
+        :param backoff: the base delay in seconds
+        :type backoff: :class:`float`
+        :param maxbackoff: the maximum delay in seconds
+        :type maxbackoff: :class:`float`
+        :param statuses: status codes of responses that are retried
+        :type statuses: :class:`tuple` of :class:`int`
+        :param methods: request methods, that are retried
+        :type methods: :class:`tuple` of :class:`str`
+        :param random: function that returns a random float in [0, 1)
+        :type random: callable
+        :raises: None
+        """
+        super(RetryPolicy, self).__init__()
+        self.retries = retries
+        """The maximum number of retries"""
+        self.backoff = backoff
+        """The base delay in seconds"""
+        self.maxbackoff = maxbackoff
+        """The maximum delay in seconds"""
+        self.statuses = statuses
+        """Status codes of responses that are retried"""
+        self.methods = methods
+        """Request methods, that are retried"""
+        self.random = random
+        """Function that returns a random float in [0, 1)"""
+
+    def is_retryable(self, method, attempt, response=None):
+        """Return True, if the request should be retried
+
+        Either response is given or the request raised
+        a connection error or timeout.
+
+        :param method: the request method
+        :type method: :class:`str`
+        :param attempt: the number of retries so far
+        :type attempt: :class:`int`
+        :param response: the response or None if the request failed.
+        :type response: :class:`requests.Response` | None
+        :returns: True, if the request should be retried
+        :rtype: :class:`bool`
+        :raises: None
+        """
+        if attempt >= self.retries or method.upper() not in self.methods:
+            return False
+        return response is None or response.status_code in self.statuses
+
+    def get_delay(self, attempt, response=None):
+        """Return the seconds to wait before the next attempt
+
+        :param attempt: the number of retries so far
+        :type attempt: :class:`int`
+        :param response: the failed response or None
+        :type response: :class:`requests.Response` | None
+        :returns: the delay in seconds
+        :rtype: :class:`float`
+        :raises: None
+        """
+        delay = self.random() * min(self.maxbackoff, self.backoff * 2 ** attempt)
+        if response is not None:
+            retryafter = response.headers.get('Retry-After')
+            if retryafter is not None:
+                delay = max(delay, ratelimit.parse_retry_after(retryafter, time.time()) or 0)
+        return delay
+
+
+class _Circuit(object):
+    """State of the circuit for a single host"""
+
+    def __init__(self):
+        """Initialize a new, closed circuit
+
+        :raises: None
+        """
+        self.failures = 0
+        """The number of consecutive failures"""
+        self.openeduntil = None
+        """The time until requests are rejected or None, if the circuit is closed"""
+
+
+class CircuitBreaker(object):
+    """Fail fast when a host is unhealthy
+
+    After :data:`CircuitBreaker.threshold` consecutive failures,
+    requests to the host raise :class:`pytwitcherapi.exceptions.CircuitOpenError`
+    for :data:`CircuitBreaker.resettimeout` seconds.
+    Afterwards a single trial request is let through. If it succeeds,
+    the circuit closes again, else it stays open for another period.
+
+    Connection errors, timeouts and ``5xx`` responses count as failures.
+    """
+
+    def __init__(self, threshold=5, resettimeout=30.0, timer=time.time):
+        """Initialize a new circuit breaker
+
+        :param threshold: the number of consecutive failures that open the circuit
+        :type threshold: :class:`int`
+        :param resettimeout: the seconds a circuit stays open
+        :type resettimeout: :class:`float`
+        :param timer: function that returns the current time in seconds
+        :type timer: callable
+        :raises: None
+        """
+        super(CircuitBreaker, self).__init__()
+        self.threshold = threshold
+        """The number of consecutive failures that open the circuit"""
+        self.resettimeout = resettimeout
+        """The seconds a circuit stays open"""
+        self.timer = timer
+        """Function that returns the current time in seconds"""
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _get_circuit(self, host):
+        """Return the circuit of the host and create it if necessary.
+        Call with the lock held.
+
+        :param host: the host, e.g. ``'api.twitch.tv'``
+        :type host: :class:`str`
+        :returns: the circuit
+        :rtype: :class:`_Circuit`
+        :raises: None
+        """
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _Circuit()
+        return circuit
+
+    def is_open(self, host):
+        """Return True, if requests to the host are rejected at the moment
+
+        :param host: the host, e.g. ``'api.twitch.tv'``
+        :type host: :class:`str`
+        :returns: True, if the circuit is open
+        :rtype: :class:`bool`
+        :raises: None
+        """
+        with self._lock:
+            circuit = self._circuits.get(host)
+            return circuit is not None and circuit.openeduntil is not None and\
+                circuit.openeduntil > self.timer()
+
+    def before_request(self, host):
+        """Check if a request to the host may be sent
+
+        If the reset timeout of an open circuit has passed,
+        this request is the trial request and other requests are
+        rejected until it finished.
+
+        :param host: the host, e.g. ``'api.twitch.tv'``
+        :type host: :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: :class:`pytwitcherapi.exceptions.CircuitOpenError`
+        """
+        with self._lock:
+            circuit = self._get_circuit(host)
+            if circuit.openeduntil is None:
+                return
+            now = self.timer()
+            if circuit.openeduntil > now:
+                raise exceptions.CircuitOpenError('Circuit for %s is open.' % host)
+            # let one trial request through
+            circuit.openeduntil = now + self.resettimeout
+
+    def record_success(self, host):
+        """Record a successful request and close the circuit
+
+        :param host: the host, e.g. ``'api.twitch.tv'``
+        :type host: :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            circuit = self._get_circuit(host)
+            if circuit.openeduntil is not None:
+                log.debug('Closing circuit for %s.', host)
+            circuit.failures = 0
+            circuit.openeduntil = None
+
+    def record_failure(self, host):
+        """Record a failed request and open the circuit, if it failed too often
+
+        :param host: the host, e.g. ``'api.twitch.tv'``
+        :type host: :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        with self._lock:
+            circuit = self._get_circuit(host)
+            circuit.failures += 1
+            if circuit.failures >= self.threshold:
+                log.debug('Opening circuit for %s after %s failures.', host, circuit.failures)
+                circuit.openeduntil = self.timer() + self.resettimeout
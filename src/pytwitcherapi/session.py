@@ -1,10 +1,13 @@
 """API for communicating with twitch"""
 from __future__ import absolute_import
 
+import concurrent.futures
 import functools
+import json
 import logging
 import os
 import threading
+import time
 
 import m3u8
 import oauthlib.oauth2
@@ -14,7 +17,7 @@ import requests_oauthlib
 
 from pytwitcherapi.chat import client
 
-from . import constants, exceptions, models, oauth
+from . import cache, concurrency, constants, exceptions, models, oauth, retry
 
 __all__ = ['needs_auth', 'TwitchSession']
 
@@ -45,6 +48,47 @@ Use environment variable ``PYTWITCHER_CLIENT_ID`` or pytwitcher default value.
 SCOPES = ['user_read', 'chat_login']
 """The scopes that PyTwitcher needs"""
 
+MAX_PAGESIZE = 100
+"""The maximum number of results kraken returns for a single request"""
+
+EMOTE_CACHE_MAXBYTES = 8 * 1024 * 1024
+"""The maximum size of the emote pictures kept in memory"""
+
+STREAMS_CHUNKSIZE = 100
+"""The number of channels, that are queried with a single request
+by :meth:`TwitchSession.get_streams_bulk`"""
+
+ACCESS_TOKEN_REFRESH_MARGIN = 60
+"""Seconds before a channel access token expires, when a new one is requested"""
+
+PLAYLIST_CACHE_TTL = 15
+"""Seconds a master playlist of a channel is reused"""
+
+QUALITY_OPTIONS = {'chunked': 'source',
+                   'high': 'high',
+                   'medium': 'medium',
+                   'low': 'low',
+                   'mobile': 'mobile',
+                   'audio_only': 'audio'}
+"""Mapping of the group ids in a master playlist to quality options"""
+
+CHAT_SERVERS_CACHE_TTL = 600
+"""Seconds the chat servers of a channel are reused"""
+
+CHAT_STATUS_REFRESH_INTERVAL = 60
+"""Seconds the status of the chat servers is reused by all sessions"""
+
+DEFAULT_MAXWORKERS = 8
+"""Default number of requests a session issues at the same time,
+when a method needs multiple round trips"""
+
+
+_chat_status_cache = cache.TTLCache(maxsize=1)
+"""Process-wide cache for the chat server status"""
+
+_chat_status_flight = concurrency.SingleFlight()
+"""Coalesces concurrent requests for the chat server status of all sessions"""
+
 
 def needs_auth(meth):
     """Wraps a method of :class:`TwitchSession` and
@@ -65,6 +109,118 @@ def needs_auth(meth):
     return wrapped
 
 
+def get_streams_params(game=None, channels=None, limit=25, offset=0):
+    """Return the query parameters of the kraken ``streams`` endpoint
+
+    See :meth:`TwitchSession.get_streams`.
+
+    :param game: the game or name of the game
+    :type game: :class:`str` | :class:`models.Game`
+    :param channels: list of models.Channels or channel names (can be mixed)
+    :type channels: :class:`list` of :class:`models.Channel` or :class:`str`
+    :param limit: maximum number of results
+    :type limit: :class:`int`
+    :param offset: offset for pagination
+    :type offset: :class:`int`
+    :returns: the parameters
+    :rtype: :class:`dict`
+    :raises: None
+    """
+    if isinstance(game, models.Game):
+        game = game.name
+
+    channelnames = []
+    cparam = None
+    if channels:
+        for c in channels:
+            if isinstance(c, models.Channel):
+                c = c.name
+            channelnames.append(c)
+        cparam = ','.join(channelnames)
+
+    return {'limit': limit,
+            'offset': offset,
+            'game': game,
+            'channel': cparam}
+
+
+def _game_key(game):
+    """Return the identifier of a game for detecting duplicates"""
+    return game.name
+
+
+def _channel_key(channel):
+    """Return the identifier of a channel for detecting duplicates"""
+    return channel.name
+
+
+def _stream_key(stream):
+    """Return the identifier of a stream for detecting duplicates"""
+    return stream.channel.name
+
+
+def _get_access_token_ttl(token):
+    """Return the seconds until the given channel access token expires
+
+    :param token: the token json with an ``expires`` unix timestamp
+    :type token: :class:`str`
+    :returns: the seconds until expiry or 0, if unknown
+    :rtype: :class:`float`
+    :raises: None
+    """
+    try:
+        expires = json.loads(token)['expires']
+        return float(expires) - time.time()
+    except (ValueError, TypeError, KeyError):
+        return 0
+
+
+def _get_request_key(url, params, headers, token):
+    """Return a hashable key for a GET request
+
+    The params may take any form, that :class:`requests.Request` accepts.
+    They are encoded into the url.
+
+    :param url: the url
+    :type url: :class:`str`
+    :param params: the query parameters
+    :type params: :class:`dict` | :class:`list` | :class:`str` | None
+    :param headers: the headers
+    :type headers: :class:`dict` | None
+    :param token: the oauth access token
+    :type token: :class:`str` | None
+    :returns: the key
+    :rtype: :class:`tuple`
+    :raises: :class:`requests.exceptions.RequestException` if the url is invalid
+    """
+    if isinstance(params, dict):
+        params = sorted(params.items())
+    prepared = requests.Request('GET', url, params=params, headers=headers).prepare()
+    return prepared.url, tuple(sorted(prepared.headers.items())), token
+
+
+def _clamp_timeout(timeout, remaining):
+    """Return the timeout, but at most the remaining time until the deadline
+
+    :param timeout: seconds, a ``(connect, read)`` tuple like for :mod:`requests` or None
+    :type timeout: :class:`float` | :class:`tuple` | None
+    :param remaining: the seconds until the deadline
+    :type remaining: :class:`float`
+    :returns: the timeout. A tuple is clamped element wise.
+    :rtype: :class:`float` | :class:`tuple`
+    :raises: None
+    """
+    if isinstance(timeout, tuple):
+        return tuple(_clamp_timeout(t, remaining) for t in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def _close_response(future):
+    """Close the response of a finished future, e.g. of a lost hedged request"""
+    if future.exception() is None:
+        future.result().close()
+
+
 class OAuthSession(requests_oauthlib.OAuth2Session):
     """Session with oauth2 support.
 
@@ -85,29 +241,191 @@ class OAuthSession(requests_oauthlib.OAuth2Session):
         """The server that handles the login redirect"""
         self.login_thread = None
         """The thread that serves the login server"""
+        self.ratelimiter = None
+        """A :class:`pytwitcherapi.ratelimit.RateLimiter` that delays requests.
+        If None, requests are not limited."""
+        self.timeout = None
+        """Default timeout in seconds for connecting and reading
+        a response of a single request. If None, wait forever."""
+        self.deadline = None
+        """The seconds a request may take in total, including retries.
+        If None, there is no deadline."""
+        self.retry = None
+        """A :class:`pytwitcherapi.retry.RetryPolicy` for failed requests.
+        If None, requests are not retried."""
+        self.hedge_after = None
+        """Seconds after which an idempotent request, that has not been answered
+        yet, is sent a second time. The first response is used.
+        If None, requests are not hedged."""
+        self.circuitbreaker = None
+        """A :class:`pytwitcherapi.retry.CircuitBreaker`, that rejects requests
+        to unhealthy hosts. If None, every request is sent."""
+        self.metrics = None
+        """A :class:`pytwitcherapi.metrics.Metrics`, that records latency, size
+        and status of every request per endpoint. If None, nothing is recorded."""
 
     def request(self, method, url, **kwargs):
         """Constructs a :class:`requests.Request`, prepares it and sends it.
         Raises HTTPErrors by default.
 
+        If :data:`OAuthSession.ratelimiter` is set, the request might be delayed.
+        Failed requests are retried according to :data:`OAuthSession.retry`.
+        Idempotent requests are hedged after :data:`OAuthSession.hedge_after` seconds.
+        Requests to unhealthy hosts fail fast, if :data:`OAuthSession.circuitbreaker` is set.
+        Every attempt is recorded in :data:`OAuthSession.metrics`, if set.
+
         :param method: method for the new :class:`Request` object.
         :type method: :class:`str`
         :param url: URL for the new :class:`Request` object.
         :type url: :class:`str`
-        :param kwargs: keyword arguments of :meth:`requests.Session.request`
+        :param kwargs: keyword arguments of :meth:`requests.Session.request`.
+                       Additionally ``deadline`` overrides :data:`OAuthSession.deadline`.
         :returns: a resonse object
         :rtype: :class:`requests.Response`
-        :raises: :class:`requests.HTTPError`
+        :raises: :class:`requests.HTTPError`, :class:`requests.Timeout`,
+                 :class:`pytwitcherapi.exceptions.CircuitOpenError`
         """
         if oauthlib.oauth2.is_secure_transport(url):
             m = super(OAuthSession, self).request
         else:
             m = super(requests_oauthlib.OAuth2Session, self).request
+        timeout = kwargs.pop('timeout', self.timeout)
+        deadline = kwargs.pop('deadline', self.deadline)
+        if deadline is not None:
+            deadline += time.time()
+        host = requests.compat.urlparse(url).netloc
+        attempt = 0
+        while True:
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise requests.Timeout('Deadline exceeded for %s "%s".' % (method, url))
+                kwargs['timeout'] = _clamp_timeout(timeout, remaining)
+            elif timeout is not None:
+                kwargs['timeout'] = timeout
+            if self.circuitbreaker is not None:
+                self.circuitbreaker.before_request(host)
+            started = time.time()
+            try:
+                response = self._send(m, method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if self.metrics is not None:
+                    self.metrics.record_error(method, url, time.time() - started)
+                self._record_result(host, None)
+                delay = self._get_retry_delay(method, attempt, deadline)
+                if delay is None:
+                    raise
+            else:
+                if self.metrics is not None:
+                    self.metrics.record_response(method, url, time.time() - started, response,
+                                                 kwargs.get('stream', False))
+                self._record_result(host, response)
+                delay = self._get_retry_delay(method, attempt, deadline, response)
+                if delay is None:
+                    response.raise_for_status()
+                    return response
+                # release the connection of the discarded response
+                response.close()
+            attempt += 1
+            if self.metrics is not None:
+                self.metrics.record_retry(method, url)
+            log.debug('Retrying %s "%s" in %.2fs.', method, url, delay)
+            time.sleep(delay)
+
+    def _send(self, m, method, url, **kwargs):
+        """Send the request and hedge it, if :data:`OAuthSession.hedge_after` is set
+
+        :param m: the request method of the super class to use
+        :type m: callable
+        :param method: the request method
+        :type method: :class:`str`
+        :param url: the url
+        :type url: :class:`str`
+        :param kwargs: keyword arguments of :meth:`requests.Session.request`
+        :returns: a resonse object
+        :rtype: :class:`requests.Response`
+        :raises: :class:`requests.RequestException`
+        """
+        if self.hedge_after is None or method.upper() not in retry.IDEMPOTENT_METHODS:
+            return self._send_once(m, method, url, **kwargs)
+        futures = [concurrency.run_in_thread(self._send_once, m, method, url, **kwargs)]
+        done, pending = concurrent.futures.wait(futures, timeout=self.hedge_after)
+        if not done:
+            log.debug('No response after %.2fs. Hedging %s "%s".', self.hedge_after, method, url)
+            futures.append(concurrency.run_in_thread(self._send_once, m, method, url, **kwargs))
+        for future in concurrent.futures.as_completed(futures):
+            if future.exception() is None:
+                winner = future
+                break
+        else:
+            return futures[0].result()
+        for future in futures:
+            if future is not winner:
+                future.add_done_callback(_close_response)
+        return winner.result()
+
+    def _send_once(self, m, method, url, **kwargs):
+        """Send a single request and respect the :data:`OAuthSession.ratelimiter`
+
+        :param m: the request method of the super class to use
+        :type m: callable
+        :param method: the request method
+        :type method: :class:`str`
+        :param url: the url
+        :type url: :class:`str`
+        :param kwargs: keyword arguments of :meth:`requests.Session.request`
+        :returns: a resonse object
+        :rtype: :class:`requests.Response`
+        :raises: :class:`requests.RequestException`
+        """
+        if self.ratelimiter is not None:
+            self.ratelimiter.acquire(url)
         log.debug("%s \"%s\" with %s", method, url, kwargs)
         response = m(method, url, **kwargs)
-        response.raise_for_status()
+        if self.ratelimiter is not None:
+            self.ratelimiter.update(url, response)
         return response
 
+    def _record_result(self, host, response):
+        """Record the outcome of a request in the :data:`OAuthSession.circuitbreaker`
+
+        :param host: the host of the request
+        :type host: :class:`str`
+        :param response: the response or None, if the request failed.
+        :type response: :class:`requests.Response` | None
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        if self.circuitbreaker is None:
+            return
+        if response is None or response.status_code >= 500:
+            self.circuitbreaker.record_failure(host)
+        else:
+            self.circuitbreaker.record_success(host)
+
+    def _get_retry_delay(self, method, attempt, deadline, response=None):
+        """Return the delay before retrying the request or None
+
+        :param method: the request method
+        :type method: :class:`str`
+        :param attempt: the number of retries so far
+        :type attempt: :class:`int`
+        :param deadline: the time when the request has to be finished or None
+        :type deadline: :class:`float` | None
+        :param response: the response or None, if the request failed.
+        :type response: :class:`requests.Response` | None
+        :returns: the delay in seconds or None, if the request should not be retried
+        :rtype: :class:`float` | None
+        :raises: None
+        """
+        if self.retry is None or not self.retry.is_retryable(method, attempt, response):
+            return None
+        delay = self.retry.get_delay(attempt, response)
+        if deadline is not None and time.time() + delay >= deadline:
+            return None
+        return delay
+
     def start_login_server(self, ):
         """Start a server that will get a request from a user logging in.
 
@@ -180,13 +498,57 @@ class TwitchSession(OAuthSession):
 
         :raises: None
         """
+        # the token setter needs them during the initialization of the super class
+        self._current_user = None
+        self._current_user_lock = threading.Lock()
         super(TwitchSession, self).__init__()
         self.baseurl = ''
         """The baseurl that gets prepended to every request url"""
-        self.current_user = None
-        """The currently logined user."""
         self._token = None
         """The oauth token"""
+        self.token_store = None
+        """A :class:`pytwitcherapi.tokenstore.TokenStore`, that saves the token
+        and :data:`TwitchSession.current_user` after the login.
+        See :meth:`TwitchSession.restore_token`.
+        If None, the token is not saved."""
+        self.token_validation = None
+        """A :class:`concurrent.futures.Future` of the background validation,
+        that :meth:`TwitchSession.restore_token` started.
+        It holds True, if the token is valid."""
+        self.maxworkers = DEFAULT_MAXWORKERS
+        """The maximum number of requests that are issued at the same time,
+        when a method needs multiple round trips, e.g.
+        :meth:`TwitchSession.search_games`."""
+        self.response_cache = None
+        """A :class:`pytwitcherapi.cache.ResponseCache` for GET requests to kraken.
+        If None, responses are not cached."""
+        self.access_token_cache = cache.TTLCache(maxsize=256)
+        """Cache for channel access tokens.
+        See :meth:`TwitchSession.get_channel_access_token`.
+        If None, a new token is requested every time."""
+        self.playlist_cache = cache.TTLCache(maxsize=64, ttl=PLAYLIST_CACHE_TTL)
+        """Cache for the playlists of channels.
+        See :meth:`TwitchSession.get_playlist`.
+        If None, a new playlist is requested every time."""
+        self.emote_cache = cache.TieredCache(cache.SizedLRUCache(maxbytes=EMOTE_CACHE_MAXBYTES))
+        """Cache for emote pictures. See :meth:`TwitchSession.get_emote_picture`.
+        Set a :class:`pytwitcherapi.cache.DiskCache` as
+        :data:`pytwitcherapi.cache.TieredCache.disk` to keep the pictures
+        between sessions.
+        If None, the pictures are downloaded every time."""
+        self.json_loads = None
+        """Function to decode the json of responses, that are wrapped into models.
+        It is called with the body as bytes.
+        E.g. the result of :func:`pytwitcherapi.jsonutils.get_fast_loads`.
+        If None, :meth:`requests.Response.json` is used."""
+        self.chat_servers_cache = cache.TTLCache(maxsize=256, ttl=CHAT_SERVERS_CACHE_TTL)
+        """Cache for the chat servers of channels.
+        See :meth:`TwitchSession.get_chat_server`.
+        If None, the servers are requested every time."""
+        self.singleflight = concurrency.SingleFlight()
+        """Identical GET requests to kraken, that are issued by multiple threads
+        at the same time, share a single request.
+        If None, every request is sent."""
 
     @property
     def token(self, ):
@@ -200,7 +562,9 @@ class TwitchSession(OAuthSession):
 
     @token.setter
     def token(self, token):
-        """Set the oauth token and the current_user
+        """Set the oauth token
+
+        :data:`TwitchSession.current_user` is queried on first access.
 
         :param token: the oauth token
         :type token: :class:`dict`
@@ -208,9 +572,122 @@ class TwitchSession(OAuthSession):
         :rtype: None
         :raises: None
         """
+        with self._current_user_lock:
+            self._token = token
+            self._current_user = None
+        if token and self.token_store is not None:
+            self.token_store.save(token)
+
+    @property
+    def current_user(self, ):
+        """Return the currently logined user
+
+        The user is queried on first access and cached until the token changes.
+
+        :returns: the user or None, if the session is not authorized
+        :rtype: :class:`models.User` | None
+        :raises: :class:`requests.HTTPError` if the user could not be queried
+        """
+        user = self._current_user
+        if user is not None or not self._token:
+            return user
+        with self._current_user_lock:
+            if self._current_user is None and self._token:
+                token = self._token
+                self._current_user = self.query_login_user()
+                if self.token_store is not None:
+                    self.token_store.save(token, self._current_user)
+            return self._current_user
+
+    @current_user.setter
+    def current_user(self, user):
+        """Set the currently logined user, e.g. if it is already known
+
+        :param user: the user
+        :type user: :class:`models.User` | None
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        self._current_user = user
+
+    def restore_token(self, store=None, validate=True):
+        """Authorize the session with a stored token
+
+        The token and the stored user are used right away.
+        The token is validated in a background thread, see
+        :data:`TwitchSession.token_validation`. If twitch rejects it,
+        the session is unauthorized again and the token is removed from the store.
+
+        :param store: the store to load from. Defaults to :data:`TwitchSession.token_store`.
+        :type store: :class:`pytwitcherapi.tokenstore.TokenStore` | None
+        :param validate: If False, do not validate the token.
+        :type validate: :class:`bool`
+        :returns: True, if a token was restored
+        :rtype: :class:`bool`
+        :raises: :class:`ValueError` if there is no store
+        """
+        if store is None:
+            store = self.token_store
+        if store is None:
+            raise ValueError('There is no token store to restore from.')
+        token, user = store.load()
+        if token is None:
+            return False
+        self._set_client_token(token)
         self._token = token
-        if token:
-            self.current_user = self.query_login_user()
+        self.current_user = user
+        if validate:
+            self.token_validation = concurrency.run_in_thread(self._validate_token, token, store)
+        return True
+
+    def _set_client_token(self, token):
+        """Set the token on the oauth client, that signs the requests
+
+        :param token: the oauth token or None
+        :type token: :class:`dict` | None
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        self._client.token = token or {}
+        self._client.access_token = token.get('access_token') if token else None
+
+    def _validate_token(self, token, store):
+        """Query the user of a restored token
+
+        If the token is rejected, the session is unauthorized and the store cleared.
+        Otherwise the current user is updated and saved.
+
+        :param token: the restored token
+        :type token: :class:`dict`
+        :param store: the store of the token
+        :type store: :class:`pytwitcherapi.tokenstore.TokenStore`
+        :returns: True, if the token is valid.
+                  None, if it could not be validated, e.g. because of a timeout.
+        :rtype: :class:`bool` | None
+        :raises: None
+        """
+        try:
+            user = self.query_login_user()
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code not in (400, 401, 403):
+                log.exception('Could not validate the restored token.')
+                return None
+            log.warning('The restored token was rejected.')
+            store.clear()
+            if self._token is token:
+                self._set_client_token(None)
+                self._token = None
+                self.current_user = None
+            return False
+        except requests.RequestException:
+            log.exception('Could not validate the restored token.')
+            return None
+        if self._token is token:
+            self.current_user = user
+        store.save(token, user)
+        return True
 
     def kraken_request(self, method, endpoint, **kwargs):
         """Make a request to one of the kraken api endpoints.
@@ -220,6 +697,10 @@ class TwitchSession(OAuthSession):
         The url will be constructed of :data:`TWITCH_KRAKENURL` and
         the given endpoint.
 
+        GET requests are served from :data:`TwitchSession.response_cache`,
+        if it is set. Identical GET requests, that are in flight at the same time,
+        are coalesced by :data:`TwitchSession.singleflight`.
+
         :param method: the request method
         :type method: :class:`str`
         :param endpoint: the endpoint of the kraken api.
@@ -234,7 +715,55 @@ class TwitchSession(OAuthSession):
         headers = kwargs.setdefault('headers', {})
         headers['Accept'] = TWITCH_HEADER_ACCEPT
         headers['Client-ID'] = CLIENT_ID  # https://github.com/justintv/Twitch-API#rate-limits
-        return self.request(method, url, **kwargs)
+        if method != 'GET' or kwargs.get('stream'):
+            return self.request(method, url, **kwargs)
+        if self.response_cache is None:
+            func = functools.partial(self.request, method, url, **kwargs)
+        else:
+            func = functools.partial(self._cached_request, endpoint, url, **kwargs)
+        if self.singleflight is None:
+            return func()
+        accesstoken = self.token.get('access_token') if self.token else None
+        key = _get_request_key(url, kwargs.get('params'), headers, accesstoken)
+        return self.singleflight.do(key, func)
+
+    def _cached_request(self, endpoint, url, **kwargs):
+        """Make a GET request and use :data:`TwitchSession.response_cache`
+
+        If there is a fresh response in the cache, it is returned.
+        If there is an expired one with an etag, the request is conditional.
+        If the server answers ``304``, but the cached response was evicted meanwhile,
+        the request is repeated without ``If-None-Match``.
+
+        :param endpoint: the endpoint that is used to look up the time to live
+        :type endpoint: :class:`str`
+        :param url: the url to request
+        :type url: :class:`str`
+        :param kwargs: keyword arguments of :meth:`requests.Session.request`
+        :returns: a resonse object
+        :rtype: :class:`requests.Response`
+        :raises: :class:`requests.HTTPError`
+        """
+        accesstoken = self.token.get('access_token') if self.token else None
+        key = self.response_cache.make_key(url, kwargs.get('params'), accesstoken)
+        response = self.response_cache.get_fresh(key)
+        if response is not None:
+            log.debug('Using cached response for %s', url)
+            if self.metrics is not None:
+                self.metrics.record_cache_hit('GET', url)
+            return response
+        etag = self.response_cache.get_etag(key)
+        if etag:
+            kwargs['headers']['If-None-Match'] = etag
+        response = self.request('GET', url, **kwargs)
+        response = self.response_cache.update(key, endpoint, response)
+        if response.status_code == 304:
+            log.debug('Cached response for %s is gone. Requesting it again.', url)
+            response.close()
+            del kwargs['headers']['If-None-Match']
+            response = self.request('GET', url, **kwargs)
+            response = self.response_cache.update(key, endpoint, response)
+        return response
 
     def usher_request(self, method, endpoint, **kwargs):
         """Make a request to one of the usher api endpoints.
@@ -276,6 +805,53 @@ class TwitchSession(OAuthSession):
         url = TWITCH_APIURL + endpoint
         return self.request(method, url, **kwargs)
 
+    def iter_pages(self, fetch, pagesize, key):
+        """Iterate over the items of all pages of a list endpoint
+
+        The next page is requested in the background, while the current
+        one is consumed. Items that move between pages, e.g. because
+        the viewer count of a stream changed, are only yielded once.
+        See :func:`pytwitcherapi.concurrency.iter_pages`.
+
+        :param fetch: a method that accepts ``limit`` and ``offset``
+                      and returns a list of models, e.g.
+                      :meth:`TwitchSession.get_streams`.
+        :type fetch: callable
+        :param pagesize: the number of items per request.
+                         Kraken allows up to :data:`MAX_PAGESIZE`.
+        :type pagesize: :class:`int`
+        :param key: function that returns a unique identifier for an item
+        :type key: callable
+        :returns: an iterator over all items
+        :rtype: iterator
+        :raises: None
+        """
+        return concurrency.iter_pages(fetch, pagesize, key)
+
+    def _get_cached(self, valuecache, key, fetch, *args):
+        """Return the value for key from the cache or call fetch
+
+        Concurrent calls for the same key share a single call of fetch.
+        fetch is responsible for storing the value in the cache.
+
+        :param valuecache: the cache to look up the key or None
+        :type valuecache: :class:`pytwitcherapi.cache.TTLCache` | None
+        :param key: the key of the value
+        :type key: :class:`tuple`
+        :param fetch: the function that queries the value
+        :type fetch: callable
+        :param args: positional arguments for fetch
+        :returns: the cached value or the result of fetch
+        :raises: whatever fetch raises
+        """
+        if valuecache is not None:
+            value = valuecache.get(key)
+            if value is not None:
+                return value
+        if self.singleflight is None:
+            return fetch(*args)
+        return self.singleflight.do(key, fetch, *args)
+
     def fetch_viewers(self, game):
         """Query the viewers and channels of the given game and
         set them on the object
@@ -290,14 +866,20 @@ class TwitchSession(OAuthSession):
         game.channels = r['channels']
         return game
 
-    def search_games(self, query, live=True):
+    def search_games(self, query, live=True, fetch_viewers=True):
         """Search for games that are similar to the query
 
+        The viewers of the games are queried concurrently
+        with up to :data:`TwitchSession.maxworkers` requests at a time.
+
         :param query: the query string
         :type query: :class:`str`
         :param live: If true, only returns games that are live on at least one
                      channel
         :type live: :class:`bool`
+        :param fetch_viewers: If true, query the viewers and channels
+                              of every game. See :meth:`TwitchSession.fetch_viewers`.
+        :type fetch_viewers: :class:`bool`
         :returns: A list of games
         :rtype: :class:`list` of :class:`models.Game` instances
         :raises: None
@@ -306,9 +888,10 @@ class TwitchSession(OAuthSession):
                                 params={'query': query,
                                         'type': 'suggest',
                                         'live': live})
-        games = models.Game.wrap_search(r)
-        for g in games:
-            self.fetch_viewers(g)
+        games = models.Game.wrap_search(r, self.json_loads)
+        if fetch_viewers:
+            concurrency.map_concurrent(self.fetch_viewers, games,
+                                       self.maxworkers)
         return games
 
     def top_games(self, limit=10, offset=0):
@@ -325,7 +908,20 @@ class TwitchSession(OAuthSession):
         r = self.kraken_request('GET', 'games/top',
                                 params={'limit': limit,
                                         'offset': offset})
-        return models.Game.wrap_topgames(r)
+        return models.Game.wrap_topgames(r, self.json_loads)
+
+    def iter_top_games(self, pagesize=MAX_PAGESIZE):
+        """Iterate over all top games
+
+        See :meth:`TwitchSession.iter_pages`.
+
+        :param pagesize: the number of games per request
+        :type pagesize: :class:`int`
+        :returns: an iterator over the top games
+        :rtype: iterator of :class:`models.Game`
+        :raises: None
+        """
+        return self.iter_pages(self.top_games, pagesize, key=_game_key)
 
     def get_game(self, name):
         """Get the game instance for a game name
@@ -336,10 +932,10 @@ class TwitchSession(OAuthSession):
         :rtype: :class:`models.Game` | None
         :raises: None
         """
-        games = self.search_games(query=name, live=False)
+        games = self.search_games(query=name, live=False, fetch_viewers=False)
         for g in games:
             if g.name == name:
-                return g
+                return self.fetch_viewers(g)
 
     def get_channel(self, name):
         """Return the channel for the given name
@@ -351,7 +947,23 @@ class TwitchSession(OAuthSession):
         :raises: None
         """
         r = self.kraken_request('GET', 'channels/' + name)
-        return models.Channel.wrap_get_channel(r)
+        return models.Channel.wrap_get_channel(r, self.json_loads)
+
+    def get_channels(self, names):
+        """Return the channels for the given names
+
+        The channels are queried concurrently
+        with up to :data:`TwitchSession.maxworkers` requests at a time.
+        A failing request does not abort the others.
+
+        :param names: the channel names. Duplicates are queried once.
+        :type names: :class:`list` of :class:`str`
+        :returns: a mapping of names to channels and a mapping of names
+                  to the exceptions of failed requests
+        :rtype: (:class:`dict`, :class:`dict`)
+        :raises: None
+        """
+        return concurrency.map_settled(self.get_channel, names, self.maxworkers)
 
     def search_channels(self, query, limit=25, offset=0):
         """Search for channels and return them
@@ -370,7 +982,23 @@ class TwitchSession(OAuthSession):
                                 params={'query': query,
                                         'limit': limit,
                                         'offset': offset})
-        return models.Channel.wrap_search(r)
+        return models.Channel.wrap_search(r, self.json_loads)
+
+    def iter_search_channels(self, query, pagesize=MAX_PAGESIZE):
+        """Iterate over all channels that match the query
+
+        See :meth:`TwitchSession.iter_pages`.
+
+        :param query: the query string
+        :type query: :class:`str`
+        :param pagesize: the number of channels per request
+        :type pagesize: :class:`int`
+        :returns: an iterator over the channels
+        :rtype: iterator of :class:`models.Channel`
+        :raises: None
+        """
+        fetch = functools.partial(self.search_channels, query)
+        return self.iter_pages(fetch, pagesize, key=_channel_key)
 
     def get_stream(self, channel):
         """Return the stream of the given channel
@@ -386,7 +1014,7 @@ class TwitchSession(OAuthSession):
             channel = channel.name
 
         r = self.kraken_request('GET', 'streams/' + channel)
-        return models.Stream.wrap_get_stream(r)
+        return models.Stream.wrap_get_stream(r, self.json_loads)
 
     def get_streams(self, game=None, channels=None, limit=25, offset=0):
         """Return a list of streams queried by a number of parameters
@@ -404,25 +1032,70 @@ class TwitchSession(OAuthSession):
         :rtype: :class:`list` of :class:`models.Stream`
         :raises: None
         """
-        if isinstance(game, models.Game):
-            game = game.name
+        params = get_streams_params(game, channels, limit, offset)
+        r = self.kraken_request('GET', 'streams', params=params)
+        return models.Stream.wrap_search(r, self.json_loads)
 
+    def iter_streams(self, game=None, channels=None, pagesize=MAX_PAGESIZE):
+        """Iterate over all streams queried by a number of parameters
+        sorted by number of viewers descending
+
+        See :meth:`TwitchSession.get_streams` and :meth:`TwitchSession.iter_pages`.
+
+        :param game: the game or name of the game
+        :type game: :class:`str` | :class:`models.Game`
+        :param channels: list of models.Channels or channel names (can be mixed)
+        :type channels: :class:`list` of :class:`models.Channel` or :class:`str`
+        :param pagesize: the number of streams per request
+        :type pagesize: :class:`int`
+        :returns: an iterator over the streams
+        :rtype: iterator of :class:`models.Stream`
+        :raises: None
+        """
+        fetch = functools.partial(self.get_streams, game=game, channels=channels)
+        return self.iter_pages(fetch, pagesize, key=_stream_key)
+
+    def get_streams_bulk(self, channels, game=None, chunksize=STREAMS_CHUNKSIZE,
+                         pagesize=MAX_PAGESIZE):
+        """Return the live streams of a large number of channels
+        sorted by number of viewers descending
+
+        The channels are split into chunks of ``chunksize``, so the urls
+        stay short. The chunks are queried concurrently
+        with up to :data:`TwitchSession.maxworkers` requests at a time
+        and every chunk is paged until all of its streams are returned.
+
+        :param channels: list of models.Channels or channel names (can be mixed)
+        :type channels: :class:`list` of :class:`models.Channel` or :class:`str`
+        :param game: the game or name of the game
+        :type game: :class:`str` | :class:`models.Game`
+        :param chunksize: the number of channels per request
+        :type chunksize: :class:`int`
+        :param pagesize: the number of streams per request
+        :type pagesize: :class:`int`
+        :returns: the streams of all channels, that are live
+        :rtype: :class:`list` of :class:`models.Stream`
+        :raises: None
+        """
         channelnames = []
-        cparam = None
-        if channels:
-            for c in channels:
-                if isinstance(c, models.Channel):
-                    c = c.name
+        seen = set()
+        for c in channels:
+            if isinstance(c, models.Channel):
+                c = c.name
+            if c not in seen:
+                seen.add(c)
                 channelnames.append(c)
-            cparam = ','.join(channelnames)
+        chunks = [channelnames[i:i + chunksize]
+                  for i in range(0, len(channelnames), chunksize)]
 
-        params = {'limit': limit,
-                  'offset': offset,
-                  'game': game,
-                  'channel': cparam}
+        def fetch(chunk):
+            return list(self.iter_streams(game=game, channels=chunk, pagesize=pagesize))
 
-        r = self.kraken_request('GET', 'streams', params=params)
-        return models.Stream.wrap_search(r)
+        streams = {}
+        for page in concurrency.map_concurrent(fetch, chunks, self.maxworkers):
+            for stream in page:
+                streams.setdefault(_stream_key(stream), stream)
+        return sorted(streams.values(), key=lambda s: s.viewers, reverse=True)
 
     def search_streams(self, query, hls=False, limit=25, offset=0):
         """Search for streams and return them
@@ -444,7 +1117,25 @@ class TwitchSession(OAuthSession):
                                         'hls': hls,
                                         'limit': limit,
                                         'offset': offset})
-        return models.Stream.wrap_search(r)
+        return models.Stream.wrap_search(r, self.json_loads)
+
+    def iter_search_streams(self, query, hls=False, pagesize=MAX_PAGESIZE):
+        """Iterate over all streams that match the query
+
+        See :meth:`TwitchSession.iter_pages`.
+
+        :param query: the query string
+        :type query: :class:`str`
+        :param hls: If true, only return streams that have hls stream
+        :type hls: :class:`bool`
+        :param pagesize: the number of streams per request
+        :type pagesize: :class:`int`
+        :returns: an iterator over the streams
+        :rtype: iterator of :class:`models.Stream`
+        :raises: None
+        """
+        fetch = functools.partial(self.search_streams, query, hls=hls)
+        return self.iter_pages(fetch, pagesize, key=_stream_key)
 
     @needs_auth
     def followed_streams(self, limit=25, offset=0):
@@ -463,7 +1154,22 @@ class TwitchSession(OAuthSession):
         r = self.kraken_request('GET', 'streams/followed',
                                 params={'limit': limit,
                                         'offset': offset})
-        return models.Stream.wrap_search(r)
+        return models.Stream.wrap_search(r, self.json_loads)
+
+    @needs_auth
+    def iter_followed_streams(self, pagesize=MAX_PAGESIZE):
+        """Iterate over all streams the current user follows.
+
+        Needs authorization ``user_read``.
+        See :meth:`TwitchSession.iter_pages`.
+
+        :param pagesize: the number of streams per request
+        :type pagesize: :class:`int`
+        :returns: an iterator over the streams
+        :rtype: iterator of :class:`models.Stream`
+        :raises: :class:`exceptions.NotAuthorizedError`
+        """
+        return self.iter_pages(self.followed_streams, pagesize, key=_stream_key)
 
     def get_user(self, name):
         """Get the user for the given name
@@ -475,7 +1181,23 @@ class TwitchSession(OAuthSession):
         :raises: None
         """
         r = self.kraken_request('GET', 'user/' + name)
-        return models.User.wrap_get_user(r)
+        return models.User.wrap_get_user(r, self.json_loads)
+
+    def get_users(self, names):
+        """Return the users for the given names
+
+        The users are queried concurrently
+        with up to :data:`TwitchSession.maxworkers` requests at a time.
+        A failing request does not abort the others.
+
+        :param names: the usernames. Duplicates are queried once.
+        :type names: :class:`list` of :class:`str`
+        :returns: a mapping of names to users and a mapping of names
+                  to the exceptions of failed requests
+        :rtype: (:class:`dict`, :class:`dict`)
+        :raises: None
+        """
+        return concurrency.map_settled(self.get_user, names, self.maxworkers)
 
     @needs_auth
     def query_login_user(self, ):
@@ -486,20 +1208,39 @@ class TwitchSession(OAuthSession):
         :raises: :class:`exceptions.NotAuthorizedError`
         """
         r = self.kraken_request('GET', 'user')
-        return models.User.wrap_get_user(r)
+        return models.User.wrap_get_user(r, self.json_loads)
 
-    def get_playlist(self, channel):
+    def get_playlist(self, channel, cached=True):
         """Return the playlist for the given channel
 
+        Playlists are stored in :data:`TwitchSession.playlist_cache`
+        for a short time, so :meth:`TwitchSession.get_quality_options`
+        and :meth:`TwitchSession.get_variant_url` can reuse them.
+
         :param channel: the channel
         :type channel: :class:`models.Channel` | :class:`str`
+        :param cached: If False, always request a new playlist.
+        :type cached: :class:`bool`
         :returns: the playlist
         :rtype: :class:`m3u8.M3U8`
         :raises: :class:`requests.HTTPError` if channel is offline.
         """
         if isinstance(channel, models.Channel):
             channel = channel.name
+        if not cached:
+            return self._fetch_playlist(channel)
+        return self._get_cached(self.playlist_cache, ('playlist', channel),
+                                self._fetch_playlist, channel)
 
+    def _fetch_playlist(self, channel):
+        """Request the playlist for the given channel and cache it
+
+        :param channel: the channel name
+        :type channel: :class:`str`
+        :returns: the playlist
+        :rtype: :class:`m3u8.M3U8`
+        :raises: :class:`requests.HTTPError` if channel is offline.
+        """
         token, sig = self.get_channel_access_token(channel)
         params = {'token': token, 'sig': sig,
                   'allow_audio_only': True,
@@ -507,6 +1248,8 @@ class TwitchSession(OAuthSession):
         r = self.usher_request(
             'GET', 'channel/hls/%s.m3u8' % channel, params=params)
         playlist = m3u8.loads(r.text)
+        if self.playlist_cache is not None:
+            self.playlist_cache.set(('playlist', channel), playlist)
         return playlist
 
     def get_quality_options(self, channel):
@@ -527,33 +1270,69 @@ class TwitchSession(OAuthSession):
         :rtype: :class:`list` of :class:`str`
         :raises: :class:`requests.HTTPError` if channel is offline.
         """
-        optionmap = {'chunked': 'source',
-                     'high': 'high',
-                     'medium': 'medium',
-                     'low': 'low',
-                     'mobile': 'mobile',
-                     'audio_only': 'audio'}
         p = self.get_playlist(channel)
         options = []
         for pl in p.playlists:
             q = pl.media[0].group_id
-            options.append(optionmap[q])
+            options.append(QUALITY_OPTIONS[q])
         return options
 
-    def get_channel_access_token(self, channel):
+    def get_variant_url(self, channel, quality):
+        """Return the url of the media playlist of the given quality
+
+        :param channel: the channel or channel name
+        :type channel: :class:`models.Channel` | :class:`str`
+        :param quality: one of :meth:`TwitchSession.get_quality_options`
+        :type quality: :class:`str`
+        :returns: the url of the media playlist
+        :rtype: :class:`str`
+        :raises: :class:`requests.HTTPError` if channel is offline,
+                 :class:`ValueError` if the quality is not available.
+        """
+        p = self.get_playlist(channel)
+        for pl in p.playlists:
+            if QUALITY_OPTIONS.get(pl.media[0].group_id) == quality:
+                return pl.uri
+        raise ValueError('Quality %r is not available for %s.' % (quality, channel))
+
+    def get_channel_access_token(self, channel, cached=True):
         """Return the token and sig for the given channel
 
+        Tokens are stored in :data:`TwitchSession.access_token_cache`
+        until :data:`ACCESS_TOKEN_REFRESH_MARGIN` seconds before they expire.
+        :meth:`TwitchSession.get_playlist` and other hls methods reuse them.
+
         :param channel: the channel or channel name to get the access token for
         :type channel: :class:`channel` | :class:`str`
+        :param cached: If False, always request a new token.
+        :type cached: :class:`bool`
         :returns: The token and sig for the given channel
         :rtype: (:class:`unicode`, :class:`unicode`)
         :raises: None
         """
         if isinstance(channel, models.Channel):
             channel = channel.name
+        if not cached:
+            return self._fetch_channel_access_token(channel)
+        return self._get_cached(self.access_token_cache, ('access_token', channel),
+                                self._fetch_channel_access_token, channel)
+
+    def _fetch_channel_access_token(self, channel):
+        """Request the token and sig for the given channel and cache them
+
+        :param channel: the channel name
+        :type channel: :class:`str`
+        :returns: The token and sig for the given channel
+        :rtype: (:class:`unicode`, :class:`unicode`)
+        :raises: None
+        """
         r = self.oldapi_request(
             'GET', 'channels/%s/access_token' % channel).json()
-        return r['token'], r['sig']
+        token, sig = r['token'], r['sig']
+        ttl = _get_access_token_ttl(token) - ACCESS_TOKEN_REFRESH_MARGIN
+        if ttl > 0 and self.access_token_cache is not None:
+            self.access_token_cache.set(('access_token', channel), (token, sig), ttl=ttl)
+        return token, sig
 
     def get_chat_server(self, channel):
         """Get an appropriate chat server for the given channel
@@ -562,61 +1341,112 @@ class TwitchSession(OAuthSession):
         twitch chat, they use a lot of servers. Big events are on special
         event servers. This method tries to find a good one.
 
+        The chat servers of a channel are cached in
+        :data:`TwitchSession.chat_servers_cache`.
+        The status of all chat servers is shared by all sessions
+        and refreshed every :data:`CHAT_STATUS_REFRESH_INTERVAL` seconds.
+
         :param channel: the channel with the chat
         :type channel: :class:`models.Channel`
         :returns: the server address and port
         :rtype: (:class:`str`, :class:`int`)
         :raises: None
         """
-        r = self.oldapi_request(
-            'GET', 'channels/%s/chat_properties' % channel.name)
-        json = r.json()
-        servers = json['chat_servers']
+        return self.get_chat_servers(channel)[0]
 
-        try:
-            r = self.get(TWITCH_STATUSURL)
-        except requests.HTTPError:
+    def get_chat_servers(self, channel):
+        """Return the chat servers of the channel ordered from best to worst
+
+        Use the list to fall back to the next server, if one fails.
+        See :func:`pytwitcherapi.chat.client.rank_chat_servers`.
+
+        :param channel: the channel with the chat
+        :type channel: :class:`models.Channel`
+        :returns: a list of server addresses and ports
+        :rtype: :class:`list` of (:class:`str`, :class:`int`)
+        :raises: None
+        """
+        servers = self._get_cached(self.chat_servers_cache, ('chat_servers', channel.name),
+                                   self._fetch_chat_servers, channel.name)
+        status = self._get_chat_server_status()
+        if status is None:
             log.debug('Error getting chat server status. Using random one.')
-            address = servers[0]
         else:
-            stats = [client.ChatServerStatus(**d) for d in r.json()]
-            address = self._find_best_chat_server(servers, stats)
+            servers = client.rank_chat_servers(servers, status[1])
 
-        server, port = address.split(':')
-        return server, int(port)
+        addresses = []
+        for address in servers:
+            server, port = address.split(':')
+            addresses.append((server, int(port)))
+        return addresses
 
-    @staticmethod
-    def _find_best_chat_server(servers, stats):
-        """Find the best from servers by comparing with the stats
+    def _fetch_chat_servers(self, channelname):
+        """Request the chat server addresses for the given channel and cache them
 
-        :param servers: a list if server adresses, e.g. ['0.0.0.0:80']
-        :type servers: :class:`list` of :class:`str`
-        :param stats: list of server statuses
-        :type stats: :class:`list` of :class:`chat.ChatServerStatus`
-        :returns: the best server adress
-        :rtype: :class:`str`
+        :param channelname: the name of the channel
+        :type channelname: :class:`str`
+        :returns: a list of server addresses, e.g. ``['0.0.0.0:80']``
+        :rtype: :class:`list` of :class:`str`
         :raises: None
         """
-        best = servers[0]  # In case we sind no match with any status
-        stats.sort()  # gets sorted for performance
-        for stat in stats:
-            for server in servers:
-                if server == stat:
-                    # found a chatserver that has the same address
-                    # than one of the chatserverstats.
-                    # since the stats are sorted for performance
-                    # the first hit is the best, thus break
-                    best = server
-                    break
-            if best:
-                # already found one, so no need to check the other
-                # statuses, which are worse
-                break
-        return best
+        r = self.oldapi_request(
+            'GET', 'channels/%s/chat_properties' % channelname)
+        servers = r.json()['chat_servers']
+        if self.chat_servers_cache is not None:
+            self.chat_servers_cache.set(('chat_servers', channelname), servers)
+        return servers
+
+    def get_chat_server_status(self, ):
+        """Return the status of all twitch chat servers
+
+        The status is shared by all sessions of the process and only
+        requested again after :data:`CHAT_STATUS_REFRESH_INTERVAL` seconds.
+        Concurrent calls share a single request.
+
+        :returns: the server statuses or None, if the status is not available
+        :rtype: :class:`list` of :class:`pytwitcherapi.chat.client.ChatServerStatus` | None
+        :raises: None
+        """
+        status = self._get_chat_server_status()
+        if status is not None:
+            return status[0]
+
+    def _get_chat_server_status(self, ):
+        """Return the status of all chat servers and an index by address
+
+        :returns: the server statuses and a mapping of addresses to statuses
+                  or None, if the status is not available
+        :rtype: (:class:`list`, :class:`dict`) | None
+        :raises: None
+        """
+        status = _chat_status_cache.get('status')
+        if status is not None:
+            return status
+        return _chat_status_flight.do('status', self._fetch_chat_server_status)
+
+    def _fetch_chat_server_status(self, ):
+        """Request the status of all twitch chat servers and cache it
+
+        :returns: the server statuses and a mapping of addresses to statuses
+                  or None, if the status is not available
+        :rtype: (:class:`list`, :class:`dict`) | None
+        :raises: None
+        """
+        try:
+            r = self.get(TWITCH_STATUSURL)
+        except requests.HTTPError:
+            return None
+        stats = [client.ChatServerStatus(**d) for d in r.json()]
+        status = stats, dict((s.address, s) for s in stats)
+        _chat_status_cache.set('status', status, ttl=CHAT_STATUS_REFRESH_INTERVAL)
+        return status
 
     def get_emote_picture(self, emote, size=1.0):
         """Return the picture for the given emote
 
+        Pictures are cached in :data:`TwitchSession.emote_cache`
+        by emote id and size.
+
         :param emote: the emote object
         :type emote: :class:`pytwitcherapi.chat.message.Emote`
         :param size: the size of the picture.
@@ -626,6 +1456,22 @@ class TwitchSession(OAuthSession):
         :rtype: :class:`str`
         :raises: None
         """
+        return self._get_cached(self.emote_cache, (emote.emoteid, size),
+                                self._fetch_emote_picture, emote.emoteid, size)
+
+    def _fetch_emote_picture(self, emoteid, size):
+        """Download the picture of an emote and cache it
+
+        :param emoteid: the id of the emote
+        :type emoteid: :class:`int`
+        :param size: the size of the picture
+        :type size: :class:`float`
+        :returns: the picture data
+        :rtype: :class:`str`
+        :raises: None
+        """
         r = self.get('http://static-cdn.jtvnw.net/emoticons/v1/%s/%s' %
-                     (emote.emoteid, size))
+                     (emoteid, size))
+        if self.emote_cache is not None:
+            self.emote_cache.set((emoteid, size), r.content)
         return r.content
@@ -0,0 +1,380 @@
+"""Keep the oauth token between sessions
+
+Without a stored token, every new :class:`pytwitcherapi.TwitchSession` has to
+go through the login (see :mod:`pytwitcherapi.oauth`). Set a store as
+:data:`pytwitcherapi.TwitchSession.token_store` and the token is saved
+together with the current user after the login. A restarted process
+is authorized right away::
+
+  from pytwitcherapi import session, tokenstore
+
+  ts = session.TwitchSession()
+  ts.token_store = tokenstore.FileTokenStore()
+  if not ts.restore_token():
+      ts.start_login_server()
+      ...
+
+The restored token is validated in the background.
+If twitch rejects it, it is removed from the store.
+
+There are three stores:
+
+  * :class:`FileTokenStore` saves a json file, that only the owner can read.
+  * :class:`EnvTokenStore` reads the token from an environment variable.
+  * :class:`KeyringTokenStore` uses the password store of the system.
+    It needs the `keyring <https://pypi.python.org/pypi/keyring>`_ package.
+"""
+from __future__ import absolute_import
+
+import json
+import logging
+import os
+import tempfile
+
+from . import models
+
+__all__ = ['TokenStore', 'FileTokenStore', 'EnvTokenStore', 'KeyringTokenStore']
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.pytwitcherapi', 'token.json')
+"""The default file of :class:`FileTokenStore`"""
+
+ENV_VARIABLE = 'PYTWITCHER_TOKEN'
+"""The default environment variable of :class:`EnvTokenStore`"""
+
+KEYRING_SERVICE = 'pytwitcherapi'
+"""The service name of the token in the keyring"""
+
+
+def dumps(token, user=None):
+    """Serialize the token and the user to json
+
+    :param token: the oauth token
+    :type token: :class:`dict`
+    :param user: the user of the token or None
+    :type user: :class:`pytwitcherapi.User` | None
+    :returns: the json document
+    :rtype: :class:`str`
+    :raises: None
+    """
+    data = {'token': token, 'user': None}
+    if user is not None:
+        data['user'] = {'type': user.usertype,
+                        'name': user.name,
+                        'logo': user.logo,
+                        '_id': user.twitchid,
+                        'display_name': user.displayname,
+                        'bio': user.bio}
+    return json.dumps(data)
+
+
+def loads(text):
+    """Deserialize the token and the user
+
+    Besides documents of :func:`dumps`, a plain access token is accepted.
+
+    :param text: the stored text
+    :type text: :class:`str`
+    :returns: the token and the user or None, if no user was stored
+    :rtype: (:class:`dict`, :class:`pytwitcherapi.User` | None)
+    :raises: :class:`ValueError` if the text is no valid token
+    """
+    text = text.strip()
+    if not text.startswith('{'):
+        if not text:
+            raise ValueError('The token is empty.')
+        return {'access_token': text, 'token_type': 'Bearer'}, None
+    data = json.loads(text)
+    token = data.get('token')
+    if not isinstance(token, dict) or 'access_token' not in token:
+        raise ValueError('The stored data contains no access token.')
+    user = data.get('user')
+    return token, models.User.wrap_json(user) if user else None
+
+
+class TokenStore(object):
+    """Base class for token stores
+
+    Subclasses have to implement :meth:`TokenStore.read`, :meth:`TokenStore.write`
+    and :meth:`TokenStore.delete`.
+    """
+
+    def load(self, ):
+        """Return the stored token and user
+
+        Invalid data is treated like a missing token.
+
+        :returns: the token and the user. Both are None, if there is no token.
+        :rtype: (:class:`dict` | None, :class:`pytwitcherapi.User` | None)
+        :raises: None
+        """
+        text = self.read()
+        if text is None:
+            return None, None
+        try:
+            return loads(text)
+        except (ValueError, KeyError):
+            log.warning('Ignoring the invalid token in %r.', self)
+            return None, None
+
+    def save(self, token, user=None):
+        """Store the token and the user
+
+        :param token: the oauth token
+        :type token: :class:`dict`
+        :param user: the user of the token or None
+        :type user: :class:`pytwitcherapi.User` | None
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        self.write(dumps(token, user))
+
+    def clear(self, ):
+        """Remove the stored token
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        self.delete()
+
+    def read(self, ):
+        """Return the stored text or None
+
+        :returns: the text
+        :rtype: :class:`str` | None
+        :raises: :class:`NotImplementedError`
+        """
+        raise NotImplementedError
+
+    def write(self, text):
+        """Store the text
+
+        :param text: the text
+        :type text: :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: :class:`NotImplementedError`
+        """
+        raise NotImplementedError
+
+    def delete(self, ):
+        """Remove the stored text
+
+        :returns: None
+        :rtype: None
+        :raises: :class:`NotImplementedError`
+        """
+        raise NotImplementedError
+
+
+class FileTokenStore(TokenStore):
+    """Store the token in a json file, that only the owner can read"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        """Initialize a new file store
+
+        :param path: the path of the file. The directory is created when saving.
+        :type path: :class:`str`
+        :raises: None
+        """
+        super(FileTokenStore, self).__init__()
+        self.path = path
+        """The path of the file"""
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s %s>' % (self.__class__.__name__, self.path)
+
+    def read(self, ):
+        """Return the content of the file or None, if it cannot be read
+
+        :returns: the text
+        :rtype: :class:`str` | None
+        :raises: None
+        """
+        try:
+            with open(self.path, 'r') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def write(self, text):
+        """Replace the file atomically with the text
+
+        Errors are logged.
+
+        :param text: the text
+        :type text: :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            # mkstemp creates files, that only the owner can read
+            fd, tmppath = tempfile.mkstemp(dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(text)
+                if os.name == 'nt':
+                    self.delete()
+                os.rename(tmppath, self.path)
+            except Exception:
+                os.remove(tmppath)
+                raise
+        except (IOError, OSError):
+            log.exception('Could not save the token to %s.', self.path)
+
+    def delete(self, ):
+        """Remove the file, if it exists
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class EnvTokenStore(TokenStore):
+    """Read the token from an environment variable
+
+    The variable either holds a document of :func:`dumps`
+    or a plain access token. Saving only sets the variable
+    for the current process and its children.
+    """
+
+    def __init__(self, name=ENV_VARIABLE):
+        """Initialize a new environment store
+
+        :param name: the name of the environment variable
+        :type name: :class:`str`
+        :raises: None
+        """
+        super(EnvTokenStore, self).__init__()
+        self.name = name
+        """The name of the environment variable"""
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s $%s>' % (self.__class__.__name__, self.name)
+
+    def read(self, ):
+        """Return the value of the environment variable or None, if it is not set
+
+        :returns: the text
+        :rtype: :class:`str` | None
+        :raises: None
+        """
+        return os.environ.get(self.name)
+
+    def write(self, text):
+        """Set the environment variable to the text
+
+        :param text: the text
+        :type text: :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        os.environ[self.name] = text
+
+    def delete(self, ):
+        """Unset the environment variable
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        os.environ.pop(self.name, None)
+
+
+class KeyringTokenStore(TokenStore):
+    """Store the token in the password store of the system"""
+
+    def __init__(self, username='default', service=KEYRING_SERVICE):
+        """Initialize a new keyring store
+
+        :param username: the name of the entry. Use different names
+                         to store the tokens of several accounts.
+        :type username: :class:`str`
+        :param service: the service name of the entry
+        :type service: :class:`str`
+        :raises: :class:`ImportError` if keyring is not installed
+        """
+        super(KeyringTokenStore, self).__init__()
+        import keyring
+        self._keyring = keyring
+        self.username = username
+        """The name of the entry"""
+        self.service = service
+        """The service name of the entry"""
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s %s/%s>' % (self.__class__.__name__, self.service, self.username)
+
+    def read(self, ):
+        """Return the password of the keyring entry or None
+
+        Errors of the keyring are logged.
+
+        :returns: the text
+        :rtype: :class:`str` | None
+        :raises: None
+        """
+        try:
+            return self._keyring.get_password(self.service, self.username)
+        except Exception:
+            log.exception('Could not read the token from the keyring.')
+            return None
+
+    def write(self, text):
+        """Store the text as password of the keyring entry
+
+        Errors of the keyring are logged.
+
+        :param text: the text
+        :type text: :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        try:
+            self._keyring.set_password(self.service, self.username, text)
+        except Exception:
+            log.exception('Could not save the token to the keyring.')
+
+    def delete(self, ):
+        """Remove the keyring entry, if it exists
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        try:
+            self._keyring.delete_password(self.service, self.username)
+        except Exception:
+            pass
@@ -0,0 +1,257 @@
+"""Watch a large number of channels for status changes
+
+A :class:`StreamWatcher` queries the live streams of its channels in bulk,
+up to 100 channels per request, and compares every result with the previous
+one. It only yields :class:`StreamEvent` for transitions::
+
+  from pytwitcherapi import watcher
+
+  w = watcher.StreamWatcher(ts, channelnames, interval=60, viewers_threshold=500)
+  for event in w:
+      print(event.kind, event.channel)
+
+The requests are spread evenly over the interval,
+so there are no bursts of requests every interval.
+"""
+from __future__ import absolute_import
+
+import logging
+import time
+
+import requests
+
+from . import exceptions, models
+from .session import STREAMS_CHUNKSIZE
+
+__all__ = ['StreamEvent', 'StreamWatcher',
+           'ONLINE', 'OFFLINE', 'GAME', 'TITLE', 'VIEWERS']
+
+log = logging.getLogger(__name__)
+
+ONLINE = 'online'
+"""A channel went live"""
+OFFLINE = 'offline'
+"""A channel went offline"""
+GAME = 'game'
+"""The game of a live channel changed"""
+TITLE = 'title'
+"""The status (title) of a live channel changed"""
+VIEWERS = 'viewers'
+"""The viewers of a live channel changed by at least the threshold"""
+
+
+class StreamEvent(object):
+    """A change of a watched channel"""
+
+    def __init__(self, kind, channel, stream, previous):
+        """Initialize a new event
+
+        :param kind: one of :data:`ONLINE`, :data:`OFFLINE`, :data:`GAME`,
+                     :data:`TITLE`, :data:`VIEWERS`
+        :type kind: :class:`str`
+        :param channel: the name of the channel
+        :type channel: :class:`str`
+        :param stream: the current stream. None, if the channel went offline.
+        :type stream: :class:`pytwitcherapi.Stream` | None
+        :param previous: the stream of the previous poll. None, if the channel went live.
+        :type previous: :class:`pytwitcherapi.Stream` | None
+        :raises: None
+        """
+        super(StreamEvent, self).__init__()
+        self.kind = kind
+        """The kind of the change"""
+        self.channel = channel
+        """The name of the channel"""
+        self.stream = stream
+        """The current stream or None, if the channel went offline"""
+        self.previous = previous
+        """The stream of the previous poll or None, if the channel went live"""
+
+    def __repr__(self, ):  # pragma: no cover
+        """Return the canonical string representation of the object
+
+        :returns: string representation
+        :rtype: :class:`str`
+        :raises: None
+        """
+        return '<%s %s %s>' % (self.__class__.__name__, self.kind, self.channel)
+
+
+class StreamWatcher(object):
+    """Poll the live streams of many channels and yield their changes
+
+    The channels are split into chunks. Every interval each chunk is
+    requested once, and the requests of the chunks are spread evenly
+    over the interval.
+
+    The first poll of a chunk only records the current state,
+    unless ``initial`` is True. Chunks, that fail to load,
+    are skipped until the next interval and yield no events.
+    """
+
+    def __init__(self, session, channels, interval=60, viewers_threshold=None,
+                 chunksize=STREAMS_CHUNKSIZE, initial=False, timer=time.time, sleep=time.sleep):
+        """Initialize a new watcher
+
+        :param session: the session for requesting the streams
+        :type session: :class:`pytwitcherapi.TwitchSession`
+        :param channels: the channels or channel names to watch
+        :type channels: :class:`list` of :class:`pytwitcherapi.Channel` | :class:`str`
+        :param interval: seconds until a channel is polled again
+        :type interval: :class:`float`
+        :param viewers_threshold: the change of viewers since the last
+                                  :data:`VIEWERS` event, that triggers a new one.
+                                  If None, viewers are not watched.
+        :type viewers_threshold: :class:`int` | None
+        :param chunksize: the number of channels per request
+        :type chunksize: :class:`int`
+        :param initial: If True, the first poll yields :data:`ONLINE`
+                        for channels, that are already live.
+        :type initial: :class:`bool`
+        :param timer: function that returns the current time in seconds
+        :type timer: callable
+        :param sleep: function to wait the given seconds
+        :type sleep: callable
+        :raises: None
+        """
+        super(StreamWatcher, self).__init__()
+        self.session = session
+        """The session for requesting the streams"""
+        self.interval = interval
+        """Seconds until a channel is polled again"""
+        self.viewers_threshold = viewers_threshold
+        """The change of viewers, that triggers a :data:`VIEWERS` event"""
+        self.chunksize = chunksize
+        """The number of channels per request"""
+        self.initial = initial
+        """If True, the first poll yields :data:`ONLINE` for live channels"""
+        self.timer = timer
+        """Function that returns the current time in seconds"""
+        self.sleep = sleep
+        """Function to wait the given seconds"""
+        self.streams = {}
+        """Mapping of channel name to the stream of every live channel"""
+        self.stopped = False
+        """True, if iteration should stop"""
+        self.chunks = []
+        """The channel names of each request"""
+        self._viewers = {}
+        self._polled = set()
+        self._next = 0
+        self.set_channels(channels)
+
+    def set_channels(self, channels):
+        """Replace the watched channels
+
+        The state of channels, that are no longer watched, is dropped
+        without events. New channels are treated like on the first poll.
+
+        :param channels: the channels or channel names to watch
+        :type channels: :class:`list` of :class:`pytwitcherapi.Channel` | :class:`str`
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        names = []
+        seen = set()
+        for c in channels:
+            if isinstance(c, models.Channel):
+                c = c.name
+            c = c.lower()
+            if c not in seen:
+                seen.add(c)
+                names.append(c)
+        self.chunks = [names[i:i + self.chunksize]
+                       for i in range(0, len(names), self.chunksize)]
+        for name in set(self.streams) - seen:
+            del self.streams[name]
+            self._viewers.pop(name, None)
+        self._polled &= seen
+        self._next = 0
+
+    def __iter__(self, ):
+        """Poll the chunks one after another and yield the events
+        until :meth:`StreamWatcher.stop` is called
+
+        :returns: an iterator over the events
+        :rtype: iterator of :class:`StreamEvent`
+        :raises: None
+        """
+        due = self.timer()
+        while not self.stopped:
+            wait = due - self.timer()
+            if wait > 0:
+                self.sleep(wait)
+            if self.stopped:
+                return
+            for event in self.poll():
+                yield event
+            due = max(due + self.interval / float(max(len(self.chunks), 1)), self.timer())
+
+    def stop(self, ):
+        """Stop the iteration before the next poll
+
+        :returns: None
+        :rtype: None
+        :raises: None
+        """
+        self.stopped = True
+
+    def poll(self, ):
+        """Request the next chunk of channels and return its events
+
+        :returns: the changes of the channels in the chunk
+        :rtype: :class:`list` of :class:`StreamEvent`
+        :raises: None
+        """
+        if not self.chunks:
+            return []
+        chunk = self.chunks[self._next % len(self.chunks)]
+        self._next = (self._next + 1) % len(self.chunks)
+        try:
+            streams = self.session.get_streams_bulk(chunk, chunksize=self.chunksize)
+        except (requests.RequestException, exceptions.PytwitcherException, ValueError):
+            # e.g. an open circuit or a malformed body
+            log.exception('Failed to poll %s channels.', len(chunk))
+            return []
+        current = dict((s.channel.name.lower(), s) for s in streams)
+        return self._diff(chunk, current)
+
+    def _diff(self, chunk, current):
+        """Update the state of the channels in the chunk and return the changes
+
+        :param chunk: the channel names, that were requested
+        :type chunk: :class:`list` of :class:`str`
+        :param current: mapping of channel name to stream of the live channels
+        :type current: :class:`dict`
+        :returns: the changes
+        :rtype: :class:`list` of :class:`StreamEvent`
+        :raises: None
+        """
+        events = []
+        for name in chunk:
+            first = name not in self._polled
+            self._polled.add(name)
+            previous = self.streams.get(name)
+            stream = current.get(name)
+            if stream is None:
+                if previous is not None:
+                    del self.streams[name]
+                    self._viewers.pop(name, None)
+                    events.append(StreamEvent(OFFLINE, name, None, previous))
+                continue
+            self.streams[name] = stream
+            if previous is None:
+                self._viewers[name] = stream.viewers
+                if not first or self.initial:
+                    events.append(StreamEvent(ONLINE, name, stream, None))
+                continue
+            if stream.game != previous.game:
+                events.append(StreamEvent(GAME, name, stream, previous))
+            if stream.channel.status != previous.channel.status:
+                events.append(StreamEvent(TITLE, name, stream, previous))
+            if self.viewers_threshold is not None and\
+               abs(stream.viewers - self._viewers[name]) >= self.viewers_threshold:
+                self._viewers[name] = stream.viewers
+                events.append(StreamEvent(VIEWERS, name, stream, previous))
+        return events
@@ -1,3 +1,6 @@
+import json
+import threading
+
 import mock
 import pytest
 import requests
@@ -19,6 +22,62 @@ def create_mockresponse(returnvalue):
     return mockresponse
 
 
+def create_streamingresponse(returnvalue, chunksize=16):
+    """Create a response that will return the given value in chunks
+    when calling the iter_content method
+
+    :param returnvalue: the json for the response body
+    :type returnvalue: :class:`dict`
+    :param chunksize: the number of bytes per chunk
+    :type chunksize: :class:`int`
+    :returns: a mock object with a mocked iter_content method
+    :rtype: :class:`mock.Mock`
+    :raises: None
+    """
+    data = json.dumps(returnvalue).encode('utf-8')
+    mockresponse = mock.Mock()
+    mockresponse.iter_content.return_value = [data[i:i + chunksize]
+                                              for i in range(0, len(data), chunksize)]
+    return mockresponse
+
+
+def create_response(status_code=200, content=b'', **headers):
+    """Create a real response with the given status, body and headers
+
+    :param status_code: the status code
+    :type status_code: :class:`int`
+    :param content: the body
+    :type content: :class:`bytes`
+    :param headers: the headers
+    :returns: the response. Its raw body is a mock, so it can be closed.
+    :rtype: :class:`requests.Response`
+    :raises: None
+    """
+    r = requests.Response()
+    r.status_code = status_code
+    r._content = content
+    r.headers.update(headers)
+    r.raw = mock.Mock()
+    return r
+
+
+class Clock(object):
+    """Fake timer, that only advances when told so or when sleeping"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+
 @pytest.fixture(scope="function")
 def mock_session(monkeypatch):
     """Replace the request method of session with a mock."""
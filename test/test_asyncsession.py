@@ -0,0 +1,115 @@
+import time
+
+import mock
+import pytest
+import requests
+
+from benchmarks import standin
+from pytwitcherapi import session
+
+asyncio = pytest.importorskip('asyncio')
+asyncsession = pytest.importorskip('pytwitcherapi.asyncsession')
+
+
+@pytest.fixture(scope='function')
+def ats(request, ts):
+    """Return a :class:`asyncsession.AsyncTwitchSession` that wraps ts"""
+    ats = asyncsession.AsyncTwitchSession(session=ts, maxworkers=4)
+    request.addfinalizer(ats.close)
+    return ats
+
+
+@pytest.fixture(scope='function')
+def loop(request):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    def fin():
+        asyncio.set_event_loop(None)
+        loop.close()
+    request.addfinalizer(fin)
+    return loop
+
+
+def test_methods_are_wrapped(ats):
+    for m in asyncsession.AsyncTwitchSession.session_methods:
+        method = getattr(ats, m)
+        assert method.__name__ == m
+        assert method.__doc__ == getattr(session.TwitchSession, m).__doc__
+
+
+def test_connection_pool(ts):
+    adapter = ts.get_adapter(session.TWITCH_KRAKENURL)
+    ats = asyncsession.AsyncTwitchSession(session=ts, maxworkers=4)
+    assert ats.session.get_adapter(session.TWITCH_KRAKENURL) is adapter
+    ats.close()
+    ats = asyncsession.AsyncTwitchSession(maxworkers=4)
+    assert ats.session.get_adapter(session.TWITCH_KRAKENURL)._pool_maxsize == 4
+    ats.close()
+
+
+def test_get_channel(ats, loop, get_channel_response, channel1json):
+    requests.Session.request.return_value = get_channel_response
+    names = [channel1json['name']] * 3
+    futures = [ats.get_channel(n) for n in names]
+    channels = loop.run_until_complete(asyncio.gather(*futures))
+    assert len(channels) == 3
+    for c in channels:
+        assert c.name == channel1json['name']
+    assert requests.Session.request.call_count == 3
+
+
+def test_error_is_raised(ats, loop):
+    requests.Session.request.side_effect = requests.HTTPError()
+    with pytest.raises(requests.HTTPError):
+        loop.run_until_complete(ats.get_channel('test_channel'))
+
+
+def test_close(ats, monkeypatch):
+    monkeypatch.setattr(session.TwitchSession, 'close', mock.Mock())
+    ats.close()
+    ats.session.close.assert_called_with()
+
+
+@pytest.fixture(scope='function')
+def standinserver(request):
+    pytest.importorskip('aiohttp')
+    with standin.StandinServer(latency=0.2) as server:
+        with server.patch_session():
+            yield server
+
+
+def test_aiohttp_requests_in_flight(standinserver, loop, mock_session):
+    ats = asyncsession.AsyncTwitchSession(maxworkers=1, use_aiohttp=True)
+    names = ['channel%s' % i for i in range(50)]
+    started = time.time()
+    channels, errors = loop.run_until_complete(ats.get_channels(names + ['channel1']))
+    # with one request at a time, this would take 10 seconds
+    assert time.time() - started < 3
+    assert sorted(channels) == sorted(names)
+    assert channels['channel7'].name == 'channel7'
+    assert errors == {}
+    streams = loop.run_until_complete(ats.get_streams(channels=['channel3', 'channel1']))
+    assert [s.channel.name for s in streams] == ['channel1', 'channel3']
+    # the blocking session was not used
+    assert requests.Session.request.call_count == 0
+    loop.run_until_complete(ats.close())
+    assert ats.transport.clientsession is None
+
+
+def test_aiohttp_http_error(standinserver, loop):
+    standinserver.errorrate = 1.0
+    ats = asyncsession.AsyncTwitchSession(use_aiohttp=True)
+    with pytest.raises(requests.HTTPError):
+        loop.run_until_complete(ats.get_channel('channel1'))
+    channels, errors = loop.run_until_complete(ats.get_channels(['channel1']))
+    assert isinstance(errors['channel1'], requests.HTTPError)
+    loop.run_until_complete(ats.close())
+
+
+def test_aiohttp_falls_back_to_executor(ats, loop):
+    pytest.importorskip('aiohttp')
+    ats = asyncsession.AsyncTwitchSession(session=ats.session, use_aiohttp=True)
+    ats.session.get_quality_options = mock.Mock(return_value=['source'])
+    assert loop.run_until_complete(ats.get_quality_options('channel1')) == ['source']
+    loop.run_until_complete(ats.close())
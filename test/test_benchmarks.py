@@ -0,0 +1,64 @@
+import json
+
+import pytest
+import requests
+
+from benchmarks import bench_import, bench_json, bench_load, standin
+from pytwitcherapi import hls, jsonutils, models, session
+
+
+@pytest.fixture(scope='function')
+def standinserver():
+    with standin.StandinServer() as server:
+        with server.patch_session():
+            yield server
+
+
+def test_standin_streams(standinserver):
+    ts = session.TwitchSession()
+    streams = ts.get_streams(limit=10, offset=995)
+    assert [s.channel.name for s in streams] == ['channel%s' % i for i in range(995, 1000)]
+    assert ts.get_channel('channel7').name == 'channel7'
+    assert len(ts.top_games(limit=5)) == 5
+
+
+def test_standin_streams_filtered(standinserver):
+    ts = session.TwitchSession()
+    streams = ts.get_streams(channels=['channel3', 'unknown', 'channel1', 'channel5000'])
+    assert [s.channel.name for s in streams] == ['channel1', 'channel3']
+    assert ts.get_streams(game=standin.GAME, channels=['channel2'])[0].channel.name == 'channel2'
+    assert ts.get_streams(game='Tetris') == []
+
+
+def test_standin_hls(standinserver):
+    ts = session.TwitchSession()
+    assert ts.get_quality_options('channel1') == ['source', 'low']
+    segments = hls.MediaPlaylistPoller(ts, 'channel1', liveedge=2).poll()
+    assert len(segments) == 2
+    assert len(ts.get(segments[0].uri).content) == standin.SEGMENT_SIZE
+
+
+def test_standin_errors(standinserver):
+    standinserver.errorrate = 1.0
+    with pytest.raises(requests.HTTPError):
+        session.TwitchSession().get_channel('channel1')
+    assert standinserver.errors == 1
+
+
+def test_bench_load_run(standinserver):
+    result = bench_load.run(session.TwitchSession(), 'channel', 20, 4)
+    assert len(result.latencies) == 20
+    assert result.errors == 0
+    assert bench_load.percentile(result.latencies, 50) <= result.latencies[-1]
+
+
+def test_bench_import_loaded_dependencies():
+    assert bench_import.loaded_dependencies('import pytwitcherapi') == []
+    assert 'requests' in bench_import.loaded_dependencies('import pytwitcherapi.session')
+
+
+def test_bench_json_body(tmpdir):
+    streams = models.Stream.wrap_search(bench_json._Response(bench_json.load_body()), jsonutils.loads)
+    assert [s.channel.name for s in streams] == ['test_channel', 'loremipsum']
+    generated = json.loads(bench_json.load_body(str(tmpdir.join('missing.json'))).decode('utf-8'))
+    assert len(generated['streams']) == 100
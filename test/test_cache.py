@@ -0,0 +1,145 @@
+from pytwitcherapi import cache
+
+from . import conftest
+
+
+def test_lru_evicts_least_recently_used():
+    c = cache.LRUCache(maxsize=2)
+    c.set('a', 1)
+    c.set('b', 2)
+    assert c.get('a') == 1  # a is now recently used
+    c.set('c', 3)
+    assert 'b' not in c
+    assert c.get('a') == 1
+    assert c.get('c') == 3
+    assert len(c) == 2
+
+
+def test_ttl_expires():
+    clock = conftest.Clock()
+    c = cache.TTLCache(ttl=10, timer=clock)
+    c.set('a', 1)
+    c.set('b', 2, ttl=20)
+    clock.now += 15
+    assert c.get('a') is None
+    assert c.get('b') == 2
+    assert 'a' not in c
+    assert c.pop('b') == 2
+
+
+def test_response_cache_ttl_lookup():
+    rc = cache.ResponseCache(ttls={'channels/': 300, 'streams': 30,
+                                   'streams/summary': 5},
+                             default_ttl=1)
+    assert rc.get_ttl('channels/test') == 300
+    assert rc.get_ttl('streams/test') == 30
+    assert rc.get_ttl('streams/summary') == 5
+    assert rc.get_ttl('games/top') == 1
+
+
+def test_response_cache_fresh():
+    clock = conftest.Clock()
+    rc = cache.ResponseCache(default_ttl=10, timer=clock)
+    key = rc.make_key('http://test/url', {'b': 1, 'a': 2})
+    assert key == rc.make_key('http://test/url', {'a': 2, 'b': 1})
+    r = conftest.create_response()
+    assert rc.update(key, 'endpoint', r) is r
+    assert rc.get_fresh(key) is r
+    clock.now += 11
+    assert rc.get_fresh(key) is None
+    # no etag, so no revalidation possible
+    assert rc.get_etag(key) is None
+
+
+def test_response_cache_revalidate():
+    clock = conftest.Clock()
+    rc = cache.ResponseCache(default_ttl=10, timer=clock)
+    key = rc.make_key('http://test/url')
+    r = conftest.create_response(**{'ETag': '"abc"'})
+    rc.update(key, 'endpoint', r)
+    clock.now += 11
+    assert rc.get_fresh(key) is None
+    assert rc.get_etag(key) == '"abc"'
+    assert rc.update(key, 'endpoint', conftest.create_response(304)) is r
+    assert rc.get_fresh(key) is r
+
+
+def test_response_cache_key_params():
+    url = 'http://test/streams'
+    key = cache.ResponseCache.make_key(url, {'channel': ['a', 'b']}, 'token')
+    assert key == (url + '?channel=a&channel=b', 'token')
+    assert cache.ResponseCache.make_key(url, [('channel', 'a'), ('channel', 'b')], 'token') == key
+    assert cache.ResponseCache.make_key(url, 'channel=a&channel=b', 'token') == key
+    assert cache.ResponseCache.make_key(url, {'channel': 'a,b'}) != key
+
+
+def test_response_cache_ignores_errors():
+    rc = cache.ResponseCache(default_ttl=10)
+    key = rc.make_key('http://test/url')
+    rc.update(key, 'endpoint', conftest.create_response(404))
+    assert len(rc) == 0
+
+
+def test_sized_lru_evicts_by_size():
+    c = cache.SizedLRUCache(maxbytes=10)
+    c.set('a', b'1234')
+    c.set('b', b'1234')
+    assert c.get('a') == b'1234'  # a is now recently used
+    c.set('c', b'1234')
+    assert 'b' not in c
+    assert 'a' in c
+    assert c.size == 8
+
+
+def test_sized_lru_too_big():
+    c = cache.SizedLRUCache(maxbytes=10)
+    c.set('a', b'1')
+    c.set('a', b'12345678901')
+    assert 'a' not in c
+    assert c.size == 0
+
+
+def test_disk_cache(tmpdir):
+    c = cache.DiskCache(str(tmpdir))
+    c.set((25, 1.0), b'picture')
+    c.set((26, 1.0), b'picture')
+    assert len(tmpdir.join('objects').listdir()) == 1  # content addressed
+    assert cache.DiskCache(str(tmpdir)).get((26, 1.0)) == b'picture'
+    assert c.get((27, 1.0)) is None
+    assert c.size == 7
+
+
+def test_disk_cache_evicts_least_recently_used(tmpdir):
+    c = cache.DiskCache(str(tmpdir), maxbytes=10)
+    c.set('a', b'aaaa')
+    c.set('b', b'bbbb')
+    objects = sorted(tmpdir.join('objects').listdir(), key=lambda p: p.read())
+    objects[0].setmtime(1000)  # a
+    objects[1].setmtime(2000)  # b
+    c.set('c', b'cccc')
+    assert c.get('a') is None
+    assert c.get('b') == b'bbbb'
+    assert c.size == 8
+    assert len(tmpdir.join('keys').listdir()) == 2
+
+
+def test_disk_cache_removes_interrupted_writes(tmpdir):
+    c = cache.DiskCache(str(tmpdir))
+    c.set('a', b'aaaa')
+    assert tmpdir.join('tmp').listdir() == []
+    tmpdir.join('tmp', 'tmpleftover').write('aa')
+    cache.DiskCache(str(tmpdir))
+    assert tmpdir.join('tmp').listdir() == []
+    assert sorted(p.basename for p in tmpdir.listdir()) == ['keys', 'objects', 'tmp']
+
+
+def test_tiered_cache_promotes(tmpdir):
+    disk = cache.DiskCache(str(tmpdir))
+    disk.set('a', b'data')
+    c = cache.TieredCache(cache.SizedLRUCache(), disk)
+    assert c.get('a') == b'data'
+    assert c.memory.get('a') == b'data'
+    c.set('b', b'other')
+    assert disk.get('b') == b'other'
+    c.clear()
+    assert c.get('a') is None
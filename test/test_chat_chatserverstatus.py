@@ -30,3 +30,23 @@ def test_lt(servers):
     assert sortedservers == expected,\
         """Server should be sorted like this: online, then offline,
 little errors, then more errors, little lag, then more lag."""
+
+
+def test_sort_key(servers):
+    assert servers[2].sort_key == (0, 0, 200)
+    assert servers[1].sort_key == (99, 0, 0)
+
+
+def test_rank_chat_servers(servers):
+    addresses = ['0.0.0.0:80', servers[1].address, servers[0].address,
+                 servers[3].address, servers[2].address]
+    ranked = client.rank_chat_servers(addresses, servers)
+    assert ranked == [servers[2].address, servers[3].address,
+                      servers[0].address, servers[1].address, '0.0.0.0:80']
+
+
+def test_rank_chat_servers_index(servers):
+    index = dict((s.address, s) for s in servers)
+    addresses = [servers[0].address, servers[2].address]
+    assert client.rank_chat_servers(addresses, index) ==\
+        [servers[2].address, servers[0].address]
@@ -246,6 +246,19 @@ def test_disconnect(ircserver, ircclient):
 when you set the channel to None'
 
 
+def test_nickname_without_user_query(authts, channel1, monkeypatch):
+    authts.get_chat_server = lambda channel: ('127.0.0.1', 6667)
+    authts.query_login_user = mock.Mock()
+    authts.current_user = None
+    monkeypatch.setattr(chat.IRCClient, '_connect', mock.Mock())
+    client = chat.IRCClient(authts, channel1, nickname='somenick')
+    assert not authts.query_login_user.called
+    for args in chat.IRCClient._connect.call_args_list:
+        assert args[0][3] == 'somenick'
+    assert chat.IRCClient._connect.call_count == 2
+    client.shutdown()
+
+
 def assert_client_got_message(client, message):
     """Assert that the client has a message in the message queue,
     that is eqaul to the given one
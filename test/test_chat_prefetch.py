@@ -0,0 +1,70 @@
+import sys
+import threading
+
+import mock
+import pytest
+
+from pytwitcherapi import chat
+from pytwitcherapi.chat import message
+
+if sys.version_info[0] == 2:
+    import Queue as queue
+else:
+    import queue
+
+
+def create_message(*emoteids):
+    return mock.Mock(emotes=[message.Emote(i, [(0, 1)]) for i in emoteids])
+
+
+@pytest.fixture(scope='function')
+def mock_emotesession():
+    ts = mock.Mock()
+    ts.fetched = []
+    ts.get_emote_picture.side_effect = lambda e, size: ts.fetched.append((e.emoteid, size))
+    return ts
+
+
+def test_feed_deduplicates(mock_emotesession):
+    p = chat.EmotePrefetcher(mock_emotesession, sizes=(1.0, 2.0))
+    p.feed(create_message(1, 2))
+    p.feed(create_message(2, 3))
+    assert p.queue.qsize() == 6
+    p.start()
+    p.stop(timeout=5)
+    assert sorted(mock_emotesession.fetched) == [(1, 1.0), (1, 2.0), (2, 1.0),
+                                                 (2, 2.0), (3, 1.0), (3, 2.0)]
+
+
+def test_queue_full(mock_emotesession):
+    p = chat.EmotePrefetcher(mock_emotesession, queuesize=1)
+    assert p.add(1)
+    assert not p.add(2)
+    p.start()
+    p.stop(timeout=5)
+    # dropped emotes can be queued again
+    assert p.add(2)
+
+
+def test_failed_download_retried(mock_emotesession):
+    failed = threading.Event()
+
+    def fail(e, size):
+        failed.set()
+        raise IOError()
+    mock_emotesession.get_emote_picture.side_effect = fail
+    p = chat.EmotePrefetcher(mock_emotesession, maxworkers=1)
+    p.start()
+    p.add(1)
+    p.stop(timeout=5)
+    assert failed.is_set()
+    assert p.add(1)
+
+
+def test_store_message_feeds_prefetcher():
+    client = mock.Mock(messages=queue.Queue())
+    event = chat.Event3('pubmsg', 'nick!user@host', '#channel', ['Kappa'],
+                        [chat.Tag('emotes', '25:0-4')])
+    chat.IRCClient.store_message(client, None, event)
+    m = client.messages.get()
+    client.emote_prefetcher.feed.assert_called_with(m)
@@ -0,0 +1,152 @@
+import threading
+import time
+
+import pytest
+
+from pytwitcherapi import concurrency
+
+
+def test_map_concurrent_order():
+    results = concurrency.map_concurrent(lambda x: x * 2, range(20), 4)
+    assert results == [x * 2 for x in range(20)]
+
+
+def test_map_concurrent_bounded():
+    lock = threading.Lock()
+    running = [0, 0]  # current, maximum
+    barrier = threading.Event()
+
+    def func(x):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        barrier.wait(0.01)
+        with lock:
+            running[0] -= 1
+        return x
+
+    concurrency.map_concurrent(func, range(20), 3)
+    assert running[1] <= 3
+
+
+def test_map_concurrent_single_item_no_threads():
+    threads = []
+    concurrency.map_concurrent(lambda x: threads.append(threading.current_thread()), [1], 4)
+    assert threads == [threading.current_thread()]
+
+
+def test_map_concurrent_raises():
+    def func(x):
+        if x == 3:
+            raise ValueError(x)
+        return x
+
+    with pytest.raises(ValueError):
+        concurrency.map_concurrent(func, range(5), 2)
+
+
+def _make_fetch(items, calls):
+    def fetch(limit, offset):
+        calls.append((limit, offset))
+        return items[offset:offset + limit]
+    return fetch
+
+
+def test_map_settled():
+    def func(x):
+        if x == 3:
+            raise ValueError(x)
+        return x * 2
+
+    results, errors = concurrency.map_settled(func, [1, 3, 2, 1], 4)
+    assert results == {1: 2, 2: 4}
+    assert list(errors) == [3]
+    assert isinstance(errors[3], ValueError)
+
+
+def test_iter_pages():
+    calls = []
+    items = list(range(25))
+    result = list(concurrency.iter_pages(_make_fetch(items, calls), 10, key=lambda x: x))
+    assert result == items
+    assert calls == [(10, 0), (10, 10), (10, 20)]
+
+
+def test_iter_pages_exact_pages():
+    calls = []
+    items = list(range(20))
+    result = list(concurrency.iter_pages(_make_fetch(items, calls), 10, key=lambda x: x))
+    assert result == items
+    # the last, empty page ends the iteration
+    assert calls == [(10, 0), (10, 10), (10, 20)]
+
+
+def test_iter_pages_duplicates():
+    pages = {0: [1, 2, 3], 3: [3, 4, 5], 6: [6]}
+
+    def fetch(limit, offset):
+        return pages[offset]
+
+    result = list(concurrency.iter_pages(fetch, 3, key=lambda x: x))
+    assert result == [1, 2, 3, 4, 5, 6]
+
+
+def test_iter_pages_prefetch():
+    started = []
+    second_page = threading.Event()
+
+    def fetch(limit, offset):
+        started.append(offset)
+        if offset:
+            second_page.set()
+            return []
+        return [1, 2]
+
+    it = concurrency.iter_pages(fetch, 2, key=lambda x: x)
+    assert next(it) == 1
+    # the second page is requested before the first one is consumed
+    assert second_page.wait(1)
+    assert list(it) == [2]
+
+
+def test_singleflight_coalesces():
+    sf = concurrency.SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return 'result'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(sf.do('key', func)))
+    leader.start()
+    started.wait(1)
+    followers = [threading.Thread(target=lambda: results.append(sf.do('key', func)))
+                 for i in range(5)]
+    for t in followers:
+        t.start()
+    time.sleep(0.05)  # give the followers time to wait for the leader
+    release.set()
+    for t in [leader] + followers:
+        t.join(1)
+    assert results == ['result'] * 6
+    assert calls == [1]
+    # a new call after the flight is executed again
+    sf.do('key', func)
+    assert calls == [1, 1]
+
+
+def test_singleflight_exception():
+    sf = concurrency.SingleFlight()
+
+    def func():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        sf.do('key', func)
+    with pytest.raises(ValueError):
+        sf.do('key', func)
@@ -0,0 +1,145 @@
+import io
+import time
+
+import mock
+import pytest
+import requests
+
+from pytwitcherapi import hls
+
+from . import conftest
+
+
+def create_playlist(first, count, targetduration=2, endlist=False):
+    lines = ['#EXTM3U',
+             '#EXT-X-VERSION:3',
+             '#EXT-X-TARGETDURATION:%s' % targetduration,
+             '#EXT-X-MEDIA-SEQUENCE:%s' % first]
+    for i in range(first, first + count):
+        lines.append('#EXTINF:2.000,')
+        lines.append('index-%s.ts' % i)
+    if endlist:
+        lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture(scope='function')
+def mock_hlssession():
+    ts = mock.Mock()
+    ts.get_variant_url.return_value = 'http://video.test/hls/chunked/py-index-live.m3u8?token=a'
+    return ts
+
+
+def set_playlists(ts, *texts):
+    ts.get.side_effect = [mock.Mock(text=t) for t in texts]
+
+
+def test_parse():
+    p = hls.MediaPlaylist.parse(create_playlist(10, 3, 4),
+                                'http://video.test/hls/index.m3u8', after=10)
+    assert p.mediasequence == 10
+    assert p.targetduration == 4.0
+    assert p.lastsequence == 12
+    assert not p.endlist
+    assert [s.sequence for s in p.segments] == [11, 12]
+    assert p.segments[0].uri == 'http://video.test/hls/index-11.ts'
+    assert p.segments[0].duration == 2.0
+
+
+def test_parse_empty():
+    p = hls.MediaPlaylist.parse('#EXTM3U\n#EXT-X-MEDIA-SEQUENCE:5\n#EXT-X-ENDLIST\n')
+    assert p.segments == []
+    assert p.lastsequence is None
+    assert p.endlist
+
+
+def test_poll_yields_new_segments(mock_hlssession):
+    set_playlists(mock_hlssession, create_playlist(0, 5), create_playlist(2, 5),
+                  create_playlist(7, 2))
+    poller = hls.MediaPlaylistPoller(mock_hlssession, 'test_channel', liveedge=2)
+    assert [s.sequence for s in poller.poll()] == [3, 4]
+    assert [s.sequence for s in poller.poll()] == [5, 6]
+    assert [s.sequence for s in poller.poll()] == [7, 8]
+    mock_hlssession.get_variant_url.assert_called_once_with('test_channel', 'source')
+
+
+def test_poll_restarted_sequence(mock_hlssession):
+    set_playlists(mock_hlssession, create_playlist(100, 3), create_playlist(0, 2))
+    poller = hls.MediaPlaylistPoller(mock_hlssession, 'test_channel', liveedge=None)
+    assert len(poller.poll()) == 3
+    assert [s.sequence for s in poller.poll()] == [0, 1]
+
+
+def test_poll_refreshes_url(mock_hlssession):
+    mock_hlssession.get.side_effect = [mock.Mock(text=create_playlist(0, 1)),
+                                       requests.HTTPError(),
+                                       mock.Mock(text=create_playlist(0, 2))]
+    poller = hls.MediaPlaylistPoller(mock_hlssession, 'test_channel')
+    poller.poll()
+    assert [s.sequence for s in poller.poll()] == [1]
+    mock_hlssession.get_playlist.assert_called_once_with('test_channel', cached=False)
+
+
+def test_iter_cadence(mock_hlssession):
+    clock = conftest.Clock()
+    set_playlists(mock_hlssession, create_playlist(0, 3, 4), create_playlist(0, 3, 4),
+                  create_playlist(1, 3, 4, endlist=True))
+    poller = hls.MediaPlaylistPoller(mock_hlssession, 'test_channel', liveedge=1,
+                                     timer=clock, sleep=clock.sleep)
+    assert [s.sequence for s in poller] == [2, 3]
+    # full target duration after new segments, half if nothing changed
+    assert clock.sleeps == [4.0, 2.0]
+
+
+def create_segments(count):
+    return [hls.Segment(i, 'http://video.test/index-%s.ts' % i, 2.0) for i in range(count)]
+
+
+def test_download_in_order(mock_hlssession):
+    # later segments finish first
+    def get(uri, stream):
+        i = int(uri.rsplit('-', 1)[1].split('.')[0])
+
+        def iter_content(chunksize):
+            time.sleep(0.01 * (5 - i))
+            for j in range(3):
+                yield ('%s.%s|' % (i, j)).encode('ascii')
+        return mock.Mock(iter_content=iter_content)
+    mock_hlssession.get.side_effect = get
+    sink = io.BytesIO()
+    d = hls.SegmentDownloader(mock_hlssession, sink, prefetch=3, maxchunks=1)
+    written = d.download(create_segments(5))
+    expected = ''.join('%s.%s|' % (i, j) for i in range(5) for j in range(3)).encode('ascii')
+    assert sink.getvalue() == expected
+    assert written == len(expected)
+
+
+def test_download_skips_errors(mock_hlssession):
+    def get(uri, stream):
+        if uri.endswith('-1.ts'):
+            raise requests.HTTPError()
+        return mock.Mock(iter_content=lambda chunksize: [uri[-4:].encode('ascii')])
+    mock_hlssession.get.side_effect = get
+    sink = io.BytesIO()
+    hls.SegmentDownloader(mock_hlssession, sink).download(create_segments(3))
+    assert sink.getvalue() == b'0.ts2.ts'
+
+
+def test_download_raises_errors(mock_hlssession):
+    mock_hlssession.get.side_effect = requests.HTTPError()
+    d = hls.SegmentDownloader(mock_hlssession, io.BytesIO(), skip_errors=False)
+    with pytest.raises(requests.HTTPError):
+        d.download(create_segments(3))
+
+
+def test_feed_does_not_block_after_stop(mock_hlssession):
+    def segments():
+        raise ValueError()
+        yield
+    d = hls.SegmentDownloader(mock_hlssession, io.BytesIO())
+    d.stop()
+    order = hls.queue.Queue(maxsize=1)
+    order.put('full')
+    # returns, although the consumer is gone and the queue is full
+    d._feed(segments(), mock.Mock(), order)
+    assert order.get(block=False) == 'full'
@@ -0,0 +1,95 @@
+import json
+
+import mock
+import pytest
+
+from pytwitcherapi import jsonutils
+
+
+def chunked(obj, size):
+    data = json.dumps(obj).encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 1000])
+def test_iter_array(size):
+    doc = {'_total': 12345, '_links': {'next': 'x', 'a': [1, {'b': '}]'}]},
+           'streams': [{'name': u'über', 'n': 1}, 123456, 'a,b]', [1, 2], None],
+           'after': 1}
+    items = list(jsonutils.iter_array(chunked(doc, size), 'streams'))
+    assert items == doc['streams']
+
+
+def test_iter_array_numbers_split():
+    data = b'{"a": [1.5, -2e-3, 10.25, 3E+2, 0, 12, -7.125e1]}'
+    expected = [1.5, -2e-3, 10.25, 3E+2, 0, 12, -7.125e1]
+    for i in range(1, len(data)):
+        assert list(jsonutils.iter_array([data[:i], data[i:]], 'a')) == expected
+    for size in range(1, 8):
+        chunks = [data[i:i + size] for i in range(0, len(data), size)]
+        assert list(jsonutils.iter_array(chunks, 'a')) == expected
+
+
+def test_iter_array_empty():
+    assert list(jsonutils.iter_array(chunked({'top': []}, 2), 'top')) == []
+
+
+def test_iter_array_missing_key():
+    with pytest.raises(KeyError):
+        list(jsonutils.iter_array(chunked({'a': 1, 'b': [1]}, 2), 'top'))
+
+
+def test_iter_array_invalid():
+    with pytest.raises(ValueError):
+        list(jsonutils.iter_array([b'{"top": [{"a": 1}, {"b"'], 'top'))
+
+
+def test_iter_array_lazy():
+    chunks = iter(chunked({'top': [1, 2, 3]}, 1))
+    it = jsonutils.iter_array(chunks, 'top')
+    assert next(it) == 1
+    assert next(chunks) is not None
+
+
+def test_iter_array_large_value_linear():
+    calls = []
+
+    class Decoder(json.JSONDecoder):
+        def raw_decode(self, s, idx=0):
+            calls.append(idx)
+            return super(Decoder, self).raw_decode(s, idx)
+
+    doc = {'top': [list(range(2000))]}
+    items = list(jsonutils.iter_array(chunked(doc, 1), 'top', Decoder()))
+    assert items == doc['top']
+    # the value spans thousands of chunks, but is decoded only a few times
+    assert len(calls) < 40
+
+
+def test_iter_response_array():
+    response = mock.Mock()
+    response.iter_content.return_value = chunked({'games': [{'a': 1}]}, 4)
+    assert list(jsonutils.iter_response_array(response, 'games', 4)) == [{'a': 1}]
+    response.iter_content.assert_called_with(4)
+    response.close.assert_called_with()
+
+
+def test_get_fast_loads_fallback():
+    loads = jsonutils.get_fast_loads(('nonexistingjsonmodule',))
+    assert loads is jsonutils.loads
+    # json.loads only accepts bytes since python 3.6
+    assert loads(u'{"a": "\u00fc"}'.encode('utf-8')) == {'a': u'\u00fc'}
+    assert loads(u'{"a": 1}') == {'a': 1}
+
+
+def test_get_fast_loads():
+    loads = jsonutils.get_fast_loads()
+    assert loads(b'{"a": [1, "b"]}') == {'a': [1, 'b']}
+
+
+def test_decode():
+    response = mock.Mock()
+    response.json.return_value = {'a': 1}
+    response.content = b'{"a": 2}'
+    assert jsonutils.decode(response) == {'a': 1}
+    assert jsonutils.decode(response, json.loads) == {'a': 2}
@@ -0,0 +1,105 @@
+import pytest
+import requests
+
+from pytwitcherapi import cache, metrics, retry, session
+
+from . import conftest
+
+
+@pytest.mark.parametrize('url,expected', [
+    ('https://api.twitch.tv/kraken/channels/foo', 'kraken/channels/{name}'),
+    ('https://api.twitch.tv/kraken/channels/foo/follows?limit=1', 'kraken/channels/{name}/follows'),
+    ('https://api.twitch.tv/kraken/streams/foo', 'kraken/streams/{name}'),
+    ('https://api.twitch.tv/kraken/streams/followed', 'kraken/streams/followed'),
+    ('https://api.twitch.tv/kraken/streams?limit=100', 'kraken/streams'),
+    ('https://api.twitch.tv/kraken/user', 'kraken/user'),
+    ('https://api.twitch.tv/kraken/user/foo', 'kraken/user/{name}'),
+    ('https://api.twitch.tv/api/channels/foo/access_token', 'api/channels/{name}/access_token'),
+    ('http://usher.twitch.tv/api/channel/hls/foo.m3u8?sig=1', 'api/channel/hls/{name}.m3u8'),
+    ('http://static-cdn.jtvnw.net/emoticons/v1/25/1.0', 'emoticons/v1/{id}/{size}'),
+    ('http://video.example/hls/channel12/chunked/345.ts', 'hls/{id}/chunked/{id}'),
+])
+def test_normalize_endpoint(url, expected):
+    assert metrics.normalize_endpoint(url) == expected
+
+
+def test_histogram():
+    h = metrics.Histogram((1, 10))
+    for value in (0.5, 1, 5, 20):
+        h.observe(value)
+    assert h.snapshot() == {'buckets': [(1, 2), (10, 3), (float('inf'), 4)],
+                            'sum': 26.5, 'count': 4}
+
+
+def test_get_response_size():
+    assert metrics.get_response_size(conftest.create_response(content=b'abc')) == 3
+    assert metrics.get_response_size(conftest.create_response(**{'Content-Length': '10'}), stream=True) == 10
+    assert metrics.get_response_size(conftest.create_response(), stream=True) is None
+
+
+def test_metrics_snapshot():
+    m = metrics.Metrics()
+    url = 'https://api.twitch.tv/kraken/channels/'
+    m.record_response('get', url + 'foo', 0.02, conftest.create_response(content=b'abc'))
+    m.record_response('GET', url + 'bar', 0.2, conftest.create_response(404))
+    m.record_error('GET', url + 'foo', 1.0)
+    m.record_retry('GET', url + 'foo')
+    m.record_cache_hit('GET', url + 'bar')
+    snapshot = m.snapshot()
+    assert list(snapshot) == [('GET', 'kraken/channels/{name}')]
+    s = snapshot[('GET', 'kraken/channels/{name}')]
+    assert s['statuses'] == {'200': 1, '404': 1, 'error': 1}
+    assert s['latency']['count'] == 3
+    assert s['size']['count'] == 2
+    assert s['size']['sum'] == 3
+    assert s['retries'] == 1
+    assert s['cache_hits'] == 1
+    m.reset()
+    assert m.snapshot() == {}
+
+
+def test_metrics_to_prometheus():
+    m = metrics.Metrics()
+    m.record_response('GET', 'https://api.twitch.tv/kraken/streams', 0.02,
+                      conftest.create_response(content=b'abc'))
+    text = m.to_prometheus()
+    labels = 'method="GET",endpoint="kraken/streams"'
+    assert '# TYPE pytwitcherapi_request_duration_seconds histogram\n' in text
+    assert 'pytwitcherapi_request_duration_seconds_bucket{%s,le="0.01"} 0\n' % labels in text
+    assert 'pytwitcherapi_request_duration_seconds_bucket{%s,le="0.025"} 1\n' % labels in text
+    assert 'pytwitcherapi_request_duration_seconds_bucket{%s,le="+Inf"} 1\n' % labels in text
+    assert 'pytwitcherapi_request_duration_seconds_count{%s} 1\n' % labels in text
+    assert 'pytwitcherapi_response_size_bytes_sum{%s} 3.0\n' % labels in text
+    assert 'pytwitcherapi_responses_total{%s,status="200"} 1\n' % labels in text
+    assert 'pytwitcherapi_retries_total{%s} 0\n' % labels in text
+    assert 'pytwitcherapi_cache_hits_total{%s} 0\n' % labels in text
+
+
+def test_session_metrics(ts, mock_session):
+    ts.metrics = metrics.Metrics()
+    ts.retry = retry.RetryPolicy(retries=2, random=lambda: 0)
+    requests.Session.request.side_effect = [conftest.create_response(503),
+                                            requests.ConnectionError(),
+                                            conftest.create_response(200, b'{}')]
+    ts.kraken_request('GET', 'channels/foo')
+    s = ts.metrics.snapshot()[('GET', 'kraken/channels/{name}')]
+    assert s['statuses'] == {'503': 1, 'error': 1, '200': 1}
+    assert s['retries'] == 2
+    assert s['latency']['count'] == 3
+
+
+def test_session_metrics_cache_hit(ts, mock_session):
+    ts.metrics = metrics.Metrics()
+    ts.response_cache = cache.ResponseCache(default_ttl=60)
+    requests.Session.request.return_value = conftest.create_response(200, b'{}')
+    for i in range(3):
+        ts.kraken_request('GET', 'streams')
+    s = ts.metrics.snapshot()[('GET', 'kraken/streams')]
+    assert s['statuses'] == {'200': 1}
+    assert s['cache_hits'] == 2
+
+
+def test_session_metrics_disabled(ts, mock_session):
+    assert ts.metrics is None
+    requests.Session.request.return_value = conftest.create_response(200)
+    ts.request('GET', session.TWITCH_KRAKENURL + 'streams')
@@ -24,6 +24,14 @@ def test_wrap_search(search_channels_response, channel1json, channel2json):
         conftest.assert_channel_equals_json(c, j)
 
 
+def test_iter_search(channel1json, channel2json):
+    response = conftest.create_streamingresponse({'channels': [channel1json, channel2json]})
+    channels = list(models.Channel.iter_search(response))
+    assert len(channels) == 2
+    for c, j in zip(channels, [channel1json, channel2json]):
+        conftest.assert_channel_equals_json(c, j)
+
+
 def test_wrap_get_channel(get_channel_response, channel1json):
     c = models.Channel.wrap_get_channel(get_channel_response)
     conftest.assert_channel_equals_json(c, channel1json)
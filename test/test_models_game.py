@@ -39,3 +39,20 @@ def test_wrap_topgames(game1json, game2json):
     assert games[0].channels == 10
     assert games[1].viewers == 543
     assert games[1].channels == 42
+
+
+def test_iter_search(game1json, game2json):
+    response = conftest.create_streamingresponse({'games': [game1json, game2json]})
+    games = list(models.Game.iter_search(response))
+    for g, j in zip(games, [game1json, game2json]):
+        conftest.assert_game_equals_json(g, j)
+
+
+def test_iter_topgames(game1json, game2json):
+    topjson = {"_total": 2,
+               "top": [{"game": game1json, "viewers": 123, "channels": 10},
+                       {"game": game2json, "viewers": 543, "channels": 42}]}
+    games = list(models.Game.iter_topgames(conftest.create_streamingresponse(topjson)))
+    for g, j in zip(games, [game1json, game2json]):
+        conftest.assert_game_equals_json(g, j)
+    assert games[1].channels == 42
@@ -26,3 +26,11 @@ def test_wrap_get_stream(get_stream_response, stream1json):
 def test_wrap_get_offline_stream(get_offline_stream_response):
     s = models.Stream.wrap_get_stream(get_offline_stream_response)
     assert s is None
+
+
+def test_iter_search(stream1json, stream2json):
+    response = conftest.create_streamingresponse({'_total': 2, 'streams': [stream1json, stream2json]})
+    streams = list(models.Stream.iter_search(response))
+    assert len(streams) == 2
+    for s, j in zip(streams, [stream1json, stream2json]):
+        conftest.assert_stream_equals_json(s, j)
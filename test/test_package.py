@@ -0,0 +1,30 @@
+import importlib
+import subprocess
+import sys
+
+import pytest
+
+import pytwitcherapi
+
+
+def test_exports_match_submodules():
+    for module, names in pytwitcherapi._exports.items():
+        submodule = importlib.import_module('pytwitcherapi.' + module)
+        assert sorted(names) == sorted(submodule.__all__)
+        for name in names:
+            assert getattr(pytwitcherapi, name) is getattr(submodule, name)
+
+
+def test_submodule_attribute():
+    assert pytwitcherapi.cache is importlib.import_module('pytwitcherapi.cache')
+    assert 'TwitchSession' in dir(pytwitcherapi)
+    with pytest.raises(AttributeError):
+        pytwitcherapi.nonexistent
+
+
+def test_import_is_lazy():
+    code = ('import sys, pytwitcherapi; pytwitcherapi.Stream; '
+            'print(",".join(m for m in ("requests_oauthlib", "irc", "pkg_resources") '
+            'if m in sys.modules))')
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.decode('utf-8').strip() == ''
@@ -0,0 +1,102 @@
+import requests
+
+from pytwitcherapi import ratelimit
+
+from . import conftest
+
+
+def create_bucket(rate, capacity=None):
+    clock = conftest.Clock()
+    bucket = ratelimit.TokenBucket(rate, capacity, timer=clock, sleep=clock.sleep)
+    return bucket, clock
+
+
+def test_burst_then_rate():
+    bucket, clock = create_bucket(rate=2, capacity=3)
+    for i in range(3):
+        assert bucket.acquire() == 0
+    assert clock.sleeps == []
+    assert bucket.acquire() == 0.5
+    assert bucket.acquire() == 0.5
+
+
+def test_refill():
+    bucket, clock = create_bucket(rate=1, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 10
+    # refilled only up to the capacity
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 1
+
+
+def test_retry_after():
+    bucket, clock = create_bucket(rate=10)
+    bucket.update(conftest.create_response(429, **{'Retry-After': '5'}))
+    # rate was halved, the bucket is empty after the pause
+    assert bucket.get_rate() == 5
+    assert abs(bucket.acquire() - 5.2) < 1e-9
+
+
+def test_retry_after_spreads_queue():
+    clock = conftest.Clock()
+    bucket = ratelimit.TokenBucket(2, timer=clock, sleep=lambda seconds: None)
+    bucket.update(conftest.create_response(429, **{'Retry-After': '10'}))
+    # queued callers do not fire in a burst, when the pause ends
+    assert [bucket.acquire() for i in range(5)] == [11, 12, 13, 14, 15]
+
+
+def test_backoff_zero_rate():
+    bucket, clock = create_bucket(rate=0)
+    bucket.update(conftest.create_response(429))
+    assert bucket.get_rate() == ratelimit.MIN_RATE
+
+
+def test_backoff_recovers():
+    bucket, clock = create_bucket(rate=10)
+    bucket.update(conftest.create_response(429))
+    assert bucket.factor == 0.5
+    for i in range(10):
+        bucket.update(conftest.create_response(200))
+    assert bucket.factor == 1.0
+
+
+def test_ratelimit_headers():
+    bucket, clock = create_bucket(rate=10)
+    headers = {'Ratelimit-Remaining': '2',
+               'Ratelimit-Reset': str(clock.now + 10)}
+    bucket.update(conftest.create_response(200, **headers))
+    # remaining requests are spread until the reset
+    assert bucket.get_rate() == 0.2
+    assert bucket.tokens == 2
+    clock.now += 11
+    assert bucket.get_rate() == 10
+
+
+def test_ratelimit_exhausted():
+    bucket, clock = create_bucket(rate=10)
+    headers = {'Ratelimit-Remaining': '0',
+               'Ratelimit-Reset': str(clock.now + 10)}
+    bucket.update(conftest.create_response(200, **headers))
+    assert bucket.acquire() >= 10
+
+
+def test_ratelimiter_buckets():
+    bucket1, clock = create_bucket(rate=1)
+    bucket2, clock = create_bucket(rate=1)
+    limiter = ratelimit.RateLimiter({'http://a/': bucket1,
+                                     'http://a/b/': bucket2})
+    assert limiter.get_bucket('http://a/c') is bucket1
+    assert limiter.get_bucket('http://a/b/c') is bucket2
+    assert limiter.get_bucket('http://b/') is None
+    assert limiter.acquire('http://b/') == 0
+
+
+def test_session_uses_ratelimiter(ts, mock_session):
+    bucket, clock = create_bucket(rate=1, capacity=1)
+    ts.ratelimiter = ratelimit.RateLimiter({'http://test/': bucket})
+    requests.Session.request.return_value = conftest.create_response(200)
+    ts.request('GET', 'http://test/a')
+    ts.request('GET', 'http://test/a')
+    assert clock.sleeps == [1]
@@ -0,0 +1,152 @@
+import threading
+import time
+
+import mock
+import pytest
+import requests
+
+from pytwitcherapi import exceptions, retry
+
+from . import conftest
+
+
+@pytest.fixture(scope='function')
+def noretrydelay():
+    return retry.RetryPolicy(retries=2, random=lambda: 0)
+
+
+def test_retry_policy_is_retryable():
+    policy = retry.RetryPolicy(retries=2)
+    assert policy.is_retryable('GET', 0)
+    assert policy.is_retryable('GET', 1, conftest.create_response(503))
+    assert not policy.is_retryable('GET', 2, conftest.create_response(503))
+    assert not policy.is_retryable('GET', 0, conftest.create_response(404))
+    assert not policy.is_retryable('POST', 0)
+
+
+def test_retry_policy_delay():
+    policy = retry.RetryPolicy(backoff=1, maxbackoff=5, random=lambda: 1)
+    assert policy.get_delay(0) == 1
+    assert policy.get_delay(1) == 2
+    assert policy.get_delay(5) == 5
+    assert policy.get_delay(0, conftest.create_response(429, **{'Retry-After': '7'})) == 7
+
+
+def test_circuit_breaker():
+    clock = conftest.Clock()
+    breaker = retry.CircuitBreaker(threshold=2, resettimeout=10, timer=clock)
+    breaker.before_request('host')
+    breaker.record_failure('host')
+    breaker.before_request('host')
+    breaker.record_failure('host')
+    assert breaker.is_open('host')
+    with pytest.raises(exceptions.CircuitOpenError):
+        breaker.before_request('host')
+    # other hosts are not affected
+    breaker.before_request('otherhost')
+    clock.now += 11
+    # trial request
+    breaker.before_request('host')
+    with pytest.raises(exceptions.CircuitOpenError):
+        breaker.before_request('host')
+    breaker.record_success('host')
+    assert not breaker.is_open('host')
+    breaker.before_request('host')
+
+
+def test_session_retries(ts, mock_session, noretrydelay):
+    ts.retry = noretrydelay
+    ok = conftest.create_response(200)
+    failed = conftest.create_response(503)
+    requests.Session.request.side_effect = [failed,
+                                            requests.ConnectionError(),
+                                            ok]
+    assert ts.request('GET', 'http://test/', stream=True) is ok
+    assert requests.Session.request.call_count == 3
+    # the discarded response releases its connection
+    failed.raw.close.assert_called_with()
+    assert not ok.raw.close.called
+
+
+def test_session_retries_exhausted(ts, mock_session, noretrydelay):
+    ts.retry = noretrydelay
+    requests.Session.request.return_value = conftest.create_response(503)
+    with pytest.raises(requests.HTTPError):
+        ts.request('GET', 'http://test/')
+    assert requests.Session.request.call_count == 3
+
+
+def test_session_no_retry_for_post(ts, mock_session, noretrydelay):
+    ts.retry = noretrydelay
+    requests.Session.request.side_effect = requests.ConnectionError()
+    with pytest.raises(requests.ConnectionError):
+        ts.request('POST', 'http://test/')
+    assert requests.Session.request.call_count == 1
+
+
+def test_session_timeout(ts, mock_session):
+    ts.timeout = 3
+    requests.Session.request.return_value = conftest.create_response(200)
+    ts.request('GET', 'http://test/')
+    requests.Session.request.assert_called_with('GET', 'http://test/', timeout=3)
+
+
+def test_session_deadline(ts, mock_session, monkeypatch):
+    clock = conftest.Clock()
+    monkeypatch.setattr(time, 'time', clock)
+    ts.retry = retry.RetryPolicy(retries=5, backoff=4, random=lambda: 1)
+    ts.deadline = 5
+
+    def request(*args, **kwargs):
+        clock.now += 1
+        return conftest.create_response(503)
+
+    requests.Session.request.side_effect = request
+    monkeypatch.setattr(time, 'sleep', mock.Mock(side_effect=lambda s: setattr(clock, 'now', clock.now + s)))
+    with pytest.raises(requests.HTTPError):
+        ts.request('GET', 'http://test/')
+    # first attempt 1s, wait 4s -> deadline reached before second attempt
+    assert requests.Session.request.call_count == 1
+    assert requests.Session.request.call_args[1]['timeout'] == 5
+
+
+def test_session_deadline_tuple_timeout(ts, mock_session, monkeypatch):
+    monkeypatch.setattr(time, 'time', conftest.Clock())
+    ts.deadline = 5
+    requests.Session.request.return_value = conftest.create_response(200)
+    ts.request('GET', 'http://test/', timeout=(3, 10))
+    assert requests.Session.request.call_args[1]['timeout'] == (3, 5)
+    ts.request('GET', 'http://test/', timeout=(3, None))
+    assert requests.Session.request.call_args[1]['timeout'] == (3, 5)
+
+
+def test_session_circuitbreaker(ts, mock_session):
+    ts.circuitbreaker = retry.CircuitBreaker(threshold=1)
+    requests.Session.request.side_effect = requests.ConnectionError()
+    with pytest.raises(requests.ConnectionError):
+        ts.request('GET', 'http://test/')
+    with pytest.raises(exceptions.CircuitOpenError):
+        ts.request('GET', 'http://test/')
+    assert requests.Session.request.call_count == 1
+
+
+def test_session_hedging(ts, mock_session):
+    ts.hedge_after = 0.01
+    slow = conftest.create_response(200)
+    fast = conftest.create_response(200)
+    release = threading.Event()
+    calls = []
+
+    def request(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(1)
+            return slow
+        return fast
+
+    requests.Session.request.side_effect = request
+    try:
+        assert ts.request('GET', 'http://test/') is fast
+    finally:
+        release.set()
+    assert len(calls) == 2
@@ -5,6 +5,11 @@ import requests
 from pytwitcherapi import session
 
 
+@pytest.fixture(autouse=True)
+def clear_chat_status_cache():
+    session._chat_status_cache.clear()
+
+
 @pytest.fixture(scope="function")
 def ts(mock_session):
     """Return a :class:`session.TwitchSession`
@@ -69,3 +74,32 @@ def test_get_chat_server(ts, channel1, fix, request):
     expected = request.getfuncargvalue(fix)
     server, port = ts.get_chat_server(channel1)
     assert (server, port) == expected
+
+
+def test_get_chat_server_shared_status(ts, channel1, mock_chatserverresponse,
+                                       mock_chatpropresponse):
+    assert ts.get_chat_server(channel1) == mock_chatserverresponse
+    # another session only requests the chat servers of the channel
+    requests.Session.request.side_effect = [mock_chatpropresponse]
+    ts2 = session.TwitchSession()
+    assert ts2.get_chat_server(channel1) == mock_chatserverresponse
+    assert requests.Session.request.call_count == 3
+
+
+def test_get_chat_server_cached_servers(ts, channel1, mock_chatserverresponse):
+    ts.get_chat_server(channel1)
+    assert ts.get_chat_server(channel1) == mock_chatserverresponse
+    assert requests.Session.request.call_count == 2
+
+
+def test_get_chat_server_status_failure_not_cached(ts, channel1,
+                                                   mock_failchatserverresponse,
+                                                   mock_serverstatresponse):
+    ts.get_chat_server(channel1)
+    requests.Session.request.side_effect = [mock_serverstatresponse]
+    assert ts.get_chat_server_status() is not None
+
+
+def test_get_chat_servers(ts, channel1, mock_chatserverresponse, servers_json):
+    expected = [(servers_json[i]['ip'], servers_json[i]['port']) for i in (2, 3, 0, 1)]
+    assert ts.get_chat_servers(channel1) == expected
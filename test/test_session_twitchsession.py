@@ -1,6 +1,9 @@
 from __future__ import absolute_import
 
+import json
 import os
+import threading
+import time
 
 import m3u8
 import mock
@@ -9,7 +12,7 @@ import pytest
 import requests
 import requests.utils
 
-from pytwitcherapi import chat, constants, exceptions, models, session
+from pytwitcherapi import cache, chat, constants, exceptions, jsonutils, models, session
 
 from . import conftest
 
@@ -63,6 +66,112 @@ def test_request_kraken(ts, mock_session, kraken_headers):
         "GET", session.TWITCH_KRAKENURL + url, headers=kraken_headers, data=None)
 
 
+def test_request_kraken_cached(ts, mock_session, kraken_headers):
+    ts.response_cache = cache.ResponseCache(default_ttl=0)
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['ETag'] = '"abc"'
+    requests.Session.request.return_value = response
+    assert ts.kraken_request('GET', 'hallo') is response
+    # ttl is 0, so the second request should be conditional
+    notmodified = requests.Response()
+    notmodified.status_code = 304
+    requests.Session.request.return_value = notmodified
+    assert ts.kraken_request('GET', 'hallo') is response
+    kraken_headers['If-None-Match'] = '"abc"'
+    requests.Session.request.assert_called_with(
+        'GET', session.TWITCH_KRAKENURL + 'hallo', headers=kraken_headers, data=None)
+
+
+def test_request_kraken_cached_evicted_before_304(ts, mock_session):
+    ts.response_cache = cache.ResponseCache(default_ttl=0)
+    ts.singleflight = None
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['ETag'] = '"abc"'
+    requests.Session.request.return_value = response
+    ts.kraken_request('GET', 'hallo')
+    notmodified = requests.Response()
+    notmodified.status_code = 304
+    notmodified.raw = mock.Mock()
+    fresh = requests.Response()
+    fresh.status_code = 200
+    sent = []
+
+    def request(method, url, headers, **kwargs):
+        sent.append(headers.get('If-None-Match'))
+        if len(sent) == 1:
+            ts.response_cache.clear()
+            return notmodified
+        return fresh
+    requests.Session.request.side_effect = request
+    assert ts.kraken_request('GET', 'hallo') is fresh
+    assert sent == ['"abc"', None]
+    notmodified.raw.close.assert_called_with()
+
+
+def test_request_kraken_cached_list_params(ts, mock_session):
+    ts.response_cache = cache.ResponseCache(default_ttl=60)
+    response = requests.Response()
+    response.status_code = 200
+    requests.Session.request.return_value = response
+    for params in ({'channel': ['a', 'b']}, [('channel', 'a'), ('channel', 'b')], 'channel=a&channel=b'):
+        assert ts.kraken_request('GET', 'streams', params=params) is response
+    assert requests.Session.request.call_count == 1
+
+
+def test_request_kraken_cached_fresh(ts, mock_session):
+    ts.response_cache = cache.ResponseCache(default_ttl=60)
+    response = requests.Response()
+    response.status_code = 200
+    requests.Session.request.return_value = response
+    for i in range(3):
+        assert ts.kraken_request('GET', 'hallo') is response
+    assert requests.Session.request.call_count == 1
+    # other methods are not cached
+    ts.kraken_request('PUT', 'hallo')
+    assert requests.Session.request.call_count == 2
+
+
+def test_request_kraken_coalesced_list_params(ts, mock_session, kraken_headers):
+    response = requests.Response()
+    response.status_code = 200
+    requests.Session.request.return_value = response
+    for params in ({'channel': ['a', 'b']}, [('channel', 'a'), ('channel', 'b')], 'channel=a&channel=b'):
+        assert ts.kraken_request('GET', 'streams', params=params) is response
+        requests.Session.request.assert_called_with(
+            'GET', session.TWITCH_KRAKENURL + 'streams', params=params,
+            headers=kraken_headers, data=None)
+    assert requests.Session.request.call_count == 3
+
+
+def test_request_kraken_coalesced(ts, mock_session):
+    started = threading.Event()
+    release = threading.Event()
+    response = requests.Response()
+    response.status_code = 200
+
+    def request(*args, **kwargs):
+        started.set()
+        release.wait(1)
+        return response
+
+    requests.Session.request.side_effect = request
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ts.kraken_request('GET', 'hallo')))
+               for i in range(4)]
+    threads[0].start()
+    started.wait(1)
+    for t in threads[1:]:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(1)
+    assert results == [response] * 4
+    assert requests.Session.request.call_count == 1
+
+
 def test_request_oldapi(ts, mock_session, oldapi_headers):
     url = "hallo"
     ts.oldapi_request("GET", url)
@@ -156,11 +265,21 @@ def test_top_games(ts, game1json, game2json,
         headers=kraken_headers, data=None)
 
 
+def test_search_games_no_viewers(ts, games_search_response, mock_fetch_viewers):
+    requests.Session.request.return_value = games_search_response
+    games = ts.search_games(query='test', fetch_viewers=False)
+    assert len(games) == 2
+    assert not ts.fetch_viewers.called
+
+
 def test_get_game(ts, mock_fetch_viewers,
                   games_search_response, game2json):
     requests.Session.request.return_value = games_search_response
+    ts.fetch_viewers.side_effect = lambda g: g
     g = ts.get_game(game2json['name'])
     conftest.assert_game_equals_json(g, game2json)
+    # only the matching game should get its viewers fetched
+    ts.fetch_viewers.assert_called_once_with(g)
 
 
 def test_get_channel(ts, get_channel_response, channel1json, kraken_headers):
@@ -173,6 +292,30 @@ def test_get_channel(ts, get_channel_response, channel1json, kraken_headers):
         headers=kraken_headers, data=None)
 
 
+def test_get_channel_json_loads(ts, channel1json):
+    response = mock.Mock()
+    response.content = json.dumps(channel1json).encode('utf-8')
+    requests.Session.request.return_value = response
+    ts.json_loads = jsonutils.loads
+    channel = ts.get_channel(channel1json['name'])
+    conftest.assert_channel_equals_json(channel, channel1json)
+    assert not response.json.called
+
+
+def test_get_channels(ts, get_channel_response, channel1json):
+    def respond(method, url, **kwargs):
+        if url.endswith('/bad'):
+            raise requests.HTTPError()
+        return get_channel_response
+    requests.Session.request.side_effect = respond
+    channels, errors = ts.get_channels(['a', 'bad', 'a', 'b'])
+    assert sorted(channels) == ['a', 'b']
+    conftest.assert_channel_equals_json(channels['a'], channel1json)
+    assert list(errors) == ['bad']
+    assert isinstance(errors['bad'], requests.HTTPError)
+    assert requests.Session.request.call_count == 3
+
+
 def test_search_channels(ts, search_channels_response, channel1json,
                          channel2json, kraken_headers):
     requests.Session.request.return_value = search_channels_response
@@ -243,6 +386,42 @@ def test_get_streams(ts, search_streams_response, channel1, stream1json,
             params=p, headers=kraken_headers, data=None)
 
 
+def test_iter_streams(ts, stream1json, stream2json, kraken_headers):
+    page1 = conftest.create_mockresponse({'streams': [stream1json, stream2json]})
+    page2 = conftest.create_mockresponse({'streams': [stream2json]})
+    requests.Session.request.side_effect = [page1, page2]
+    streams = list(ts.iter_streams(game='Test', pagesize=2))
+    assert len(streams) == 2
+    for s, j in zip(streams, [stream1json, stream2json]):
+        conftest.assert_stream_equals_json(s, j)
+    requests.Session.request.assert_called_with(
+        'GET', session.TWITCH_KRAKENURL + 'streams',
+        params={'game': 'Test', 'channel': None, 'limit': 2, 'offset': 2},
+        headers=kraken_headers, data=None)
+
+
+def test_get_streams_bulk(ts, stream1json, stream2json):
+    pages = {'a,b': {'streams': [stream2json]},
+             'c': {'streams': [stream1json, stream2json]}}
+
+    def respond(method, url, params, **kwargs):
+        return conftest.create_mockresponse(pages[params['channel']])
+    requests.Session.request.side_effect = respond
+    streams = ts.get_streams_bulk(['a', 'b', 'c', 'a'], chunksize=2, pagesize=10)
+    assert len(streams) == 2
+    for s, j in zip(streams, [stream1json, stream2json]):
+        conftest.assert_stream_equals_json(s, j)
+    assert requests.Session.request.call_count == 2
+
+
+def test_iter_top_games(ts, top_games_response, game1json, game2json):
+    requests.Session.request.return_value = top_games_response
+    games = list(ts.iter_top_games(pagesize=10))
+    assert len(games) == 2
+    for g, j in zip(games, [game1json, game2json]):
+        conftest.assert_game_equals_json(g, j)
+
+
 def test_search_streams(ts, search_streams_response, stream1json,
                         stream2json, kraken_headers):
     requests.Session.request.return_value = search_streams_response
@@ -294,6 +473,13 @@ def test_get_user(ts, get_user_response,
     conftest.assert_user_equals_json(user, user1json)
 
 
+def test_get_users(ts, get_user_response, user1json):
+    requests.Session.request.return_value = get_user_response
+    users, errors = ts.get_users(['nameofuser', 'otheruser'])
+    assert errors == {}
+    conftest.assert_user_equals_json(users['otheruser'], user1json)
+
+
 @pytest.mark.parametrize('sessionfixture',
                          ['authts',
                           pytest.mark.xfail(raises=exceptions.NotAuthorizedError)('ts')])
@@ -309,6 +495,24 @@ def test_fetch_login_user(request, sessionfixture, get_user_response,
         'GET', session.TWITCH_KRAKENURL + 'user', headers=headers, data=None)
 
 
+def test_current_user_lazy(ts, user1):
+    query = mock.Mock(return_value=user1)
+    ts.query_login_user = query
+    assert ts.current_user is None
+    ts.token = {'access_token': 'abc'}
+    assert not query.called
+    assert ts.current_user is user1
+    assert ts.current_user is user1
+    assert query.call_count == 1
+    # a new token might belong to another user
+    ts.token = {'access_token': 'def'}
+    assert ts.current_user is user1
+    assert query.call_count == 2
+    ts.current_user = None
+    ts.token = None
+    assert ts.current_user is None
+
+
 def test_get_channel_access_token(ts, channel1, access_token_response, oldapi_headers):
     # test with different input types
     channels = [channel1.name, channel1]
@@ -324,6 +528,30 @@ def test_get_channel_access_token(ts, channel1, access_token_response, oldapi_he
         assert sig == tokenjson['sig']
 
 
+def test_get_channel_access_token_cached(ts, channel1, oldapi_headers):
+    expires = int(time.time()) + 3600
+    tokenjson = {u'token': u'{"channel":"test_channel","expires":%s}' % expires,
+                 u'sig': u'f63275898c8aa0b88a6e22acf95088323f006b9d'}
+    requests.Session.request.return_value = conftest.create_mockresponse(tokenjson)
+    for c in [channel1.name, channel1]:
+        token, sig = ts.get_channel_access_token(c)
+        assert (token, sig) == (tokenjson['token'], tokenjson['sig'])
+    assert requests.Session.request.call_count == 1
+    ts.get_channel_access_token(channel1, cached=False)
+    assert requests.Session.request.call_count == 2
+
+
+def test_get_channel_access_token_expiring(ts, channel1):
+    # expires within the refresh margin, so it should not be reused
+    expires = int(time.time()) + session.ACCESS_TOKEN_REFRESH_MARGIN - 1
+    tokenjson = {u'token': u'{"channel":"test_channel","expires":%s}' % expires,
+                 u'sig': u'f63275898c8aa0b88a6e22acf95088323f006b9d'}
+    requests.Session.request.return_value = conftest.create_mockresponse(tokenjson)
+    ts.get_channel_access_token(channel1)
+    ts.get_channel_access_token(channel1)
+    assert requests.Session.request.call_count == 2
+
+
 def test_get_playlist(ts, mock_get_channel_access_token,
                       channel1, playlist):
     token = 'sometoken'
@@ -361,6 +589,28 @@ def test_get_quality_options(ts, mock_get_playlist, playlist, channel1):
         ts.get_playlist.assert_called_with(c)
 
 
+def test_get_playlist_cached(ts, mock_get_channel_access_token, channel1, playlist):
+    session.TwitchSession.get_channel_access_token.return_value = ('token', 'sig')
+    mockresponse = mock.Mock()
+    mockresponse.text = playlist
+    requests.Session.request.return_value = mockresponse
+    p1 = ts.get_playlist(channel1)
+    assert ts.get_quality_options(channel1) == ['source', 'high', 'medium', 'low', 'mobile', 'audio']
+    assert ts.get_variant_url(channel1, 'medium') == 'mediumlink'
+    assert ts.get_playlist(channel1) is p1
+    assert requests.Session.request.call_count == 1
+    assert ts.get_playlist(channel1, cached=False) is not p1
+    assert requests.Session.request.call_count == 2
+
+
+def test_get_variant_url(ts, mock_get_playlist, playlist, channel1):
+    ts.get_playlist.return_value = m3u8.loads(playlist)
+    assert ts.get_variant_url(channel1, 'source') == 'sourclink'
+    assert ts.get_variant_url(channel1, 'audio') == 'audioonlylink'
+    with pytest.raises(ValueError):
+        ts.get_variant_url(channel1, 'ultra')
+
+
 def assert_html_response(r, filename):
     datapath = os.path.join('html', filename)
     sitepath = pkg_resources.resource_filename('pytwitcherapi', datapath)
@@ -386,8 +636,8 @@ def test_login(login_server, auth_redirect_uri, execution_number, user1json):
             '/?access_token=u7amjlndoes3xupi4bb1jrzg2wrcm1&scope=%s' % scopes)
     assert ts.token == {'access_token': 'u7amjlndoes3xupi4bb1jrzg2wrcm1',
                         'scope': session.SCOPES}
-    assert ts.current_user, 'Current user should have been automatically set \
-when setting the token'
+    assert ts.current_user, 'Current user should have been queried \
+after setting the token'
     conftest.assert_user_equals_json(ts.current_user, user1json)
 
 
@@ -412,3 +662,19 @@ def test_get_emote_picture(ts):
     requests.Session.request.assert_called_with(
         'GET', 'http://static-cdn.jtvnw.net/emoticons/v1/25/2.0',
         allow_redirects=True)
+
+
+def test_get_emote_picture_cached(ts, tmpdir):
+    mockresponse = mock.Mock()
+    mockresponse.content = b'testpicdata'
+    requests.Session.request.return_value = mockresponse
+    ts.emote_cache.disk = cache.DiskCache(str(tmpdir))
+    e = chat.message.Emote(25, ())
+    assert ts.get_emote_picture(e, 2.0) == b'testpicdata'
+    assert ts.get_emote_picture(e, 2.0) == b'testpicdata'
+    assert requests.Session.request.call_count == 1
+    ts2 = session.TwitchSession()
+    ts2.emote_cache.disk = cache.DiskCache(str(tmpdir))
+    assert ts2.get_emote_picture(e, 2.0) == b'testpicdata'
+    assert requests.Session.request.call_count == 1
+
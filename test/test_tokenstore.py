@@ -0,0 +1,115 @@
+import os
+
+import pytest
+import requests
+
+from pytwitcherapi import session, tokenstore
+
+from . import sessionfixtures
+
+
+@pytest.fixture(scope='function')
+def token(access_token):
+    return {'access_token': access_token, 'token_type': 'Bearer', 'scope': ['user_read']}
+
+
+@pytest.fixture(scope='function')
+def filestore(tmpdir):
+    return tokenstore.FileTokenStore(str(tmpdir.join('tokens', 'token.json')))
+
+
+def test_dumps_loads(token, user1):
+    t, u = tokenstore.loads(tokenstore.dumps(token, user1))
+    assert t == token
+    assert u.name == user1.name
+    assert u.twitchid == user1.twitchid
+    assert tokenstore.loads(tokenstore.dumps(token)) == (token, None)
+
+
+def test_loads_plain_access_token():
+    assert tokenstore.loads(' abc\n') == ({'access_token': 'abc', 'token_type': 'Bearer'}, None)
+    with pytest.raises(ValueError):
+        tokenstore.loads('{"user": null}')
+
+
+def test_file_store(filestore, token, user1):
+    assert filestore.load() == (None, None)
+    filestore.save(token, user1)
+    assert os.stat(filestore.path).st_mode & 0o077 == 0
+    t, u = filestore.load()
+    assert t == token
+    assert u.name == user1.name
+    filestore.clear()
+    assert filestore.load() == (None, None)
+    filestore.clear()
+
+
+def test_file_store_invalid(filestore):
+    os.makedirs(os.path.dirname(filestore.path))
+    with open(filestore.path, 'w') as f:
+        f.write('{not json')
+    assert filestore.load() == (None, None)
+
+
+def test_env_store(monkeypatch, token):
+    store = tokenstore.EnvTokenStore('PYTWITCHER_TEST_TOKEN')
+    monkeypatch.setenv('PYTWITCHER_TEST_TOKEN', token['access_token'])
+    assert store.load()[0]['access_token'] == token['access_token']
+    store.save(token)
+    assert store.load() == (token, None)
+    store.clear()
+    assert 'PYTWITCHER_TEST_TOKEN' not in os.environ
+
+
+def test_save_after_login(ts, filestore, token, user1):
+    ts.query_login_user = lambda: user1
+    ts.token_store = filestore
+    ts.token = token
+    assert filestore.load() == (token, None)
+    assert ts.current_user is user1
+    t, u = filestore.load()
+    assert t == token
+    assert u.name == user1.name
+
+
+def test_restore_token(ts, filestore, token, user1, user1json, access_token):
+    filestore.save(token, user1)
+    requests.Session.request.return_value = sessionfixtures.create_mockresponse(user1json)
+    ts.token_store = filestore
+    assert ts.restore_token()
+    assert ts.authorized
+    assert ts.token == token
+    assert ts.current_user.name == user1.name
+    assert ts.token_validation.result(timeout=1) is True
+    args, kwargs = requests.Session.request.call_args
+    assert args[1] == session.TWITCH_KRAKENURL + 'user'
+    assert kwargs['headers']['Authorization'] == 'OAuth %s' % access_token
+
+
+def test_restore_token_rejected(ts, filestore, token, user1):
+    filestore.save(token, user1)
+    rejected = requests.Response()
+    rejected.status_code = 401
+    requests.Session.request.return_value = rejected
+    assert ts.restore_token(filestore)
+    assert ts.token_validation.result(timeout=1) is False
+    assert not ts.authorized
+    assert ts.token is None
+    assert ts.current_user is None
+    assert filestore.load() == (None, None)
+
+
+def test_restore_token_unreachable(ts, filestore, token, user1):
+    filestore.save(token, user1)
+    requests.Session.request.side_effect = requests.ConnectionError()
+    assert ts.restore_token(filestore)
+    assert ts.token_validation.result(timeout=1) is None
+    assert ts.authorized
+    assert filestore.load()[0] == token
+
+
+def test_restore_token_missing(ts, filestore):
+    assert not ts.restore_token(filestore)
+    assert not ts.authorized
+    with pytest.raises(ValueError):
+        ts.restore_token()
@@ -0,0 +1,109 @@
+import mock
+import requests
+
+from pytwitcherapi import exceptions, models, watcher
+
+from . import conftest
+
+
+def create_stream(name, game='Dota 2', status='Playing', viewers=100):
+    channel = models.Channel(name, status, name, game, 1, 0, 0, None, 'en', 'en',
+                             False, None, None, None, 0)
+    return models.Stream(game, channel, 2, viewers, {})
+
+
+def create_watcher(live, channels=('a', 'b', 'c'), **kwargs):
+    """Return a watcher, whose session returns the streams in the live dict"""
+    session = mock.Mock()
+    session.get_streams_bulk.side_effect = \
+        lambda chunk, chunksize: [live[n] for n in chunk if n in live]
+    return watcher.StreamWatcher(session, list(channels), **kwargs)
+
+
+def kinds(events):
+    return [(e.kind, e.channel) for e in events]
+
+
+def test_first_poll_records_state():
+    live = {'a': create_stream('a')}
+    w = create_watcher(live)
+    assert w.poll() == []
+    assert list(w.streams) == ['a']
+    w = create_watcher(live, initial=True)
+    assert kinds(w.poll()) == [(watcher.ONLINE, 'a')]
+
+
+def test_transitions():
+    live = {'a': create_stream('a'), 'b': create_stream('b')}
+    w = create_watcher(live, viewers_threshold=50)
+    w.poll()
+    live['c'] = create_stream('c')
+    del live['b']
+    live['a'] = create_stream('a', game='Chess', status='Other', viewers=140)
+    events = w.poll()
+    assert kinds(events) == [(watcher.GAME, 'a'), (watcher.TITLE, 'a'),
+                             (watcher.OFFLINE, 'b'), (watcher.ONLINE, 'c')]
+    assert events[0].previous.game == 'Dota 2'
+    assert events[2].stream is None
+    # the viewers are compared to the last viewers event, so slow drift is noticed
+    live['a'] = create_stream('a', game='Chess', status='Other', viewers=160)
+    assert kinds(w.poll()) == [(watcher.VIEWERS, 'a')]
+    assert w.poll() == []
+
+
+def test_chunks_polled_in_turn():
+    w = create_watcher({}, channels=['A', 'b', 'a', 'c', 'd'], chunksize=2)
+    assert w.chunks == [['a', 'b'], ['c', 'd']]
+    w.poll()
+    w.poll()
+    w.poll()
+    chunks = [c[0][0] for c in w.session.get_streams_bulk.call_args_list]
+    assert chunks == [['a', 'b'], ['c', 'd'], ['a', 'b']]
+
+
+def test_failed_poll_keeps_state():
+    live = {'a': create_stream('a')}
+    w = create_watcher(live)
+    w.poll()
+    w.session.get_streams_bulk.side_effect = requests.ConnectionError()
+    assert w.poll() == []
+    assert list(w.streams) == ['a']
+
+
+def test_failed_poll_skips_circuit_and_malformed_body():
+    live = {'a': create_stream('a')}
+    w = create_watcher(live)
+    w.poll()
+    for error in (exceptions.CircuitOpenError(), ValueError('No JSON object could be decoded')):
+        w.session.get_streams_bulk.side_effect = error
+        assert w.poll() == []
+    assert list(w.streams) == ['a']
+
+
+def test_set_channels_drops_state():
+    live = {'a': create_stream('a'), 'b': create_stream('b')}
+    w = create_watcher(live)
+    w.poll()
+    w.set_channels(['b', 'c'])
+    assert list(w.streams) == ['b']
+    del live['b']
+    assert kinds(w.poll()) == [(watcher.OFFLINE, 'b')]
+
+
+def test_requests_spread_over_interval():
+    clock = conftest.Clock()
+    w = create_watcher({}, channels=['a', 'b', 'c', 'd'], chunksize=1,
+                       interval=60, timer=clock, sleep=clock.sleep)
+    w.session.get_streams_bulk.side_effect = None
+    w.session.get_streams_bulk.return_value = []
+    polled = []
+
+    def poll():
+        polled.append(clock.now)
+        if len(polled) == 6:
+            w.stop()
+        return [watcher.StreamEvent(watcher.ONLINE, 'a', None, None)]
+
+    w.poll = poll
+    assert len(list(w)) == 6
+    assert polled == [1000.0, 1015.0, 1030.0, 1045.0, 1060.0, 1075.0]